@@ -0,0 +1,211 @@
+"""Benchmark of the config generation and deletion flows, run offline against the IBM Cloud stand-in (standin.py).
+
+Drives generate_config and delete_config of the gen2 backends (lithops and ray), the image build of a ray config and
+the verification of a Cloud Functions config, and reports per scenario the wall time, the number of API calls per service and the
+peak memory traced while it ran.
+
+usage: python benchmarks/config_flow.py [--latency SECONDS] [--scale N] [--instances N] [--scenario NAME ...]
+                                        [--routes] [--json FILE] [--mode fake|record|replay --cassette FILE]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from standin import DEFAULT_BUCKET, FakeCloud, StandIn  # noqa: E402
+
+API_KEY = 'bench-api-key'
+REGION = 'eu-de'
+
+
+def reset_state(cache_dir):
+    """drops the state lithopscloud keeps in process between config generations, so every scenario runs cold"""
+    import importlib
+    from lithopscloud.modules import clients, context, cos, iam
+    from lithopscloud.modules.cache import CATALOG_CACHE
+    from lithopscloud.modules.config_builder import ConfigBuilder
+    from lithopscloud.modules.gen2 import ssh_key
+
+    context.DEFAULT_CONTEXT = context.RunContext()
+    ConfigBuilder.session_cache.invalidate()
+    CATALOG_CACHE.cache_dir = cache_dir
+    for broker in iam.BROKERS.values():
+        broker.cancel_refresh()
+    iam.BROKERS.clear()
+    clients.CLIENTS.clear()
+    clients.POOLS.close()
+    ssh_key._keypairs.clear()
+    cos.BUCKET_REGIONS.clear()
+
+    cos_package = importlib.import_module('lithopscloud.modules.cos-package.verify')
+    cos_package.COS_CLIENTS.clear()
+    cos_package.BUCKET_ENDPOINTS.clear()
+
+
+def warm_up():
+    """imports the modules of all scenarios and loads the s3 service model, so scenarios don't time them"""
+    import importlib
+    import ibm_boto3
+
+    for module in ['lithopscloud.modules.gen2.lithops', 'lithopscloud.modules.gen2.ray', 'lithopscloud.modules.gen2',
+                   'lithopscloud.modules.cloud_functions.verify', 'lithopscloud.modules.cos-package.verify',
+                   'lithopscloud.modules.config_verification']:
+        importlib.import_module(module)
+    ibm_boto3.client('s3', aws_access_key_id='warm', aws_secret_access_key='up',
+                     endpoint_url='https://s3.eu-de.cloud-object-storage.appdomain.cloud')
+
+
+def _node_config(config):
+    return next(iter(config['available_node_types'].values()))['node_config']
+
+
+def add_instances(cloud, config_file, count):
+    """adds running instances with floating ips to the cluster vpc of a generated config, for teardown to delete"""
+    with open(config_file) as f:
+        config = yaml.safe_load(f)
+    node_config = config['ibm_vpc'] if 'ibm_vpc' in config else _node_config(config)
+    for i in range(count):
+        cloud.add_instance(node_config['vpc_id'], node_config['subnet_id'], f'bench-instance-{i}', floating_ip=True)
+
+
+def generate(backend_name, **kwargs):
+    def scenario(workdir):
+        from lithopscloud import generate_config
+        return generate_config(backend_name, API_KEY, REGION, output_file=os.path.join(workdir, f'{backend_name}.yaml'),
+                               **kwargs)
+    return scenario
+
+
+def delete(backend_name):
+    def scenario(workdir):
+        from lithopscloud import delete_config
+        delete_config(os.path.join(workdir, f'{backend_name}.yaml'))
+    return scenario
+
+
+def build_image(backend_name):
+    def scenario(workdir):
+        from lithopscloud import build_image
+
+        # setup commands run on the builder are only recorded, the stand-in has no ssh server
+        build_image(os.path.join(workdir, f'{backend_name}.yaml'), os.path.join(workdir, f'{backend_name}-image.yaml'),
+                    run_commands=lambda host: lambda command: 0)
+    return scenario
+
+
+def verify_cloud_functions(cloud):
+    def scenario(workdir):
+        from lithopscloud.modules.config_verification import verify_config_file
+
+        region, namespace = next((r, ns[0]) for r, ns in cloud.namespaces.items() if ns)
+        config = {'lithops': {'backend': 'ibm_cf', 'storage': 'ibm_cos'},
+                  'ibm': {'iam_api_key': API_KEY},
+                  'ibm_cf': {'endpoint': f'https://{region}.functions.cloud.ibm.com',
+                             'namespace': namespace['name'], 'namespace_id': namespace['id']},
+                  'ibm_cos': {'storage_bucket': DEFAULT_BUCKET}}
+        config_file = os.path.join(workdir, 'cf.yaml')
+        with open(config_file, 'w') as f:
+            yaml.dump(config, f)
+        verify_config_file(config_file, os.path.join(workdir, 'cf-verified.yaml'))
+    return scenario
+
+
+def scenarios(cloud, instances):
+    from lithopscloud import LITHOPS_GEN2, RAY_GEN2
+
+    return {
+        'gen2-generate': (generate(LITHOPS_GEN2, cos_bucket_name=DEFAULT_BUCKET), None),
+        'gen2-delete': (delete(LITHOPS_GEN2), lambda workdir: add_instances(
+            cloud, os.path.join(workdir, f'{LITHOPS_GEN2}.yaml'), instances)),
+        'ray-generate': (generate(RAY_GEN2, max_workers=2), None),
+        'ray-image-build': (build_image(RAY_GEN2), None),
+        'ray-delete': (delete(RAY_GEN2), lambda workdir: add_instances(
+            cloud, os.path.join(workdir, f'{RAY_GEN2}.yaml'), instances)),
+        'cf-verify': (verify_cloud_functions(cloud), None),
+    }
+
+
+def run_scenario(name, func, setup, standin_args, workdir, verbose):
+    reset_state(os.path.join(workdir, 'catalog-cache', name))
+    if setup:
+        setup(workdir)
+
+    output = sys.stdout if verbose else io.StringIO()
+    error = None
+    with StandIn(**standin_args) as standin, contextlib.redirect_stdout(output):
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            func(workdir)
+        except (Exception, SystemExit) as e:
+            error = f'{type(e).__name__}: {e}'
+        wall = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {'scenario': name, 'wall_seconds': round(wall, 3), 'api_calls': standin.total_calls(),
+            'calls_per_service': dict(standin.services), 'calls_per_route': dict(standin.calls),
+            'peak_memory_mb': round(peak / 2 ** 20, 2), 'error': error}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every API request')
+    parser.add_argument('--scale', type=int, default=0, help='unrelated pre-existing resources of each type')
+    parser.add_argument('--instances', type=int, default=4, help='cluster instances to delete in the delete scenarios')
+    parser.add_argument('--scenario', action='append', help='scenario to run, all if not specified')
+    parser.add_argument('--routes', action='store_true', help='print API calls per route')
+    parser.add_argument('--json', help='file to write the results to')
+    parser.add_argument('--mode', choices=['fake', 'record', 'replay'], default='fake')
+    parser.add_argument('--cassette', help='recorded responses file of the record and replay modes')
+    parser.add_argument('--verbose', action='store_true', help="don't hide the output of lithopscloud")
+    args = parser.parse_args()
+
+    warm_up()
+    cloud = FakeCloud(scale=args.scale)
+    standin_args = {'latency': args.latency, 'mode': args.mode, 'cassette': args.cassette, 'cloud': cloud}
+    results = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        home = os.environ.get('HOME')
+        os.environ['HOME'] = workdir  # generated ssh keys land in the work directory
+        os.makedirs(os.path.join(workdir, '.ssh'))
+        try:
+            for name, (func, setup) in scenarios(cloud, args.instances).items():
+                if args.scenario and name not in args.scenario:
+                    continue
+                results.append(run_scenario(name, func, setup, standin_args, workdir, args.verbose))
+        finally:
+            if home:
+                os.environ['HOME'] = home
+
+    print(f"{'scenario':<16}{'wall (s)':>10}{'api calls':>11}{'peak (MB)':>11}  calls per service")
+    for res in results:
+        services = ', '.join(f'{s} {n}' for s, n in sorted(res['calls_per_service'].items()))
+        print(f"{res['scenario']:<16}{res['wall_seconds']:>10.2f}{res['api_calls']:>11}"
+              f"{res['peak_memory_mb']:>11.1f}  {services}")
+        if res['error']:
+            print(f"{'':<16}failed - {res['error']}")
+        if args.routes:
+            for route_name, count in sorted(res['calls_per_route'].items(), key=lambda r: -r[1]):
+                print(f"{'':<18}{count:>5}  {route_name}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if any(res['error'] for res in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,528 @@
+"""Local stand-in for the IBM Cloud HTTP APIs used by lithopscloud: VPC, Resource Controller/Manager, IAM,
+Cloud Object Storage (s3 and its endpoints listing) and Cloud Functions.
+
+Every request the SDKs, ibm_boto3 and the raw http calls issue is intercepted in process and answered by an
+in-memory fake cloud, optionally after an injected latency. Requests are counted per service and route.
+
+In 'record' mode requests go to the real IBM Cloud and their responses are saved to a cassette file;
+in 'replay' mode responses are served from the cassette, falling back to the fake cloud for unrecorded requests.
+
+usage:
+    with StandIn(latency=0.05) as standin:
+        generate_config(...)
+    print(standin.calls)
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+import jwt
+import requests
+from requests.structures import CaseInsensitiveDict
+
+VPC_REGIONS = ['us-south', 'us-east', 'eu-de', 'eu-gb', 'jp-tok', 'jp-osa', 'au-syd', 'ca-tor', 'br-sao']
+COS_REGIONS = ['us-south', 'us-east', 'eu-de', 'eu-gb', 'jp-tok', 'jp-osa', 'au-syd', 'ca-tor', 'br-sao', 'eu-es',
+               'us', 'eu', 'ap']
+CF_REGIONS = ['eu-de', 'eu-gb', 'us-south', 'us-east', 'au-syd', 'jp-tok']
+DEFAULT_BUCKET, DEFAULT_BUCKET_REGION = 'bench-bucket', 'eu-de'
+PAGE_LIMIT = 50  # default page size of VPC list calls
+
+# (family, vcpu, memory GiB, gpus, instance storage disks in GB)
+PROFILES = [('bx2', 2, 8, 0, []), ('bx2', 4, 16, 0, []), ('bx2', 8, 32, 0, []), ('bx2', 16, 64, 0, []),
+            ('bx2', 32, 128, 0, []), ('bx2', 48, 192, 0, []), ('bx2d', 2, 8, 0, [75]), ('bx2d', 8, 32, 0, [300]),
+            ('bx2d', 16, 64, 0, [600]), ('cx2', 2, 4, 0, []), ('cx2', 8, 16, 0, []), ('cx2', 32, 64, 0, []),
+            ('cx2d', 8, 16, 0, [300]), ('mx2', 2, 16, 0, []), ('mx2', 8, 64, 0, []), ('mx2', 32, 256, 0, []),
+            ('mx2d', 16, 128, 0, [600]), ('gx2', 8, 64, 1, []), ('gx2', 16, 128, 2, [])]
+FAMILIES = {'bx': 'balanced', 'cx': 'compute', 'mx': 'memory', 'gx': 'gpu-v100'}
+
+
+def new_id(prefix='r010'):
+    return f'{prefix}-{uuid.uuid4()}'
+
+
+class FakeCloud:
+    """In-memory state of a single IBM Cloud account, and the handlers of the API routes it serves.
+
+    :param scale - number of unrelated pre-existing resources (vpcs, subnets, keys, floating ips, images and
+                   cos instances) in the account, to make listings span several pages"""
+
+    def __init__(self, scale=0, buckets=None, namespaces=None):
+        self.lock = threading.RLock()
+        self.resource_groups = [{'id': uuid.uuid4().hex, 'name': 'Default'}]
+        self.images = [self._image('ibm-ubuntu-20-04-3-minimal-amd64-2', 'ubuntu-20-04-amd64'),
+                       self._image('ibm-ubuntu-18-04-6-minimal-amd64-2', 'ubuntu-18-04-amd64'),
+                       self._image('ibm-centos-7-9-minimal-amd64-5', 'centos-7-amd64')]
+        self.revoked_api_keys = set()  # rejected by the IAM token exchanges
+        self.vpcs, self.subnets, self.gateways, self.keys = {}, {}, {}, {}
+        self.security_groups, self.fips, self.instances, self.address_prefixes = {}, {}, {}, {}
+        self.resource_instances = [self._cos_instance('bench-cos')]
+        self.buckets = dict(buckets or {DEFAULT_BUCKET: DEFAULT_BUCKET_REGION})  # bucket name -> region
+        self.namespaces = namespaces if namespaces is not None else {
+            'eu-gb': [{'id': uuid.uuid4().hex, 'name': 'bench-namespace', 'location': 'eu-gb'}]}
+
+        for i in range(scale):
+            vpc = self.create_vpc({'name': f'existing-vpc-{i}', 'resource_group': self.resource_groups[0]},
+                                  open_security_group=True)
+            self.create_subnet({'name': f'existing-subnet-{i}', 'vpc': {'id': vpc['id']},
+                                'zone': {'name': 'eu-de-1'}, 'ipv4_cidr_block': f'10.{i % 250}.0.0/24'})
+            self.create_key({'name': f'existing-key-{i}', 'public_key': 'ssh-rsa AAAA existing'})
+            fip_id = new_id()
+            self.fips[fip_id] = {'id': fip_id, 'address': f'169.0.{i // 250}.{i % 250}',
+                                   'zone': {'name': 'eu-de-1'}, 'status': 'available',
+                                   'resource_group': {'id': self.resource_groups[0]['id']}}
+            self.images.append(self._image(f'existing-custom-image-{i}', 'ubuntu-20-04-amd64', owner_type='user'))
+            self.resource_instances.append(self._cos_instance(f'existing-cos-{i}'))
+
+    # state builders
+    def _image(self, name, os_name, owner_type='provider'):
+        return {'id': new_id(), 'name': name, 'status': 'available', 'owner_type': owner_type,
+                'minimum_provisioned_size': 100, 'operating_system': {'name': os_name, 'architecture': 'amd64'},
+                'visibility': 'public' if owner_type == 'provider' else 'private', 'file': {'size': 1}}
+
+    def _cos_instance(self, name):
+        guid = uuid.uuid4().hex
+        return {'id': f'crn:v1:bluemix:public:cloud-object-storage:global:a/{guid}::', 'guid': guid, 'name': name,
+                'resource_group_id': self.resource_groups[0]['id'], 'state': 'active'}
+
+    def profiles(self):
+        profiles = []
+        for family, cpu, mem, gpus, disks in PROFILES:
+            profile = {'name': f'{family}-{cpu}x{mem}', 'family': FAMILIES[family[:2]],
+                       'vcpu_count': {'type': 'fixed', 'value': cpu}, 'memory': {'type': 'fixed', 'value': mem},
+                       'bandwidth': {'type': 'fixed', 'value': cpu * 2000},
+                       'disks': [{'quantity': {'type': 'fixed', 'value': 1}, 'size': {'type': 'fixed', 'value': d},
+                                  'supported_interface_types': {'type': 'enum', 'values': ['virtio_blk']}}
+                                 for d in disks]}
+            if gpus:
+                profile['gpu_count'] = {'type': 'fixed', 'value': gpus}
+                profile['gpu_model'] = {'type': 'enum', 'values': ['Tesla V100']}
+            profiles.append(profile)
+        return profiles
+
+    def create_vpc(self, body, open_security_group=False):
+        vpc_id, sg_id = new_id(), new_id()
+        rules = []
+        if open_security_group:
+            rules = [{'id': new_id(), 'direction': d, 'protocol': 'all', 'remote': {'cidr_block': '0.0.0.0/0'}}
+                     for d in ('inbound', 'outbound')]
+        self.security_groups[sg_id] = {'id': sg_id, 'name': f"{body['name']}-default-sg", 'rules': rules,
+                                       'vpc': {'id': vpc_id}}
+        resource_group = next(g for g in self.resource_groups
+                              if g['id'] == (body.get('resource_group') or self.resource_groups[0])['id'])
+        self.vpcs[vpc_id] = {'id': vpc_id, 'name': body['name'], 'status': 'available', 'classic_access': False,
+                             'resource_group': {'id': resource_group['id'], 'name': resource_group['name'],
+                                                'href': f"https://resource-controller.cloud.ibm.com/v2/resource_groups/"
+                                                        f"{resource_group['id']}"},
+                             'default_security_group': {'id': sg_id, 'name': self.security_groups[sg_id]['name']},
+                             'crn': f'crn:v1:bluemix:public:is::a/0::vpc:{vpc_id}', 'created_at': '2022-01-01'}
+        self.address_prefixes[vpc_id] = [{'id': new_id(), 'zone': {'name': f'{region}-{z}'},
+                                          'cidr': f'10.{VPC_REGIONS.index(region) * 3 + z}.0.0/18'}
+                                         for region in VPC_REGIONS for z in (1, 2, 3)]
+        return self.vpcs[vpc_id]
+
+    def create_subnet(self, body):
+        subnet_id = new_id()
+        if body.get('total_ipv4_address_count'):
+            total = int(body['total_ipv4_address_count'])
+        else:
+            total = 2 ** (32 - int((body.get('ipv4_cidr_block') or '10.0.0.0/24').split('/')[1]))
+        self.subnets[subnet_id] = {'id': subnet_id, 'name': body['name'], 'status': 'available',
+                                   'vpc': {'id': body['vpc']['id']}, 'zone': {'name': body['zone']['name']},
+                                   'ipv4_cidr_block': body.get('ipv4_cidr_block'),
+                                   'total_ipv4_address_count': total, 'available_ipv4_address_count': total - 5,
+                                   'resource_group': body.get('resource_group') or {'id': self.resource_groups[0]['id']}}
+        return self.subnets[subnet_id]
+
+    def create_key(self, body):
+        key_id = new_id()
+        self.keys[key_id] = {'id': key_id, 'name': body['name'], 'type': 'rsa', 'public_key': body['public_key'],
+                             'fingerprint': 'SHA256:bench'}
+        return self.keys[key_id]
+
+    def add_instance(self, vpc_id, subnet_id, name, floating_ip=False):
+        """adds a running instance (and optionally a floating ip bound to it) to the vpc, e.g. to benchmark teardown"""
+        with self.lock:
+            instance_id, interface_id = new_id(), new_id()
+            interface = {'id': interface_id, 'subnet': {'id': subnet_id}}
+            self.instances[instance_id] = {'id': instance_id, 'name': name, 'status': 'running',
+                                           'vpc': {'id': vpc_id}, 'zone': self.subnets[subnet_id]['zone'],
+                                           'primary_network_interface': interface, 'network_interfaces': [interface],
+                                           'boot_volume_attachment': {'volume': {'id': new_id()}}}
+            if floating_ip:
+                fip_id = new_id()
+                self.fips[fip_id] = {'id': fip_id, 'address': '169.1.1.1', 'status': 'available',
+                                     'target': {'id': interface_id}, 'zone': self.subnets[subnet_id]['zone'],
+                                     'resource_group': {'id': self.resource_groups[0]['id']}}
+            return self.instances[instance_id]
+
+    # request handling
+    def page(self, key, objects, query):
+        limit = int(query.get('limit', PAGE_LIMIT))
+        start = int(query.get('start', 0))
+        res = {key: objects[start:start + limit], 'limit': limit, 'total_count': len(objects),
+               'first': {'href': f'https://fake/v1/{key}?limit={limit}'}}
+        if start + limit < len(objects):
+            res['next'] = {'href': f'https://fake/v1/{key}?limit={limit}&start={start + limit}'}
+        return res
+
+    def vpc(self, method, path, query, body, region):
+        """VPC API of 'region', path without the /v1 prefix"""
+        parts = path.strip('/').split('/')
+        collection, rid, sub = parts[0], (parts[1] if len(parts) > 1 else None), (parts[2] if len(parts) > 2 else None)
+
+        if collection == 'regions':
+            if rid and sub == 'zones':
+                return 200, {'zones': [{'name': f'{rid}-{z}', 'status': 'available', 'region': {'name': rid}}
+                                       for z in (1, 2, 3)]}
+            return 200, {'regions': [{'name': r, 'endpoint': f'https://{r}.iaas.cloud.ibm.com', 'status': 'available'}
+                                     for r in VPC_REGIONS]}
+        if collection == 'instance' and rid == 'profiles':
+            return 200, {'profiles': self.profiles()}
+        if collection == 'images':
+            if method == 'POST':
+                image = self._image(body['name'], 'ubuntu-20-04-amd64', owner_type='user')
+                image['source_volume'] = body['source_volume']
+                self.images.append(image)
+                return 201, image
+            return self._collection(method, 'images', {i['id']: i for i in self.images}, rid, query, body)
+
+        stores = {'vpcs': self.vpcs, 'subnets': self.subnets, 'public_gateways': self.gateways, 'keys': self.keys,
+                  'floating_ips': self.fips, 'instances': self.instances, 'security_groups': self.security_groups}
+        if collection not in stores:
+            return 404, {'errors': [{'code': 'not_found', 'message': f'{path} not found'}]}
+        store = stores[collection]
+
+        if sub:
+            if rid not in store:
+                return 404, {'errors': [{'code': 'not_found', 'message': f'{rid} not found'}]}
+            if collection == 'vpcs' and sub == 'address_prefixes':
+                return 200, {'address_prefixes': self.address_prefixes.get(rid, [])}
+            if collection == 'subnets' and sub == 'public_gateway' and method == 'PUT':
+                store[rid]['public_gateway'] = {'id': body['id']}
+                return 201, self.gateways.get(body['id'], body)
+            if collection == 'security_groups' and sub == 'rules' and method == 'POST':
+                rule = dict(body, id=new_id())
+                store[rid]['rules'].append(rule)
+                return 201, rule
+            if collection == 'instances' and sub == 'actions' and method == 'POST':
+                store[rid]['status'] = {'stop': 'stopped', 'start': 'running', 'reboot': 'running'}[body['type']]
+                return 201, {'id': new_id(), 'type': body['type'], 'status': 'completed'}
+
+        if method == 'POST' and not rid:
+            if set((body or {}).get('resource_group') or {'id': None}) != {'id'}:  # an identity, not a reference
+                return 400, {'errors': [{'code': 'validation_invalid_argument',
+                                         'message': 'resource_group must be an identity of its id only'}]}
+            if collection == 'vpcs':
+                return 201, self.create_vpc(body)
+            if collection == 'subnets':
+                return 201, self.create_subnet(body)
+            if collection == 'keys':
+                if any(k['name'] == body['name'] for k in self.keys.values()):
+                    return 409, {'errors': [{'code': 'key_name_duplicate',
+                                             'message': 'Key with name already exists'}]}
+                return 201, self.create_key(body)
+            if collection == 'instances':
+                subnet_id = body['primary_network_interface']['subnet']['id']
+                instance = self.add_instance(body['vpc']['id'], subnet_id, body['name'])
+                instance.update({'profile': body['profile'], 'image': body['image']})
+                return 201, instance
+            if collection == 'floating_ips':
+                fip_id = new_id()
+                store[fip_id] = {'id': fip_id, 'name': body.get('name'), 'address': '169.3.3.3', 'status': 'available',
+                                 'target': body.get('target'), 'zone': body.get('zone'),
+                                 'resource_group': body.get('resource_group') or {'id': self.resource_groups[0]['id']}}
+                return 201, store[fip_id]
+            if collection == 'public_gateways':
+                gw_id = new_id()
+                store[gw_id] = {'id': gw_id, 'name': body.get('name'), 'vpc': body['vpc'], 'zone': body['zone'],
+                                'status': 'available', 'floating_ip': {'address': '169.2.2.2'},
+                                'resource_group': body.get('resource_group') or {'id': self.resource_groups[0]['id']}}
+                return 201, store[gw_id]
+
+        filters = {'vpc_id': ('vpc', 'id'), 'vpc.id': ('vpc', 'id'), 'zone.name': ('zone', 'name'),
+                   'resource_group.id': ('resource_group', 'id'), 'target.id': ('target', 'id')}
+        objects = list(store.values())
+        for param, (field, attr) in filters.items():
+            if param in query:
+                objects = [o for o in objects if (o.get(field) or {}).get(attr) == query[param]]
+        return self._collection(method, collection, {o['id']: o for o in objects} if not rid else store, rid, query,
+                                body)
+
+    def _collection(self, method, key, store, rid, query, body):
+        if not rid:
+            return 200, self.page(key, list(store.values()), query)
+        if rid not in store:
+            return 404, {'errors': [{'code': 'not_found', 'message': f'{rid} not found'}]}
+        if method == 'GET':
+            return 200, store[rid]
+        if method == 'DELETE':
+            del store[rid]
+            return 204, None
+        if method == 'PATCH':
+            store[rid].update(body)
+            return 200, store[rid]
+        return 405, None
+
+    def resource_controller(self, method, path, query, body):
+        if path.startswith('/v2/resource_groups'):
+            return 200, {'resources': self.resource_groups}
+        if path.startswith('/v2/resource_instances'):
+            if method == 'POST':
+                instance = self._cos_instance(body['name'])
+                self.resource_instances.append(instance)
+                return 201, instance
+            limit, start = int(query.get('limit', 100)), int(query.get('start', 0))
+            page = self.resource_instances[start:start + limit]
+            next_url = f'/v2/resource_instances?start={start + limit}' \
+                if start + limit < len(self.resource_instances) else None
+            return 200, {'resources': page, 'rows_count': len(page), 'next_url': next_url}
+        return 404, {'message': f'{path} not found'}
+
+    def iam(self, method, path, query, body):
+        if path == '/identity/token':
+            if body.get('apikey') in self.revoked_api_keys:
+                return 400, {'errorCode': 'BXNIM0415E', 'errorMessage': 'Provided API key could not be found.'}
+            now = int(time.time())
+            token = jwt.encode({'iat': now, 'exp': now + 3600, 'sub': 'bench'}, 'bench-secret' * 3)
+            res = {'access_token': token, 'refresh_token': 'bench-refresh', 'token_type': 'Bearer',
+                   'expires_in': 3600, 'expiration': now + 3600}
+            if body.get('response_type') == 'delegated_refresh_token':
+                res = {'delegated_refresh_token': 'bench-delegated', 'expiration': now + 3600}
+            return 200, res
+        if path == '/v1/apikeys/details':
+            return 200, {'id': 'ApiKey-bench', 'name': 'bench', 'iam_id': 'IBMid-bench', 'account_id': 'bench'}
+        return 404, {'message': f'{path} not found'}
+
+    def cos_endpoints(self):
+        return 200, {'service-endpoints': {'regional': {r: {'public': {r: f's3.{r}.cloud-object-storage.appdomain.cloud'}}
+                                                        for r in COS_REGIONS}}}
+
+    def functions(self, method, path, query, region):
+        namespaces = self.namespaces.get(region, [])
+        limit, offset = int(query.get('limit', 200)), int(query.get('offset', 0))
+        return 200, {'namespaces': namespaces[offset:offset + limit], 'limit': limit, 'offset': offset,
+                     'total_count': len(namespaces)}
+
+    def s3(self, method, bucket, query, region):
+        """:returns status and xml body of an s3 request to the endpoint of 'region'"""
+        ns = 'xmlns="http://s3.amazonaws.com/doc/2006-03-01/"'
+        if not bucket:
+            extended = 'extended' in query
+            buckets = ''.join(f'<Bucket><Name>{name}</Name><CreationDate>2022-01-01T00:00:00.000Z</CreationDate>'
+                              + (f'<LocationConstraint>{loc}-smart</LocationConstraint>' if extended else '')
+                              + '</Bucket>' for name, loc in self.buckets.items())
+            return 200, f'<ListAllMyBucketsResult {ns}><Owner><ID>bench</ID></Owner><Buckets>{buckets}</Buckets>' \
+                        f'<IsTruncated>false</IsTruncated></ListAllMyBucketsResult>'
+        if method == 'PUT':
+            if bucket in self.buckets:
+                return 409, '<Error><Code>BucketAlreadyExists</Code><Message>exists</Message></Error>'
+            self.buckets[bucket] = region
+            return 200, ''
+        if self.buckets.get(bucket) != region:
+            return 404, '<Error><Code>NoSuchBucket</Code><Message>The specified bucket does not exist.</Message></Error>'
+        if 'location' in query:
+            return 200, f'<LocationConstraint {ns}>{region}-smart</LocationConstraint>'
+        return 200, ''
+
+    def handle(self, method, url, body):
+        """:returns (service, route, status, body) of a request to 'url'"""
+        parts = urlsplit(url)
+        host, path = parts.hostname, parts.path
+        query = {k: v[0] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+        if isinstance(body, bytes):
+            body = body.decode()
+        if body and body.lstrip().startswith('{'):
+            body = json.loads(body)
+        elif body and '=' in body:
+            body = {k: v[0] for k, v in parse_qs(body).items()}
+        else:
+            body = body or {}
+
+        with self.lock:
+            if host.endswith('.iaas.cloud.ibm.com'):
+                status, res = self.vpc(method, path[len('/v1'):], query, body, host.split('.')[0])
+                return 'vpc', route('vpc', method, path), status, res
+            if host == 'resource-controller.cloud.ibm.com':
+                return 'resource_controller', route('rc', method, path), *self.resource_controller(method, path, query, body)
+            if host.startswith('iam.'):
+                return 'iam', route('iam', method, path), *self.iam(method, path, query, body)
+            if host == 'control.cloud-object-storage.cloud.ibm.com':
+                return 'cos', route('cos', method, path), *self.cos_endpoints()
+            if host.endswith('.functions.cloud.ibm.com'):
+                return 'functions', route('functions', method, path), *self.functions(method, path, query,
+                                                                                      host.split('.')[0])
+            if host.endswith('.cloud-object-storage.appdomain.cloud'):
+                labels = host.split('.')
+                s3_index = labels.index('s3')
+                bucket = labels[0] if s3_index else path.strip('/').split('/')[0]  # virtual host or path style
+                region = labels[s3_index + 1] if labels[s3_index + 1] not in ('private', 'direct') \
+                    else labels[s3_index + 2]
+                status, res = self.s3(method, bucket, query, region)
+                op = 'list_buckets' if not bucket else ('get_bucket_location' if 'location' in query
+                                                        else f'{method.lower()}_bucket')
+                return 'cos', f'cos {op}', status, res
+
+        return 'unknown', f'unknown {method} {host}', 404, {'message': f'no stand-in for {host}'}
+
+
+ID_SEGMENT = re.compile(r'^(r\d{3}-[0-9a-f-]+|[0-9a-f]{32}|crn:.*|[a-z]{2}-[a-z]+(-\d)?)$')
+
+
+def route(service, method, path):
+    """returns the route template of a request, e.g. 'vpc GET /v1/vpcs/{id}'"""
+    segments = ['{id}' if ID_SEGMENT.match(s) else s for s in path.strip('/').split('/')]
+    return f"{service} {method} /{'/'.join(segments)}"
+
+
+class _Raw:
+    """minimal urllib3 response body ibm_botocore reads s3 responses from"""
+
+    def __init__(self, content):
+        self.content = content
+
+    def stream(self, *args, **kwargs):
+        yield self.content
+
+
+class StandIn:
+    """Intercepts the http traffic of the process while active (a context manager).
+
+    :param latency - seconds added to every request, or a dict of seconds per service
+                     ('vpc', 'resource_controller', 'iam', 'cos', 'functions')
+    :param mode - 'fake' serves every request from the fake cloud, 'record' forwards requests to IBM Cloud and
+                  saves them to 'cassette', 'replay' serves recorded responses from 'cassette' first
+    :param cloud - the FakeCloud to serve, a new one if not specified"""
+
+    def __init__(self, latency=0.0, mode='fake', cassette=None, cloud=None):
+        self.latency = latency
+        self.mode = mode
+        self.cassette = cassette
+        self.cloud = cloud or FakeCloud()
+        self.calls = Counter()  # route -> number of requests
+        self.services = Counter()  # service -> number of requests
+        self.interactions = []
+        self._lock = threading.Lock()
+        self._patches = []
+
+        if mode == 'replay':
+            with open(cassette) as f:
+                self.interactions = json.load(f)
+            for interaction in self.interactions:
+                interaction['used'] = False
+
+    def _delay(self, service):
+        delay = self.latency.get(service, 0) if isinstance(self.latency, dict) else self.latency
+        if delay:
+            time.sleep(delay)
+
+    def _replay(self, method, url):
+        with self._lock:
+            for interaction in self.interactions:
+                if not interaction['used'] and interaction['method'] == method and interaction['url'] == url:
+                    interaction['used'] = True
+                    return interaction
+        return None
+
+    def serve(self, method, url, body):
+        """:returns status, headers and body bytes of a request"""
+        service, name, status, res = self.cloud.handle(method, url, body)
+
+        if self.mode == 'replay':
+            interaction = self._replay(method, url)
+            if interaction:
+                status, res = interaction['status'], interaction['body']
+
+        with self._lock:
+            self.calls[name] += 1
+            self.services[service] += 1
+        self._delay(service)
+
+        if isinstance(res, str):
+            return status, {'Content-Type': 'application/xml'}, res.encode()
+        return status, {'Content-Type': 'application/json'}, json.dumps(res).encode() if res is not None else b''
+
+    def _record(self, method, url, status, content):
+        try:
+            body = json.loads(content) if content else None
+        except ValueError:
+            body = content.decode(errors='replace')
+        parts = urlsplit(url)
+        with self._lock:
+            self.interactions.append({'method': method, 'url': url, 'status': status, 'body': body})
+            self.calls[route(parts.hostname, method, parts.path)] += 1
+            self.services[parts.hostname] += 1
+
+    def __enter__(self):
+        standin = self
+
+        class Adapter(requests.adapters.BaseAdapter):
+            def send(self, request, **kwargs):
+                status, headers, content = standin.serve(request.method, request.url, request.body)
+                response = requests.Response()
+                response.status_code = status
+                response.headers = CaseInsensitiveDict(headers)
+                response._content = content
+                response.url = request.url
+                response.request = request
+                response.encoding = 'utf-8'
+                response.reason = 'OK' if status < 400 else 'Error'
+                return response
+
+            def close(self):
+                pass
+
+        def send_s3(session, request):
+            from ibm_botocore.awsrequest import AWSResponse
+            status, headers, content = standin.serve(request.method, request.url, request.body)
+            return AWSResponse(request.url, status, headers, _Raw(content))
+
+        if self.mode == 'record':
+            get_adapter = requests.Session.get_adapter
+            urllib3_send = __import__('ibm_botocore.httpsession', fromlist=['URLLib3Session']).URLLib3Session.send
+
+            def recording_get_adapter(session, url):
+                adapter = get_adapter(session, url)
+                if getattr(adapter, 'recorded', False):
+                    return adapter
+                adapter.recorded = True
+                send = adapter.send
+
+                def recording_send(request, **kwargs):
+                    response = send(request, **kwargs)
+                    standin._record(request.method, request.url, response.status_code, response.content)
+                    return response
+
+                adapter.send = recording_send
+                return adapter
+
+            def recording_send_s3(session, request):
+                response = urllib3_send(session, request)
+                standin._record(request.method, request.url, response.status_code, response.content)
+                return response
+
+            self._patches = [mock.patch.object(requests.Session, 'get_adapter', recording_get_adapter),
+                             mock.patch('ibm_botocore.httpsession.URLLib3Session.send', recording_send_s3)]
+        else:
+            adapter = Adapter()
+            self._patches = [mock.patch.object(requests.Session, 'get_adapter', lambda session, url: adapter),
+                             mock.patch('ibm_botocore.httpsession.URLLib3Session.send', send_s3)]
+
+        for patch in self._patches:
+            patch.start()
+        return self
+
+    def __exit__(self, *exc):
+        for patch in reversed(self._patches):
+            patch.stop()
+        if self.mode == 'record' and self.cassette:
+            with open(self.cassette, 'w') as f:
+                json.dump(self.interactions, f, indent=1)
+        return False
+
+    def total_calls(self):
+        return sum(self.services.values())
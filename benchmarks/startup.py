@@ -0,0 +1,73 @@
+"""Startup benchmark of the lithopscloud cli.
+
+Measures, in fresh interpreters, the wall time and the import time of each cli entry path:
+`--version`, `--help`, `-b local` and `-b gen2` (up to loading the backend's module chain, before any prompt).
+
+usage: python benchmarks/startup.py [--repeat N] [--top N]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+ENTRY_PATHS = {
+    '--version': "from lithopscloud.main import builder\n"
+                 "try:\n    builder(['--version'])\nexcept SystemExit:\n    pass",
+    '--help': "from lithopscloud.main import builder\n"
+              "try:\n    builder(['--help'])\nexcept SystemExit:\n    pass",
+    '-b local': "from lithopscloud.main import select_backend\n"
+                "select_backend(None, 'local')",
+    '-b gen2': "from lithopscloud.main import select_backend\n"
+               "select_backend(None, 'gen2')",
+}
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def run(snippet, importtime=False):
+    """runs 'snippet' in a fresh interpreter, returns (wall seconds, stderr)"""
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', snippet]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SRC_DIR, os.environ.get('PYTHONPATH')])))
+
+    start = time.perf_counter()
+    res = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+
+    if res.returncode:
+        raise RuntimeError(f'{snippet!r} failed:\n{res.stderr}')
+    return elapsed, res.stderr
+
+
+def import_times(stderr):
+    """returns total import time in seconds and the top level packages sorted by their cumulative import time"""
+    packages = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:  # top level imports only, nested ones are included in them
+            package = match.group(4).split('.')[0]
+            packages[package] = packages.get(package, 0) + int(match.group(2)) / 1e6
+
+    return sum(packages.values()), sorted(packages.items(), key=lambda p: p[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per entry path, the median is reported')
+    parser.add_argument('--top', type=int, default=5, help='slowest top level packages to show per entry path')
+    args = parser.parse_args()
+
+    print(f"{'entry path':<12}{'wall (ms)':>12}{'imports (ms)':>14}  slowest imports")
+    for name, snippet in ENTRY_PATHS.items():
+        wall = statistics.median(run(snippet)[0] for _ in range(args.repeat))
+        total, packages = import_times(run(snippet, importtime=True)[1])
+        slowest = ', '.join(f'{package} {seconds * 1000:.0f}' for package, seconds in packages[:args.top])
+        print(f'{name:<12}{wall * 1000:>12.0f}{total * 1000:>14.0f}  {slowest}')
+
+
+if __name__ == '__main__':
+    main()
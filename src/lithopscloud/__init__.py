@@ -1 +1,2 @@
-from lithopscloud.main import generate_config, delete_config, LITHOPS_GEN2, LITHOPS_CF, LITHOPS_CE, RAY_GEN2, LOCAL_HOST
+from lithopscloud.main import generate_config, delete_config, build_image, generate_config_async, \
+    delete_config_async, set_concurrency_limit, LITHOPS_GEN2, LITHOPS_CF, LITHOPS_CE, RAY_GEN2, LOCAL_HOST
@@ -0,0 +1,85 @@
+import importlib
+import inspect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+from lithopscloud.main import backends, backends_str, generate_config
+
+MAX_BATCH_WORKERS = 4
+SPEC_KEYS = ('name', 'backend', 'output_file')  # the rest of a spec's keys are generate_config arguments
+
+
+def load_manifest(manifest_file):
+    """returns the config specs of a batch manifest, each merged over the manifest's 'defaults', e.g.
+
+        defaults:
+          iam_api_key: <IAM_API_KEY>
+          region: eu-de
+        specs:
+          - name: team-a
+            backend: gen2
+            cos_bucket_name: team-a-bucket
+          - name: team-b
+            backend: ray
+            region: us-south
+            profile_name: bx2-8x32
+            max_workers: 4
+    """
+    with open(manifest_file) as f:
+        manifest = yaml.safe_load(f) or {}
+
+    specs = []
+    for index, spec in enumerate(manifest.get('specs', [])):
+        spec = {**manifest.get('defaults', {}), **spec}
+        spec.setdefault('name', f'spec-{index}')
+
+        if spec.get('backend') not in backends_str:
+            raise Exception(f"Spec {spec['name']}: backend must be one of {list(backends_str)}")
+        if not spec.get('iam_api_key'):
+            raise Exception(f"Spec {spec['name']}: iam_api_key is mandatory")
+
+        config_args = _config_args(backends_str[spec['backend']])
+        unknown_keys = sorted(set(spec) - set(SPEC_KEYS) - config_args) if config_args is not None else []
+        if unknown_keys:
+            raise Exception(f"Spec {spec['name']}: unknown keys {unknown_keys}, "
+                            f"{spec['backend']} specs take {sorted(config_args)}")
+        specs.append(spec)
+
+    return specs
+
+
+def _config_args(backend_name):
+    """returns the generate_config arguments of a backend, i.e. those of its load_config, or None if it has none"""
+    backend = next(b for b in backends if b['name'] == backend_name)
+    load_config = getattr(importlib.import_module(f"lithopscloud.modules.{backend['path']}"), 'load_config', None)
+    if load_config is None:
+        return None
+    return set(inspect.signature(load_config).parameters) - {'backend'}
+
+
+def _generate(spec, output_dir):
+    kwargs = {k: v for k, v in spec.items() if k not in SPEC_KEYS}
+    output_file = spec.get('output_file') or os.path.join(output_dir, f"{spec['name']}.yaml")
+
+    start = time.time()
+    try:
+        generate_config(backends_str[spec['backend']], output_file=output_file, **kwargs)
+        return {'name': spec['name'], 'output_file': output_file, 'seconds': time.time() - start, 'error': None}
+    except Exception as e:
+        # the validation errors of the dialogs, e.g. of an invalid api key, carry their message as their reason
+        error = getattr(e, 'reason', None) or str(e)
+        return {'name': spec['name'], 'output_file': None, 'seconds': time.time() - start, 'error': error}
+
+
+def run_batch(manifest_file, output_dir='.', max_workers=MAX_BATCH_WORKERS):
+    """generates a config file per spec of the manifest, without user interaction.
+    specs are generated concurrently, each in a run context of its own, whatever their account and region. they share
+    the IAM tokens, the connection pools and the session and catalog caches.
+    :returns a result per spec: its output file, or the error that failed it, and the seconds it took"""
+    os.makedirs(output_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda spec: _generate(spec, output_dir), load_manifest(manifest_file)))
@@ -1,11 +1,15 @@
 import importlib
-import pkg_resources
 import os
+import threading
+import time
+import weakref
+
 import click
 import yaml
-from lithopscloud.modules.config_verification import verify_config_file
+from lithopscloud.modules.cache import CATALOG_CACHE
 
-from lithopscloud.modules.utils import get_option_from_list, color_msg, Color, verify_paths
+# modules that import the IBM Cloud SDKs, inquirer, docker or lithops are imported where they're used,
+# so that e.g. `lithopscloud --version` and `--help` don't pay for loading them.
 
 LITHOPS_GEN2, LITHOPS_CF, LITHOPS_CE, RAY_GEN2, LOCAL_HOST = 'Lithops IBM Gen2', 'Lithops IBM Cloud Functions', \
                                                              'Lithops IBM Code Engine', 'Ray IBM Gen2', 'Local Host'
@@ -19,6 +23,12 @@ backends = [
     {'name': LOCAL_HOST, 'path': 'local_host'}
 ]
 
+MAX_CONCURRENT_RUNS = 16  # default concurrency limit of the asyncio API, see set_concurrency_limit
+_concurrency_limit = MAX_CONCURRENT_RUNS
+_semaphores = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore of the concurrency limit
+_runs_in_flight = 0  # of all event loops
+_async_lock = threading.Lock()
+
 backends_str = {'gen2': LITHOPS_GEN2,
                 'cf': LITHOPS_CF,
                 'ce': LITHOPS_CE,
@@ -26,7 +36,18 @@ backends_str = {'gen2': LITHOPS_GEN2,
                 'local': LOCAL_HOST}
 
 
+def package_version():
+    try:
+        from importlib.metadata import version
+    except ImportError:  # python < 3.8
+        import pkg_resources
+        return pkg_resources.get_distribution('lithopscloud').version
+    return version('lithopscloud')
+
+
 def select_backend(input_file, backend_short, default_config_suffix=''):
+    from lithopscloud.modules.utils import get_option_from_list
+
     backend = None
     default = None
     if backend_short:
@@ -95,7 +116,7 @@ def validate_api_keys(base_config, modules, iam_api_key, compute_iam_endpoint, c
     modules = modules[1:]
     return base_config, modules
     
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option('--output-file', '-o', help='Output filename to save configurations')
 @click.option('--input-file', '-i', help=f'Template for the new configuration')
 @click.option('--iam-api-key', '-a', help='IAM_API_KEY')
@@ -108,18 +129,31 @@ def validate_api_keys(base_config, modules, iam_api_key, compute_iam_endpoint, c
 @click.option('--defaults', help=f'Create defaults if not exist and generate default config', is_flag=True)
 @click.option('--backend', '-b', help=f'One of following backends: {backends_str}')
 @click.option('--pr', '-g', help=f'Temporary workaround for ray gen2 only. If specified, use provider setup from PR github', is_flag=True, default=False)
-def builder(iam_api_key, output_file, input_file, version, verify_config, compute_iam_endpoint, cos_iam_api_key, endpoint, backend, defaults, pr):
+@click.option('--no-cache', help='Neither read nor write the on-disk cache of VPC catalog listings', is_flag=True, default=False)
+@click.option('--refresh-cache', help='Discard cached VPC catalog listings and fetch them again', is_flag=True, default=False)
+@click.pass_context
+def builder(ctx, iam_api_key, output_file, input_file, version, verify_config, compute_iam_endpoint, cos_iam_api_key, endpoint, backend, defaults, pr, no_cache, refresh_cache):
     
     if version:
-        print(f"{pkg_resources.get_distribution('lithopscloud').project_name} "
-              f"{pkg_resources.get_distribution('lithopscloud').version}")
+        print(f"lithopscloud {package_version()}")
         exit(0)
 
+    CATALOG_CACHE.enabled = not no_cache
+    if refresh_cache:
+        CATALOG_CACHE.invalidate()
+
+    if ctx.invoked_subcommand:
+        return
+
+    from lithopscloud.modules.context import RunContext
+    from lithopscloud.modules.utils import color_msg, Color, verify_paths
+
     print(color_msg("\nWelcome to lithops cloud config export helper\n", color=Color.YELLOW))
 
     input_file, output_file = verify_paths(input_file, output_file, verify_config)
 
     if verify_config:
+        from lithopscloud.modules.config_verification import verify_config_file
         verify_config_file(verify_config, output_file)
         exit(0)
 
@@ -131,20 +165,22 @@ def builder(iam_api_key, output_file, input_file, version, verify_config, comput
     
     modules = backend_pkg.MODULES
     base_config['create_defaults'] = defaults
-    base_config, modules = validate_api_keys(base_config, modules, iam_api_key, compute_iam_endpoint, cos_iam_api_key)
+    with RunContext(interactive=True):
+        base_config, modules = validate_api_keys(base_config, modules, iam_api_key, compute_iam_endpoint,
+                                                 cos_iam_api_key)
 
-    if endpoint and 'ibm_vpc' in base_config:
-        base_config['ibm_vpc']['endpoint'] = endpoint
-    elif endpoint and 'provider' in base_config:
-        base_config['provider']['endpoint'] = endpoint
+        if endpoint and 'ibm_vpc' in base_config:
+            base_config['ibm_vpc']['endpoint'] = endpoint
+        elif endpoint and 'provider' in base_config:
+            base_config['provider']['endpoint'] = endpoint
 
-    for module in modules:
-        next_module = module(base_config)
-        
-        if defaults:
-            base_config = next_module.create_default()
-        else:
-            base_config = next_module.run()
+        for module in modules:
+            next_module = module(base_config)
+
+            if defaults:
+                base_config = next_module.create_default()
+            else:
+                base_config = next_module.run()
 
     with open(output_file, 'w') as outfile:
         del base_config['create_defaults']
@@ -157,6 +193,51 @@ def builder(iam_api_key, output_file, input_file, version, verify_config, comput
         print(color_msg(f"Cluster config file: {output_file}", color=Color.LIGHTGREEN))
         print("=================================================")
 
+
+@builder.command()
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output-dir', '-d', help='Directory of output files of specs that specify no output_file', default='.')
+@click.option('--workers', '-w', help='Specs generated concurrently', type=int, default=4)
+def batch(manifest, output_dir, workers):
+    """Generate a config file per spec of MANIFEST without user interaction"""
+    from lithopscloud.batch import run_batch
+    from lithopscloud.modules.utils import color_msg, Color
+
+    start = time.time()
+    results = run_batch(manifest, output_dir, workers)
+
+    print("\n\n=================================================")
+    for res in results:
+        if res['error']:
+            print(color_msg(f"{res['name']}: failed after {res['seconds']:.1f}s - {res['error']}", color=Color.RED))
+        else:
+            print(color_msg(f"{res['name']}: {res['output_file']} ({res['seconds']:.1f}s)", color=Color.LIGHTGREEN))
+    print(f"{len(results)} specs in {time.time() - start:.1f}s")
+    print("=================================================")
+
+    if any(res['error'] for res in results):
+        exit(1)
+
+@builder.group()
+def image():
+    """Manage custom VPC images of ray gen2 clusters"""
+
+
+@image.command()
+@click.argument('config_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output-file', '-o', help='Output filename of the updated config, CONFIG_FILE if not specified')
+@click.option('--name', '-n', help='Name of the new image')
+@click.option('--keep-builder', help="Don't delete the builder instance once the image is created", is_flag=True)
+def build(config_file, output_file, name, keep_builder):
+    """Bake the setup commands of the ray gen2 CONFIG_FILE into a custom image, and set the config to use it"""
+    from lithopscloud.modules.utils import color_msg, Color
+
+    output_file = build_image(config_file, output_file, name, keep_builder)
+
+    print("\n\n=================================================")
+    print(color_msg(f"Cluster config file: {output_file}", color=Color.LIGHTGREEN))
+    print("=================================================")
+
 def error(msg):
     print(msg)
     raise Exception(msg)
@@ -175,12 +256,17 @@ def error(msg):
     
 #     return load_base_config(backend)
 
-def generate_config(backend_name, *args, **kwargs):
+def generate_config(backend_name, *args, output_file=None, **kwargs):
+    """generates a config file without user interaction, in a run context of its own, thus concurrent calls, e.g. of
+    different accounts or regions, don't interfere"""
+    from lithopscloud.modules.context import RunContext
+    from lithopscloud.modules.utils import color_msg, Color, verify_paths
+
     def error(msg):
         print(msg)
         raise Exception(msg)
 
-    _, output_file = verify_paths(None, None)
+    _, output_file = verify_paths(None, output_file)
     
     backend = None
     for b in backends:
@@ -197,8 +283,9 @@ def generate_config(backend_name, *args, **kwargs):
     # now find the right modules
     modules = importlib.import_module(f"lithopscloud.modules.{backend['path']}").MODULES
     
-    for module in modules:
-        base_config = module(base_config).verify(base_config)
+    with RunContext():
+        for module in modules:
+            base_config = module(base_config).verify(base_config)
 
     with open(output_file, 'w') as outfile:
         yaml.dump(base_config, outfile, default_flow_style=False)
@@ -218,6 +305,87 @@ def delete_config(config_file_path):
     from lithopscloud.modules.gen2 import delete_config
     delete_config(config)      
     
+def set_concurrency_limit(limit):
+    """sets the number of config generations and deletions of the asyncio API running at once in each event loop, see
+    generate_config_async. MAX_CONCURRENT_RUNS by default. can't be changed while runs are in flight, as these hold
+    the semaphores of the former limit"""
+    global _concurrency_limit
+
+    with _async_lock:
+        if _runs_in_flight:
+            raise RuntimeError(f'Concurrency limit can\'t be changed while {_runs_in_flight} runs are in flight')
+        _concurrency_limit = limit
+        _semaphores.clear()
+
+
+async def _run_async(func, *args, **kwargs):
+    """runs the blocking func on a thread of the event loop's default executor, once the loop's semaphore of the
+    concurrency limit lets it. runs beyond the limit wait for the semaphore rather than in the executor, thus
+    cancel cleanly"""
+    import asyncio
+    global _runs_in_flight
+
+    loop = asyncio.get_running_loop()
+    with _async_lock:
+        if loop not in _semaphores:
+            _semaphores[loop] = asyncio.Semaphore(_concurrency_limit)
+        semaphore = _semaphores[loop]
+        _runs_in_flight += 1
+    try:
+        async with semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+    finally:
+        with _async_lock:
+            _runs_in_flight -= 1
+
+
+async def generate_config_async(backend_name, *args, output_file=None, **kwargs):
+    """asyncio counterpart of generate_config, for services generating many configs at once.
+    the blocking generate_config runs on a thread (asyncio.to_thread), whose SDK calls are issued on the pooled
+    connections, and concurrently by the module chain (see PrefetchConfig). a generation holds its thread while it
+    runs, thus awaited generations beyond the concurrency limit (see set_concurrency_limit) wait for their turn
+    holding none. each generation runs in a context of its own."""
+    return await _run_async(generate_config, backend_name, *args, output_file=output_file, **kwargs)
+
+
+async def delete_config_async(config_file_path):
+    """asyncio counterpart of delete_config, sharing the concurrency limit of generate_config_async"""
+    return await _run_async(delete_config, config_file_path)
+
+# currently implemented only for the ray gen2 backend
+def build_image(config_file_path, output_file=None, image_name=None, keep_builder=False, run_commands=None):
+    """builds a custom image with the setup commands of a ray gen2 config baked in, and updates the config to use it.
+    :param run_commands - see gen2.ray.image_builder.ImageBuilder
+    :returns the path of the updated config file"""
+    with open(config_file_path) as f:
+        config = yaml.safe_load(f)
+
+    if 'provider' not in config:
+        raise Exception('Config file not supported, image build requires a ray gen2 config')
+
+    from lithopscloud.modules.context import RunContext
+    from lithopscloud.modules.gen2.ray.image import RayImageConfig
+    from lithopscloud.modules.gen2.ray.image_builder import ImageBuilder
+    from lithopscloud.modules.gen2.ray.profile import MOUNT_SPILL_DISK
+
+    # the whole build runs in the context, whose clients are of the config's api key and IAM endpoint
+    with RunContext(iam_api_key=config['provider']['iam_api_key'],
+                    compute_iam_endpoint=config['provider'].get('iam_endpoint')):
+        image_config = RayImageConfig(config)
+        image_config.ibm_vpc_client.set_service_url(config['provider']['endpoint'] + '/v1')
+
+        # instance storage is mounted by every node, it isn't part of the image
+        baked_commands = [c for c in config.get('setup_commands') or [] if c != MOUNT_SPILL_DISK]
+        image = ImageBuilder(image_config.ibm_vpc_client, run_commands, keep_builder).build(config, image_name,
+                                                                                            baked_commands)
+        image_config.register_image(image, baked_commands)
+
+    output_file = output_file or config_file_path
+    with open(output_file, 'w') as outfile:
+        yaml.dump(image_config.base_config, outfile, default_flow_style=False)
+    return output_file
+
+
 if __name__ == '__main__':
     try:
         builder()
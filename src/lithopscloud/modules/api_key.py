@@ -18,9 +18,9 @@ class ApiKeyConfig(ConfigBuilder):
     def run(self, api_key=None, compute_iam_endpoint=None, cos_iam_api_key=None) -> Dict[str, Any]:
         # first validate cos_iam_api_key if exists as it uses default iam endpoint
         if cos_iam_api_key:            
-            verify_iam_api_key(None, cos_iam_api_key, iam_endpoint=ConfigBuilder.compute_iam_endpoint)
+            verify_iam_api_key(None, cos_iam_api_key, iam_endpoint=self.compute_iam_endpoint)
             
-        ConfigBuilder.compute_iam_endpoint = compute_iam_endpoint
+        self.compute_iam_endpoint = compute_iam_endpoint
         
         if not api_key:
             default = self.defaults.get('api_key')
@@ -28,9 +28,9 @@ class ApiKeyConfig(ConfigBuilder):
                                   default=default,
                                   validate=verify_iam_api_key)['answer']
 
-        ConfigBuilder.iam_api_key = api_key
+        self.iam_api_key = api_key
         if not cos_iam_api_key:
-            ConfigBuilder.cos_iam_api_key = api_key
+            self.cos_iam_api_key = api_key
         
         return api_key, compute_iam_endpoint, cos_iam_api_key
 
@@ -49,14 +49,14 @@ class ApiKeyConfig(ConfigBuilder):
         api_key = base_config['ibm']['iam_api_key']
         
         if cos_iam_api_key:
-            verify_iam_api_key(None, base_config['ibm_cos']['iam_api_key'], iam_endpoint=ConfigBuilder.compute_iam_endpoint)
+            verify_iam_api_key(None, base_config['ibm_cos']['iam_api_key'], iam_endpoint=self.compute_iam_endpoint)
         else:
-            ConfigBuilder.cos_iam_api_key = api_key
+            self.cos_iam_api_key = api_key
             
-        ConfigBuilder.compute_iam_endpoint = self.base_config['ibm'].get('iam_endpoint')
+        self.compute_iam_endpoint = self.base_config['ibm'].get('iam_endpoint')
         
-        verify_iam_api_key(None, api_key, iam_endpoint=ConfigBuilder.compute_iam_endpoint)
-        ConfigBuilder.iam_api_key = api_key
+        verify_iam_api_key(None, api_key, iam_endpoint=self.compute_iam_endpoint)
+        self.iam_api_key = api_key
             
         return base_config
 
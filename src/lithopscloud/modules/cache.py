@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+CACHE_DIR = os.environ.get('LITHOPSCLOUD_CACHE_DIR', os.path.join(str(Path.home()), '.lithopscloud', 'cache'))
+
+# seconds a cached catalog listing is considered fresh, per resource type
+CATALOG_TTL = {'regions': 7 * 24 * 3600,
+               'zones': 7 * 24 * 3600,
+               'instance_profiles': 24 * 3600,
+               'images': 6 * 3600}
+
+
+class CatalogCache:
+    """Persistent on-disk cache of VPC catalog listings (regions, zones, instance profiles, images).
+
+    Entries are keyed by account (a digest of the api key, never the key itself), service endpoint,
+    API version and an optional scope (e.g. region name), and expire according to CATALOG_TTL."""
+
+    def __init__(self, cache_dir=CACHE_DIR, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+
+    def _path(self, resource, *key):
+        digest = hashlib.sha256('|'.join([resource] + [str(k) for k in key]).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{resource}-{digest[:32]}.json')
+
+    def _load(self, path, ttl):
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get('created', 0) > ttl:
+            return None
+        return entry
+
+    def _store(self, path, data):
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'created': time.time(), 'data': data}, f)
+            os.replace(tmp_path, path)  # atomic, so concurrent runs never read a partially written entry
+        except OSError:
+            pass  # a read-only home directory shouldn't fail config generation
+
+    def get(self, resource, fetch, *key):
+        """returns the cached listing of 'resource' for the given key, calling 'fetch' on a miss.
+        :param resource - one of the CATALOG_TTL keys
+        :param fetch - a no-argument callable returning the (json serializable) listing"""
+        if not self.enabled:
+            return fetch()
+
+        path = self._path(resource, *key)
+        entry = self._load(path, CATALOG_TTL[resource])
+        if entry:
+            return entry['data']
+
+        data = fetch()
+        self._store(path, data)
+        return data
+
+    def invalidate(self, resource=None):
+        """removes cached entries of the specified resource type, or all entries if none was specified"""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json'):
+                continue
+            if resource and not filename.startswith(f'{resource}-'):
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except OSError:
+                pass
+
+
+CATALOG_CACHE = CatalogCache()
+
+
+def account_digest(api_key):
+    """returns a stable, non reversible identifier of the account an api key belongs to"""
+    return hashlib.sha256(str(api_key).encode()).hexdigest()[:16] if api_key else None
+
+
+class SessionCache:
+    """In-process cache shared by all modules of a config generation run, and by consecutive runs in one process.
+
+    Holds memoized responses of SDK list/get calls, keyed by (account, client, endpoint, method, args), thus safely
+    shared by concurrent config generations of different accounts. Plain values of a run (e.g. the selected
+    'resource_group_id') are kept on its context.RunContext.
+    Memoized responses are bounded to 'maxsize' entries with LRU eviction and refetched after 'ttl' seconds."""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._responses = OrderedDict()
+        self._lock = threading.RLock()
+
+    def call(self, client, method, *args, **kwargs):
+        """returns the result of client.method(*args, **kwargs).get_result(), memoized.
+        meant for side effect free SDK calls only, i.e. list_* and get_*.
+        concurrent callers of the same not yet memoized call wait for a single request rather than issuing their own."""
+        return self.memoize(lambda: getattr(client, method)(*args, **kwargs).get_result(),
+                            client, method, *args, **kwargs)
+
+    def memoize(self, fetch, client, method, *args, **kwargs):
+        """returns the result of 'fetch', memoized as a call of client.method(*args, **kwargs), see call.
+        e.g. the objects of all pages of a listing, which are memoized as a call of its SDK method, thus dropped by
+        invalidate(method) along with its pages"""
+
+        authenticator = getattr(client, 'authenticator', None)
+        api_key = getattr(getattr(authenticator, 'token_manager', None), 'apikey', None)
+        key = (account_digest(api_key), type(client).__name__, getattr(client, 'service_url', None),
+               method, args, tuple(sorted(kwargs.items())))
+
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry and time.time() - entry[0] <= self.ttl:
+                self._responses.move_to_end(key)
+                self.hits += 1
+            else:
+                entry = None
+                self.misses += 1
+                future = Future()
+                self._responses[key] = (time.time(), future)
+                self._responses.move_to_end(key)
+                while len(self._responses) > self.maxsize:
+                    self._responses.popitem(last=False)
+
+        if entry:  # awaited out of the lock, as the fetch in flight may memoize calls of its own, e.g. its first page
+            return entry[1].result()
+
+        try:
+            future.set_result(fetch())
+        except Exception as e:
+            with self._lock:
+                if self._responses.get(key, (None, None))[1] is future:
+                    del self._responses[key]  # don't memoize failures
+            future.set_exception(e)
+
+        return future.result()
+
+    def page_fetch(self, client, method, **kwargs):
+        """returns the 'fetch' of pager.iter_pages for the listing client.method(**kwargs), memoizing its first page.
+        the following pages are requested from the SDK, as the cache would otherwise hold streamed listings whole"""
+        def fetch(start=None, **paging):
+            if not start:
+                return self.call(client, method, **kwargs, **paging)
+            return getattr(client, method)(**kwargs, start=start, **paging).get_result()
+        return fetch
+
+    def prefetch(self, executor, client, method, *args, **kwargs):
+        """issues a memoized call on 'executor' and returns its future. errors surface on the first foreground call"""
+        return executor.submit(self.call, client, method, *args, **kwargs)
+
+    def invalidate(self, method=None):
+        """drops memoized responses of the specified SDK method, e.g. after creating a resource of that type.
+        when no method is specified, all memoized responses are dropped."""
+        with self._lock:
+            for key in [k for k in self._responses if not method or k[3] == method]:
+                del self._responses[key]
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'size': len(self._responses), 'maxsize': self.maxsize}
@@ -0,0 +1,124 @@
+import http.cookiejar
+import threading
+from collections import Counter, OrderedDict
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from lithopscloud.modules.cache import account_digest
+
+POOL_MAXSIZE = 16  # keep-alive connections per host, matching the largest thread pools issuing concurrent requests
+NO_COOKIES = http.cookiejar.DefaultCookiePolicy(allowed_domains=[])  # accepts and returns cookies of no domain
+
+
+class ConnectionPools:
+    """Keep-alive requests sessions, one per host, shared by every SDK client and raw http call of the process.
+
+    Consecutive modules, config generations and threads talking to the same host reuse its open TLS connections
+    instead of opening their own. As the sessions serve the requests of all accounts, they keep no cookies."""
+
+    def __init__(self, pool_maxsize=POOL_MAXSIZE):
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}  # host -> requests.Session
+        self._requests = Counter()  # host -> number of requests issued
+        self._lock = threading.Lock()
+
+    def session(self, url):
+        """returns the pooled session of the url's host"""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                session.cookies.set_policy(NO_COOKIES)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[host] = session
+            self._requests[host] += 1
+            return self._sessions[host]
+
+    def request(self, method, url, **kwargs):
+        return self.session(url).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        """returns per host: requests issued, connections opened and idle connections kept alive"""
+        with self._lock:
+            sessions = dict(self._sessions)
+            stats = {host: {'requests': self._requests[host], 'connections': 0, 'idle': 0} for host in sessions}
+
+        for host, session in sessions.items():
+            pools = session.adapters['https://'].poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool:
+                    stats[host]['connections'] += pool.num_connections
+                    # the pool's queue holds its idle connections, padded with None up to pool_maxsize
+                    stats[host]['idle'] += sum(conn is not None for conn in list(pool.pool.queue)) if pool.pool else 0
+        return stats
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+POOLS = ConnectionPools()
+
+
+class PooledSession(requests.Session):
+    """hands the requests of an SDK client to the pooled session of their host, which follows the client's service
+    url, e.g. the regional endpoint VpcV1 is pointed at. the cookies of the client's own jar are sent along, while
+    cookies set by responses are kept by neither session"""
+
+    def __init__(self):
+        super().__init__()
+        self.cookies.set_policy(NO_COOKIES)
+
+    def request(self, method, url, **kwargs):
+        return POOLS.request(method, url, **kwargs)
+
+
+# (client class, api key digest, IAM endpoint, args) -> SDK client. bounded, evicting the least recently used clients,
+# as long running services generate configs of many accounts
+CLIENTS = OrderedDict()
+MAX_CLIENTS = 128
+_clients_lock = threading.Lock()
+
+
+def new_client(client_class, api_key, iam_endpoint=None, *args, **kwargs):
+    """returns a new SDK client of 'client_class', e.g. VpcV1, authenticated by the shared token broker of the api key
+    and sending its requests over the pooled sessions. meant for clients whose service url is set by their user."""
+    from lithopscloud.modules.iam import get_authenticator
+
+    client = client_class(*args, authenticator=get_authenticator(api_key, iam_endpoint), **kwargs)
+    client.set_http_client(PooledSession())
+    return client
+
+
+def get_client(client_class, api_key, iam_endpoint=None, *args, **kwargs):
+    """returns the SDK client of 'client_class' for the api key, e.g. ResourceManagerV2, created once per process.
+    see new_client"""
+    key = (client_class, account_digest(api_key), iam_endpoint or None, args, tuple(sorted(kwargs.items())))
+    with _clients_lock:
+        if key not in CLIENTS:
+            CLIENTS[key] = new_client(client_class, api_key, iam_endpoint, *args, **kwargs)
+            while len(CLIENTS) > MAX_CLIENTS:
+                CLIENTS.popitem(last=False)
+        CLIENTS.move_to_end(key)
+        return CLIENTS[key]
+
+
+def evict_clients(api_key):
+    """drops the SDK clients of the api key, e.g. of a key that failed validation"""
+    digest = account_digest(api_key)
+    with _clients_lock:
+        for key in [key for key in CLIENTS if key[1] == digest]:
+            del CLIENTS[key]
@@ -1,12 +1,12 @@
-import http.client
-import json
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any
-import requests
+from lithopscloud.modules.clients import POOLS
 from lithopscloud.modules.config_builder import ConfigBuilder, spinner
 from lithopscloud.modules.utils import free_dialog, color_msg, Color, NEW_INSTANCE, inquire_user
 
 CF_REGIONS = ['eu-de', 'eu-gb', 'us-south', 'us-east', 'au-syd', 'jp-tok']
+NAMESPACES_PAGE_LIMIT = 200  # max namespaces per response of the namespaces API
 
 
 class CloudFunction(ConfigBuilder):
@@ -73,13 +73,49 @@ class CloudFunction(ConfigBuilder):
                         which may contain up to 200 namespaces per http response"""
 
         iam_token = self.get_oauth_token()
-        conn = http.client.HTTPSConnection(f"{region}.functions.cloud.ibm.com")
-        conn.request("GET", f"/api/v1/namespaces?limit=200&offset={offset}", headers={'Authorization': iam_token})
-        res = conn.getresponse()
-        metadata = res.read().decode("utf-8")
-        json_struct = json.loads(metadata)  # turn string to a dictionary
+        res = POOLS.get(f"https://{region}.functions.cloud.ibm.com/api/v1/namespaces",
+                        params={'limit': NAMESPACES_PAGE_LIMIT, 'offset': offset},
+                        headers={'Authorization': iam_token})
+        return res.json()
+
+    def get_region_namespaces(self, region):
+        """returns relevant metadata on existing namespaces within a region, fetching all pages over the region's
+        keep-alive connections"""
+        namespaces = []
+        offset = 0
+
+        #  request for namespaces is limited to 200 at a time, thus the request is fulfilled in increments of 200s.
+        while True:
+            namespace_metadata = self.get_cloud_function_namespaces_metadata(region, offset)
+            page = namespace_metadata['namespaces']
+
+            for name_space in page:
+                if 'name' in name_space:  # API based namespace
+                    namespaces.append({'name': name_space['name'], 'type': 'API_based', 'id': name_space['id'],
+                                       'region': name_space['location']})
+
+                else:  # cloud foundry based namespace
+                    namespaces.append(
+                        {'name': name_space['id'], 'type': 'CF_based', 'region': name_space['location']})
+
+            # 'total_count' is the number of namespaces in the region, not in the page
+            offset += len(page)
+            if not page or offset >= namespace_metadata.get('total_count', 0):
+                break
+
+        return namespaces
+
+    def iter_cloud_function_namespaces(self, selected_region=''):
+        """yields relevant metadata on existing namespaces within a given region, or all regions if none was selected.
+        regions are enumerated concurrently and their namespaces are yielded as soon as each region completes."""
+        regions = [selected_region] if selected_region else CF_REGIONS
 
-        return json_struct
+        executor = ThreadPoolExecutor(max_workers=len(regions))
+        try:
+            for future in as_completed([executor.submit(self.get_region_namespaces, region) for region in regions]):
+                yield from future.result()
+        finally:
+            executor.shutdown(wait=False)  # a consumer that stopped early doesn't wait for the remaining regions
 
     @spinner
     def get_cloud_function_namespaces(self, selected_region=''):
@@ -88,31 +124,7 @@ class CloudFunction(ConfigBuilder):
             else "Obtaining all existing Cloud Function namespaces"
         print(msg + '...\n')
 
-        namespaces = []
-
-        for region in [selected_region] if selected_region else CF_REGIONS:
-            collecting_namespaces = True
-            max_limit = 200
-            offset = 0
-
-            #  request for namespaces is limited to 200 at a time, thus the request is fulfilled in increments of 200s.
-            while collecting_namespaces:
-                namespace_metadata = self.get_cloud_function_namespaces_metadata(region, offset)
-                if namespace_metadata['total_count'] == max_limit:
-                    offset += max_limit
-                else:
-                    collecting_namespaces = False
-
-                for name_space in namespace_metadata['namespaces']:
-                    if 'name' in name_space:  # API based namespace
-                        namespaces.append({'name': name_space['name'], 'type': 'API_based', 'id': name_space['id'],
-                                           'region': name_space['location']})
-
-                    else:  # cloud foundry based namespace
-                        namespaces.append(
-                            {'name': name_space['id'], 'type': 'CF_based', 'region': name_space['location']})
-
-        return namespaces
+        return list(self.iter_cloud_function_namespaces(selected_region))
 
     def create_cloud_function_namespaces(self, region):
         """creates a name space in a given region, under a specified resource group and returns the namespace id"""
@@ -120,8 +132,8 @@ class CloudFunction(ConfigBuilder):
         @spinner
         def request_new_namespace():
             print("Creating a new namespace...")
-            return requests.post(f'https://{region}.functions.cloud.ibm.com/api/v1/namespaces',
-                                 headers=headers, json=data).json()
+            return POOLS.post(f'https://{region}.functions.cloud.ibm.com/api/v1/namespaces',
+                              headers=headers, json=data).json()
 
         iam_token = self.get_oauth_token()
         resource_group_id = self.select_resource_group()
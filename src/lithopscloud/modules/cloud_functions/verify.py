@@ -1,8 +1,8 @@
 import ast
 import base64
-import http.client
 
 from lithopscloud.modules.api_key import ApiKeyConfig
+from lithopscloud.modules.clients import POOLS
 from lithopscloud.modules.cloud_functions import CloudFunction
 from lithopscloud.modules.cloud_functions.cloud_function import CF_REGIONS
 from lithopscloud.modules.utils import color_msg, ARG_STATUS, Color, inquire_user, get_confirmation
@@ -58,7 +58,8 @@ def verify(base_config):
         elif iam_api_key != ARG_STATUS.INVALID:
             params_matched = 0
             cf = CloudFunction(base_config)
-            namespaces = cf.get_cloud_function_namespaces()
+            # stops enumerating as soon as a region holding the namespace completes
+            namespaces = cf.iter_cloud_function_namespaces()
             matched_namespace = next((space for space in namespaces if space['type'] == 'API_based' and space['id'] == namespace_id),None)
 
             if not matched_namespace:
@@ -124,11 +125,9 @@ def verify_cf_api_key(api_key):
     iam_token = 'Basic %s' % auth_token.decode('UTF-8')
 
     for region in CF_REGIONS:
-        conn = http.client.HTTPSConnection(f"{region}.functions.cloud.ibm.com")
-        conn.request("GET", f"/api/v1/namespaces",
-                     headers={'content-type': 'application/json', 'Authorization': iam_token})
-        res = conn.getresponse()
-        namespace = res.read().decode("utf-8")
+        res = POOLS.get(f"https://{region}.functions.cloud.ibm.com/api/v1/namespaces",
+                        headers={'content-type': 'application/json', 'Authorization': iam_token})
+        namespace = res.content.decode("utf-8")
         namespace = ast.literal_eval(namespace)  # turn string to represented datatype, e.g. '[]' to list
 
         if 'error' not in namespace:
@@ -1,10 +1,10 @@
 import sys
-import requests
 import yaml
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
 from ibm_code_engine_sdk.ibm_cloud_code_engine_v1 import IbmCloudCodeEngineV1
-from lithopscloud.modules.utils import CACHE, free_dialog, retry_on_except, color_msg, Color, NEW_INSTANCE, inquire_user
+from lithopscloud.modules.utils import free_dialog, retry_on_except, color_msg, Color, NEW_INSTANCE, inquire_user
+from lithopscloud.modules.clients import POOLS, new_client
 from lithopscloud.modules.config_builder import ConfigBuilder, spinner
+from lithopscloud.modules.iam import get_token_broker
 from typing import Any, Dict
 
 CE_REGIONS = []
@@ -50,24 +50,12 @@ class CodeEngine(ConfigBuilder):
         def _get_kubeconfig_response():
             return ce_client.get_kubeconfig(x_delegated_refresh_token=delegated_refresh_token, id=project_instance['guid'])
 
-        ce_client = IbmCloudCodeEngineV1(authenticator=IAMAuthenticator(apikey=self.base_config['ibm']['iam_api_key'], url=ConfigBuilder.compute_iam_endpoint))
+        iam_api_key = self.base_config['ibm']['iam_api_key']
+        ce_client = new_client(IbmCloudCodeEngineV1, iam_api_key, self.compute_iam_endpoint)
         ce_client.set_service_url(f"https://api.{project_instance['region']}.codeengine.cloud.ibm.com/api/v1")
 
-        iam_token_url = 'https://iam.cloud.ibm.com/identity/token'
-        if ConfigBuilder.compute_iam_endpoint:
-            iam_token_url = ConfigBuilder.compute_iam_endpoint + '/identity/token'
-            
-        iam_response = requests.post(iam_token_url,
-                                     headers={'Content-Type': 'application/x-www-form-urlencoded'},
-                                     data={
-                                         'grant_type': 'urn:ibm:params:oauth:grant-type:apikey',
-                                         'apikey': self.base_config['ibm']['iam_api_key'],
-                                         'response_type': 'delegated_refresh_token',
-                                         'receiver_client_ids': 'ce',
-                                         'delegated_refresh_token_expiry': '3600'
-                                     })
-
-        delegated_refresh_token = iam_response.json()['delegated_refresh_token']
+        broker = get_token_broker(iam_api_key, self.compute_iam_endpoint)
+        delegated_refresh_token = broker.get_delegated_refresh_token('ce')
 
         kubeconfig_response = _get_kubeconfig_response()
         kubeconfig_string = kubeconfig_response.get_result().content.decode("utf-8")
@@ -109,9 +97,10 @@ class CodeEngine(ConfigBuilder):
             response = self.resource_controller_service.create_resource_instance(
                 name=name,
                 target=region,
-                resource_group=CACHE['resource_group_id'],
+                resource_group=self.context.values['resource_group_id'],
                 resource_plan_id='814fb158-af9c-4d3c-a06b-c7da42392845'
             ).get_result()
+            self.session_cache.invalidate('list_resource_instances')
         except Exception as e:
             print(color_msg(f"Couldn't create new code engine project.\n{e} ", color=Color.RED))
             sys.exit(1)  # used sys.exit instead of exception to cancel traceback that will hide the error message
@@ -125,7 +114,7 @@ class CodeEngine(ConfigBuilder):
 @retry_on_except(retries=3, sleep_duration=7)
 def init_ce_region_list():
     """initializes a list of the available regions in which a user can create a code engine project"""
-    response = requests.get(
+    response = POOLS.get(
         'https://globalcatalog.cloud.ibm.com/api/v1/814fb158-af9c-4d3c-a06b-c7da42392845/%2A').json()
     for resource in response['resources']:
         CE_REGIONS.append(resource['geo_tags'][0])
@@ -6,11 +6,7 @@ import tempfile
 import types
 from typing import Any, Dict
 
-import docker
-import lithops
 from inquirer import errors
-from lithops.scripts import cli
-from lithops.utils import verify_runtime_name
 from lithopscloud.modules.runtime import RuntimeConfig, update_decorator
 from lithopscloud.modules.utils import (Color, color_msg, free_dialog,
                                         get_option_from_list)
@@ -26,6 +22,8 @@ class CERuntimeConfig(RuntimeConfig):
 
     @update_decorator
     def run(self) -> Dict[str, Any]:
+        import docker
+        import lithops
 
         AUTO = 'Automatically'
         USER_INPUT = 'User input'
@@ -119,6 +117,8 @@ class CERuntimeConfig(RuntimeConfig):
         return runtime
 
     def _extend_image(self, base_docker_image):
+        from lithops.scripts import cli
+        from lithops.utils import verify_runtime_name
 
         def validate_modules_exist(answers, answer):
             if not answer:
@@ -1,12 +1,10 @@
 import os
 
-import docker
-
 from lithopscloud.modules.api_key import ApiKeyConfig
 from lithopscloud.modules.code_engine import CodeEngine, CERuntimeConfig
 from lithopscloud.modules.code_engine.code_engine import init_ce_region_list, CE_REGIONS
 from lithopscloud.modules.config_builder import spinner
-from lithopscloud.modules.utils import CACHE, ARG_STATUS, color_msg, Color, get_confirmation
+from lithopscloud.modules.utils import ARG_STATUS, color_msg, Color, get_confirmation
 
 
 def verify(base_config):
@@ -32,12 +30,12 @@ def verify(base_config):
             namespace = ce_config['namespace']
             match_found = False
             ce = CodeEngine(base_config)
-            resource_groups = ce.resource_service_client.list_resource_groups().get_result()['resources']
+            resource_groups = ce.session_cache.call(ce.resource_service_client, 'list_resource_groups')['resources']
 
             for res_grp in resource_groups:
                 if match_found:
                     break
-                CACHE['resource_group_id'] = res_grp['id']
+                ce.context.values['resource_group_id'] = res_grp['id']
                 projects = ce.get_ce_instances(verbose=False)
 
                 for project in projects:
@@ -137,6 +135,7 @@ def verify_runtime(base_config, kubeconfig):
                 return True
 
     if 'runtime' in base_config['code_engine']:
+        import docker
         client = docker.from_env()
         try:
             client.images.get_registry_data(base_config['code_engine']['runtime'])
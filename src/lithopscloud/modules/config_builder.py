@@ -1,16 +1,24 @@
 import logging
 from typing import Any, Dict
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
-from ibm_platform_services import ResourceControllerV2, ResourceManagerV2
-from ibm_vpc import VpcV1
-from ibm_watson import IAMTokenManager
 import threading
 import time
 import sys
-from lithopscloud.modules.utils import CACHE, find_default, get_option_from_list
+from lithopscloud.modules.cache import CATALOG_CACHE, SessionCache
+from lithopscloud.modules.clients import get_client
+from lithopscloud.modules.context import current_context
+from lithopscloud.modules.pager import iter_pages
+from lithopscloud.modules.utils import find_default, get_option_from_list
 
 logger = logging.getLogger(__name__)
 
+# VPC catalog listings served by ConfigBuilder.get_catalog:
+# resource -> (VpcV1 method, key of the listed objects, fields the modules use of paginated listings)
+CATALOG_LISTINGS = {'regions': ('list_regions', 'regions', None),
+                    'zones': ('list_region_zones', 'zones', None),
+                    'instance_profiles': ('list_instance_profiles', 'profiles',
+                                          ('name', 'family', 'vcpu_count', 'memory', 'bandwidth', 'gpu_count', 'disks')),
+                    'images': ('list_images', 'images', ('id', 'name', 'minimum_provisioned_size', 'owner_type'))}
+
 
 def update_decorator(f):
     def foo(*args, **kwargs):
@@ -27,39 +35,45 @@ def update_decorator(f):
     return foo
 
 
+def context_attribute(name):
+    """returns a property of the module's run context attribute 'name', see context.RunContext"""
+    return property(lambda self: getattr(self.context, name), lambda self, value: setattr(self.context, name, value))
+
+
 class ConfigBuilder:
     """
     Interface for building IBM Cloud config files for Lithops and Ray
     """
-    iam_api_key, ibm_vpc_client, resource_service_client, resource_controller_service, compute_iam_endpoint, cos_iam_api_key, region = None, None, None, None, None, None, None
+    # state of the config generation the module takes part in, kept on its run context
+    iam_api_key = context_attribute('iam_api_key')
+    compute_iam_endpoint = context_attribute('compute_iam_endpoint')
+    cos_iam_api_key = context_attribute('cos_iam_api_key')
+    region = context_attribute('region')
+    session_cache = SessionCache()  # shared by all modules, and across config generations in the same process
 
     def __init__(self, base_config: Dict[str, Any]) -> None:
 
+        self.context = current_context()
         self.defaults = {}
-        if not ConfigBuilder.iam_api_key:
+        if not self.iam_api_key:
             if 'ibm' in base_config and 'iam_api_key' in base_config['ibm']:
-                ConfigBuilder.iam_api_key = base_config['ibm']['iam_api_key']
+                self.iam_api_key = base_config['ibm']['iam_api_key']
             elif 'provider' in base_config and 'iam_api_key' in base_config['provider']:
-                ConfigBuilder.iam_api_key = base_config['provider']['iam_api_key']
+                self.iam_api_key = base_config['provider']['iam_api_key']
 
-        if not ConfigBuilder.ibm_vpc_client and ConfigBuilder.iam_api_key:
-            authenticator = IAMAuthenticator(ConfigBuilder.iam_api_key, url=ConfigBuilder.compute_iam_endpoint)
-            ConfigBuilder.ibm_vpc_client = VpcV1(
-                '2021-01-19', authenticator=authenticator)
-            ConfigBuilder.resource_service_client = ResourceManagerV2(
-                authenticator=authenticator)
-            ConfigBuilder.resource_controller_service = ResourceControllerV2(
-                authenticator=authenticator)
-
-        self.init_clients(ConfigBuilder.iam_api_key, ConfigBuilder.compute_iam_endpoint)
+        self.context.init_clients()  # none for runs without an api key, e.g. of the local host backend
+        self.ibm_vpc_client = self.context.ibm_vpc_client
+        self.resource_service_client = self.context.resource_service_client
+        self.resource_controller_service = self.context.resource_controller_service
 
         self.base_config = base_config
 
     def init_clients(self, iam_api_key, iam_endpoint=None):
-        authenticator = IAMAuthenticator(iam_api_key, url=iam_endpoint)
-        self.ibm_vpc_client = ConfigBuilder.ibm_vpc_client
-        self.resource_service_client = ResourceManagerV2(authenticator=authenticator)
-        self.resource_controller_service = ResourceControllerV2(authenticator=authenticator)
+        """sets the resource clients of the module to those of another api key, e.g. the cos api key"""
+        from ibm_platform_services import ResourceControllerV2, ResourceManagerV2
+
+        self.resource_service_client = get_client(ResourceManagerV2, iam_api_key, iam_endpoint)
+        self.resource_controller_service = get_client(ResourceControllerV2, iam_api_key, iam_endpoint)
 
 
     """Interacts with user to get all required parameters"""
@@ -83,20 +97,21 @@ class ConfigBuilder:
         :return: resources belonging to a specific resource group, filtered by provided resource_type
         """
 
-        if 'resource_group_id' not in CACHE:
+        if 'resource_group_id' not in self.context.values:
             self.select_resource_group()
 
         @spinner
         def _get_resources():
-            res = self.resource_controller_service.list_resource_instances(
-                resource_group_id=CACHE['resource_group_id'], type=resource_type).get_result()
-            resource_instances = res['resources']
+            res = self.session_cache.call(self.resource_controller_service, 'list_resource_instances',
+                                          resource_group_id=self.context.values['resource_group_id'],
+                                          type=resource_type)
+            resource_instances = list(res['resources'])
 
             while res['next_url']:
                 start = res['next_url'].split('start=')[1]
-                res = self.resource_controller_service.list_resource_instances(
-                    resource_group_id=CACHE['resource_group_id'], type=resource_type,
-                    start=start).get_result()
+                res = self.session_cache.call(self.resource_controller_service, 'list_resource_instances',
+                                              resource_group_id=self.context.values['resource_group_id'],
+                                              type=resource_type, start=start)
 
                 resource_instances.extend(res['resources'])
             return resource_instances
@@ -105,26 +120,54 @@ class ConfigBuilder:
 
     def select_resource_group(self):
         """returns resource group id of a resource group the user will be prompted to pick.
-        stores result in CACHE['resource_group_id'] for further usage"""
+        stores result in the run context's values['resource_group_id'] for further usage"""
 
         @spinner
         def get_resource_groups():
-            return self.resource_service_client.list_resource_groups().get_result()['resources']
+            return self.session_cache.call(self.resource_service_client, 'list_resource_groups')['resources']
 
         res_group_objects = get_resource_groups()
 
         default = find_default(self.defaults, res_group_objects, id='resource_group_id')
         res_group_obj = get_option_from_list("Select resource group", res_group_objects, default=default)
 
-        CACHE['resource_group_id'] = res_group_obj['id']  # cache group resource id for later use in storage
+        self.context.values['resource_group_id'] = res_group_obj['id']  # cache group resource id for later use in storage
 
         return res_group_obj['id']
 
+    def get_catalog(self, resource, *args):
+        """returns a VPC catalog listing (see CATALOG_LISTINGS), served from the on-disk cache while it's fresh.
+        :param args - arguments of the listing SDK method, e.g. region name of the 'zones' listing"""
+
+        client = self.ibm_vpc_client
+        method, result_key, fields = CATALOG_LISTINGS[resource]
+
+        def fetch():
+            if fields:  # paginated, e.g. the images of a region run into thousands
+                return self.list_all(method, result_key, fields)
+            return self.session_cache.call(client, method, *args)[result_key]
+
+        return CATALOG_CACHE.get(resource, fetch, self.iam_api_key, client.service_url, client.version, *args)
+
+    def iter_all(self, method, result_key, fields=None, **filters):
+        """yields the objects of all pages of a VPC listing, filtered server side and streamed page by page.
+        its first page is memoized, see SessionCache.page_fetch.
+        :param fields - the fields of the objects to keep, e.g. ('id', 'name', 'zone.name'), all if not specified
+        :param filters - filters of the listing SDK method, e.g. vpc_id, zone_name or resource_group_id"""
+        return iter_pages(self.session_cache.page_fetch(self.ibm_vpc_client, method, **filters), result_key, fields)
+
+    def list_all(self, method, result_key, fields=None, **filters):
+        """returns the objects of all pages of a VPC listing, see iter_all. unlike iter_all's, the whole listing is
+        memoized, thus a listing prefetched by PrefetchConfig is awaited rather than fetched again"""
+        objects = self.session_cache.memoize(lambda: list(self.iter_all(method, result_key, fields, **filters)),
+                                             self.ibm_vpc_client, method, ('all', result_key, fields), **filters)
+        return list(objects)  # a copy, as callers may append to it
+
     def get_oauth_token(self):
         """:returns a temporary authentication token required by various IBM cloud APIs """
+        from lithopscloud.modules.iam import get_token_broker
 
-        iam_token_manager = IAMTokenManager(apikey=self.base_config['ibm']['iam_api_key'], url=ConfigBuilder.compute_iam_endpoint)
-        return iam_token_manager.get_token()
+        return get_token_broker(self.base_config['ibm']['iam_api_key'], self.compute_iam_endpoint).get_token()
 
     @update_decorator
     def verify(self, base_config):
@@ -158,6 +201,9 @@ class Spinner(threading.Thread):
 
 def spinner(f):
     def foo(*args, **kwargs):
+        if not current_context().interactive:  # e.g. of generate_config, which may run many times at once
+            return f(*args, **kwargs)
+
         s = Spinner()
         s.daemon = True
         s.start()
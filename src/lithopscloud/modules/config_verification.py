@@ -3,6 +3,7 @@ import os
 import yaml
 from inquirer import errors
 from lithopscloud.modules.api_key import verify_iam_api_key
+from lithopscloud.modules.context import RunContext
 from lithopscloud.modules.utils import color_msg, Color, ARG_STATUS, MSG_STATUS, free_dialog, inquire_user
 
 # TODO: change ibm_cos path to cos after cos-package name changes to cos
@@ -56,15 +57,16 @@ def verify_config_file(config_file, output_file):
     storage_path = next((x['path'] for x in CONFIGURABLE_STORAGE if x['config_title'] == chosen_storage))
     compute_path = next((x['path'] for x in CONFIGURABLE_COMPUTE if x['config_title'] == chosen_compute))
 
-    for path in [storage_path, compute_path]:
-        verify_module = importlib.import_module(f"lithopscloud.modules.{path}.verify")
-        verify_func = verify_module.__getattribute__('verify')
-        res = verify_func(base_config)
-        if res:
-            output_config.update(res)
-        else:
-            print(color_msg(f"{MSG_STATUS.ERROR.value} Couldn't produce a valid lithops config file from input", Color.RED))
-            exit(1)
+    with RunContext(interactive=True):  # the modules of both backends share the credentials and clients of the config
+        for path in [storage_path, compute_path]:
+            verify_module = importlib.import_module(f"lithopscloud.modules.{path}.verify")
+            verify_func = verify_module.__getattribute__('verify')
+            res = verify_func(base_config)
+            if res:
+                output_config.update(res)
+            else:
+                print(color_msg(f"{MSG_STATUS.ERROR.value} Couldn't produce a valid lithops config file from input", Color.RED))
+                exit(1)
 
     with open(output_file, 'w') as outfile:
         yaml.dump(output_config, outfile, default_flow_style=False)
@@ -0,0 +1,61 @@
+import contextvars
+import threading
+
+from lithopscloud.modules.clients import get_client, new_client
+
+
+class RunContext:
+    """Credentials, clients, region and plain values (e.g. the selected 'resource_group_id') of a single config
+    generation, shared by the modules of its chain.
+
+    Modules take the context active when they're constructed, see current_context. Config generations of different
+    accounts or regions run concurrently in their own contexts, e.g. in threads of a batch or in asyncio tasks, while
+    sharing the process wide session cache, catalog cache, token brokers and connection pools."""
+
+    def __init__(self, iam_api_key=None, compute_iam_endpoint=None, cos_iam_api_key=None, region=None,
+                 interactive=False):
+        self.iam_api_key = iam_api_key
+        self.compute_iam_endpoint = compute_iam_endpoint
+        self.cos_iam_api_key = cos_iam_api_key
+        self.region = region
+        self.interactive = interactive  # whether a user follows the run on a terminal, e.g. sees its spinners
+        self.ibm_vpc_client, self.resource_service_client, self.resource_controller_service = None, None, None
+        self.values = {}
+        self._clients_key = None  # (api key, IAM endpoint) the clients were created for
+        self._lock = threading.Lock()
+        self._tokens = []
+
+    def init_clients(self):
+        """creates the clients of the context's api key, on first use and once the api key changes, e.g. when the user
+        replaces the key of the template. the vpc client is the context's own, as the endpoint modules point it at the
+        region of the run"""
+        with self._lock:
+            if not self.iam_api_key or self._clients_key == (self.iam_api_key, self.compute_iam_endpoint):
+                return
+
+            # imported once clients are due, as runs without an api key, e.g. of the local host backend, use no SDK
+            from ibm_platform_services import ResourceControllerV2, ResourceManagerV2
+            from ibm_vpc import VpcV1
+
+            self._clients_key = (self.iam_api_key, self.compute_iam_endpoint)
+            self.ibm_vpc_client = new_client(VpcV1, self.iam_api_key, self.compute_iam_endpoint, '2021-01-19')
+            self.resource_service_client = get_client(ResourceManagerV2, self.iam_api_key, self.compute_iam_endpoint)
+            self.resource_controller_service = get_client(ResourceControllerV2, self.iam_api_key,
+                                                          self.compute_iam_endpoint)
+
+    def __enter__(self):
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._tokens.pop())
+        return False
+
+
+_current = contextvars.ContextVar('lithopscloud_run_context', default=None)
+DEFAULT_CONTEXT = RunContext(interactive=True)  # of modules constructed outside of a run, e.g. by scripts driving single modules
+
+
+def current_context():
+    """returns the context of the config generation running in the current thread or asyncio task"""
+    return _current.get() or DEFAULT_CONTEXT
@@ -1,16 +1,31 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
 import ibm_boto3
 import ibm_botocore
-from ibm_botocore.credentials import DefaultTokenManager
 from ibm_botocore.exceptions import ClientError, CredentialRetrievalError
 from ibm_botocore.client import Config
 
 from lithopscloud.modules.api_key import ApiKeyConfig
+from lithopscloud.modules.cache import account_digest
+from lithopscloud.modules.iam import get_cos_token_manager
 from lithopscloud.modules.utils import ARG_STATUS, color_msg, Color, inquire_user, NEW_INSTANCE, get_confirmation
 from lithopscloud.modules.cos import init_cos_region_list, BUCKET_REGIONS, get_cos_instances, CosConfig
 
 KEY_TYPE = Enum('TYPE', 'API HMAC')  # available types of identification for the ibm_cf service
 PUBLIC_ENDPOINT_TEMPLATE = 'https://s3.{}.cloud-object-storage.appdomain.cloud'
+MAX_PROBE_WORKERS = 8  # regions probed concurrently when searching for a bucket
+
+# s3 clients keyed by (credentials digest, endpoint), reused across regions and verifications.
+# clients of an api key share its token broker, so probes don't exchange the api key for a token again.
+# both are bounded, evicting the least recently used entries, as long running services verify many accounts
+COS_CLIENTS = OrderedDict()
+BUCKET_ENDPOINTS = OrderedDict()  # (credentials digest, bucket) -> endpoint the bucket was found in
+MAX_COS_CLIENTS = 64  # a client per region of a few accounts
+MAX_BUCKET_ENDPOINTS = 256
+_clients_lock = threading.Lock()
+_endpoints_lock = threading.Lock()
 
 
 def verify(base_config):
@@ -157,15 +172,7 @@ def test_apikey_and_bucket(key, key_type: KEY_TYPE, endpoint=None, bucket=None):
     if not bucket:  # verify key given with placeholder values
         bucket = dummy_bucket
         endpoint = PUBLIC_ENDPOINT_TEMPLATE.format('eu-de')
-    if key_type == KEY_TYPE.API:  # iamapikey or cloud foundry api
-        client_config = ibm_botocore.client.Config(signature_version='oauth')
-        token_manager = DefaultTokenManager(api_key_id=key)
-        cos_client = ibm_boto3.client('s3', token_manager=token_manager,
-                                      endpoint_url=endpoint, config=client_config)
-    else:  # HMAC key
-        cos_client = ibm_boto3.client('s3',aws_access_key_id=key[0],
-                                      aws_secret_access_key=key[1],
-                                      endpoint_url=endpoint)
+    cos_client = get_cos_client(key, key_type, endpoint)
 
     try:
         cos_client.get_bucket_location(Bucket=bucket)
@@ -178,6 +185,69 @@ def test_apikey_and_bucket(key, key_type: KEY_TYPE, endpoint=None, bucket=None):
             raise
 
 
+def get_cos_client(key, key_type: KEY_TYPE, endpoint):
+    """:returns a pooled s3 client of the provided credentials for the endpoint, creating it on first use"""
+
+    digest = account_digest(key)
+    with _clients_lock:  # creating clients of the default boto session isn't thread safe
+        if (digest, endpoint) not in COS_CLIENTS:
+            if key_type == KEY_TYPE.API:  # iamapikey or cloud foundry api
+                client_config = ibm_botocore.client.Config(signature_version='oauth')
+                cos_client = ibm_boto3.client('s3', token_manager=get_cos_token_manager(key),
+                                              endpoint_url=endpoint, config=client_config)
+            else:  # HMAC key
+                cos_client = ibm_boto3.client('s3', aws_access_key_id=key[0],
+                                              aws_secret_access_key=key[1],
+                                              endpoint_url=endpoint)
+            COS_CLIENTS[(digest, endpoint)] = cos_client
+            while len(COS_CLIENTS) > MAX_COS_CLIENTS:
+                COS_CLIENTS.popitem(last=False)
+
+        COS_CLIENTS.move_to_end((digest, endpoint))
+        return COS_CLIENTS[(digest, endpoint)]
+
+
+def find_bucket_endpoint(key, key_type, bucket):
+    """:returns the endpoint of the region the bucket is located in, else None.
+        regions are probed concurrently, the first region found holding the bucket cancels the remaining probes.
+        the result is cached, so later verifications of the bucket probe a single region only. """
+
+    cache_key = (account_digest(key), bucket)
+    with _endpoints_lock:
+        cached_endpoint = BUCKET_ENDPOINTS.get(cache_key)
+        if cached_endpoint:
+            BUCKET_ENDPOINTS.move_to_end(cache_key)
+    if cached_endpoint:
+        try:
+            test_apikey_and_bucket(key, key_type, cached_endpoint, bucket)
+            return cached_endpoint
+        except Exception:
+            with _endpoints_lock:
+                BUCKET_ENDPOINTS.pop(cache_key, None)  # bucket was deleted or moved, search again
+
+    endpoints = [PUBLIC_ENDPOINT_TEMPLATE.format(region) for region in BUCKET_REGIONS]
+    executor = ThreadPoolExecutor(max_workers=MAX_PROBE_WORKERS)
+    futures = {executor.submit(test_apikey_and_bucket, key, key_type, endpoint, bucket): endpoint
+               for endpoint in endpoints}
+
+    found_endpoint = None
+    try:
+        for future in as_completed(futures):
+            if not future.exception():
+                found_endpoint = futures[future]
+                with _endpoints_lock:
+                    BUCKET_ENDPOINTS[cache_key] = found_endpoint
+                    while len(BUCKET_ENDPOINTS) > MAX_BUCKET_ENDPOINTS:
+                        BUCKET_ENDPOINTS.popitem(last=False)
+                break
+    finally:
+        for future in futures:
+            future.cancel()  # probes that haven't started yet
+        executor.shutdown(wait=False)
+
+    return found_endpoint
+
+
 def verify_bucket(key, key_type, endpoint, bucket):
     """ :returns endpoint in which the bucket was found, else returns None.
         verifies the existence of a bucket within the cos-package instance that is certified by the provided key.
@@ -195,12 +265,9 @@ def verify_bucket(key, key_type, endpoint, bucket):
                     print(color_msg(error_msg, Color.RED))
                     return None
         else:
-            for endpoint in [PUBLIC_ENDPOINT_TEMPLATE.format(region) for region in BUCKET_REGIONS]:
-                try:
-                    test_apikey_and_bucket(key, key_type, endpoint, bucket)
-                    return endpoint
-                except:
-                    pass
+            endpoint = find_bucket_endpoint(key, key_type, bucket)
+            if endpoint:
+                return endpoint
 
             print(color_msg(error_msg, Color.RED))
             return None
@@ -1,18 +1,25 @@
+import re
+import threading
 import uuid
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Dict
-import ibm_boto3
-import requests
-from ibm_botocore.client import Config
-from ibm_botocore.exceptions import ClientError
+from lithopscloud.modules.clients import POOLS
 from lithopscloud.modules.config_builder import ConfigBuilder
-from lithopscloud.modules.utils import free_dialog, CACHE, color_msg, Color, NEW_INSTANCE, retry_on_except
-from lithopscloud.modules.utils import inquire_user
+from lithopscloud.modules.utils import free_dialog, color_msg, Color, NEW_INSTANCE, retry_on_except
+from lithopscloud.modules.utils import inquire_user, get_region_by_endpoint
 
 BUCKET_REGIONS = []  # regions in which bucket can be created
 DEFAULT_LITHOPS_COS = 'DefaultLithopsCos'
 DEFAULT_LITHOPS_BUCKET = 'lithops-bucket'
 DEFAULT_LITHOPS_BUCKET_LOCATION = 'us-east'
+MAX_PROBE_WORKERS = 8
+_clients_lock = threading.Lock()
+_regions_lock = threading.Lock()
+
+# cos endpoint type reachable from each compute backend running inside IBM Cloud, by its config section.
+# 'direct' endpoints serve VPC and Code Engine, 'private' endpoints the classic infrastructure of Cloud Functions
+COMPUTE_ENDPOINT_TYPES = {'ibm_vpc': 'direct', 'code_engine': 'direct', 'ibm_cf': 'private'}
 
 class CosConfig(ConfigBuilder):
     
@@ -23,21 +30,86 @@ class CosConfig(ConfigBuilder):
     def _init_boto3_client(self, region):
             if self.base_config.get('ibm_cos') and self.base_config['ibm_cos'].get('iam_api_key'):
                 cos_iam_api_key = self.base_config['ibm_cos']['iam_api_key']
-                del CACHE['resource_group_id']
+                self.context.values.pop('resource_group_id', None)
                 self.init_clients(cos_iam_api_key)
             else:
                 cos_iam_api_key = self.base_config['ibm']['iam_api_key']
-                    
-            return ibm_boto3.client(service_name='s3',
-                                    ibm_api_key_id=cos_iam_api_key,
-                                    ibm_auth_endpoint="https://iam.ng.bluemix.net/oidc/token",
-                                    config=Config(signature_version='oauth'),
-                                    endpoint_url=f'https://s3.{region}.cloud-object-storage.appdomain.cloud')
+
+            return create_s3_client(cos_iam_api_key, region)
+
+    def list_buckets(self, s3_client, ibm_service_instance_id):
+        """returns the buckets of the cos instance, each tagged with the 'Region' it's located in.
+        the region is resolved by the extended (location aware) bucket listing, and is None for buckets the listing
+        didn't locate, e.g. if the endpoint doesn't support it or the bucket isn't in a regional location"""
+        from ibm_botocore.exceptions import ClientError
+
+        try:
+            buckets = s3_client.list_buckets_extended(IBMServiceInstanceId=ibm_service_instance_id)['Buckets']
+        except ClientError:
+            buckets = s3_client.list_buckets(IBMServiceInstanceId=ibm_service_instance_id)['Buckets']
+
+        for bucket in buckets:
+            bucket['Region'] = get_bucket_region(bucket.get('LocationConstraint'))
+            bucket['Label'] = f"{bucket['Name']} ({bucket['Region']})" if bucket['Region'] else bucket['Name']
+        return buckets
+
+    def find_bucket_region(self, bucket):
+        """returns the region the bucket is located in, else None.
+        regions are probed concurrently, the first region found holding the bucket cancels the remaining probes"""
+        from ibm_botocore.exceptions import ClientError
+
+        if self.base_config.get('ibm_cos') and self.base_config['ibm_cos'].get('iam_api_key'):
+            cos_iam_api_key = self.base_config['ibm_cos']['iam_api_key']
+        else:
+            cos_iam_api_key = self.base_config['ibm']['iam_api_key']
+
+        def probe(region):
+            with _clients_lock:  # creating clients of the default boto session isn't thread safe
+                s3_client = create_s3_client(cos_iam_api_key, region)
+            s3_client.get_bucket_location(Bucket=bucket)
+            return region
+
+        print(f'Searching for bucket {bucket} in all available regions...')
+        executor = ThreadPoolExecutor(max_workers=MAX_PROBE_WORKERS)
+        futures = [executor.submit(probe, region) for region in BUCKET_REGIONS]
+        try:
+            for future in as_completed(futures):
+                try:
+                    region = future.result()
+                    print(f"bucket found in {region}...")
+                    return region
+                except ClientError as ex:
+                    if ex.response['Error']['Code'] != 'NoSuchBucket':
+                        raise
+        finally:
+            for future in futures:
+                future.cancel()  # probes that haven't started yet
+            executor.shutdown(wait=False)
+
+        return None
+
+    def _set_bucket(self, bucket, region):
+        """sets the bucket, its region and, for compute inside IBM Cloud, the endpoint the compute reaches it by:
+        the private endpoint of its region if the compute runs in the same one, else the public endpoint"""
+        compute_region, endpoint_type = compute_location(self.base_config)
+        self.base_config['ibm_cos'].update({'storage_bucket': bucket, 'region': region})
+
+        if endpoint_type and compute_region == region:
+            self.base_config['ibm_cos']['private_endpoint'] = cos_endpoint(region, endpoint_type)
+            self.base_config['ibm_cos'].pop('endpoint', None)
+        else:
+            self.base_config['ibm_cos'].pop('private_endpoint', None)
+
+        if compute_region and compute_region != region:
+            self.base_config['ibm_cos']['endpoint'] = cos_endpoint(region)
+            print(color_msg(f"Bucket {bucket} is located in {region} while compute runs in {compute_region}. "
+                            f"Data transferred between the regions is slower, and billed", color=Color.RED))
 
     def run(self) -> Dict[str, Any]:
-    
         print(color_msg("\n\nConfiguring IBM cloud object storage:\n", color=Color.YELLOW))
-        s3_client = self._init_boto3_client(BUCKET_REGIONS[0])  # initiate using a randomly chosen region
+        compute_region, _ = compute_location(self.base_config)
+        # initiate using the compute region or a randomly chosen one
+        s3_client = self._init_boto3_client(compute_region if compute_region in BUCKET_REGIONS else BUCKET_REGIONS[0])
 
         print("Obtaining existing COS instances...")
 
@@ -51,33 +123,24 @@ class CosConfig(ConfigBuilder):
         else:
             ibm_service_instance_id = selected_storage_name['id']
 
-        client_response = s3_client.list_buckets(IBMServiceInstanceId=ibm_service_instance_id)
+        buckets = self.list_buckets(s3_client, ibm_service_instance_id)
+        if compute_region:  # buckets of the compute region first
+            buckets = sorted(buckets, key=lambda b: b['Region'] != compute_region)
+            for bucket in buckets:
+                if bucket['Region'] == compute_region:
+                    bucket['Label'] += ' ' + color_msg('same region as compute', color=Color.LIGHTGREEN)
         # prompt user to choose a bucket from buckets available within chosen cos instance
         default_bucket = self.base_config['ibm_cos'].get('storage_bucket') if self.base_config.get('ibm_cos') else None
-        chosen_bucket = inquire_user('Please choose a bucket',  client_response['Buckets'],
+        default_bucket = next((b['Label'] for b in buckets if b['Name'] == default_bucket), None)
+        chosen_bucket = inquire_user('Please choose a bucket',  buckets,
                                      create_new_instance=NEW_INSTANCE + ' bucket',
-                                     choice_key='Name',
+                                     choice_key='Label',
                                      default=default_bucket)
 
         if NEW_INSTANCE not in chosen_bucket:
+            # buckets the extended listing didn't locate are searched for
+            bucket_location = chosen_bucket['Region'] or self.find_bucket_region(chosen_bucket['Name'])
             chosen_bucket = chosen_bucket['Name']
-            print('Searching for bucket in all available regions...')
-            bucket_location = ''
-            for index, region in enumerate(BUCKET_REGIONS):
-                try:
-                    # skip re-initiating client in the current region (index 0)
-                    if index:
-                        s3_client = self._init_boto3_client(region)
-                        print(f"Searching for bucket in {region}...")
-                    s3_client.get_bucket_location(Bucket=chosen_bucket)
-                    bucket_location = region
-                    print(f"bucket found in {region}...")
-                    break
-                except ClientError as ex:
-                    if ex.response['Error']['Code'] == 'NoSuchBucket':
-                        pass
-                    else:
-                        raise
 
             if not bucket_location:
                 raise Exception(
@@ -86,13 +149,14 @@ class CosConfig(ConfigBuilder):
         else:  # user would like to create a new bucket
             bucket_location = \
                 inquire_user('Please choose a region you would like your bucket to be located in',
-                             BUCKET_REGIONS, handle_strings=True)
+                             BUCKET_REGIONS, handle_strings=True,
+                             default=compute_region if compute_region in BUCKET_REGIONS else None)
             # changing location of the client to create a bucket in requested region.
             s3_client = self._init_boto3_client(bucket_location)
 
             chosen_bucket = create_bucket(s3_client, ibm_service_instance_id)
 
-        self.base_config['ibm_cos'].update({'storage_bucket': chosen_bucket, 'region': bucket_location})
+        self._set_bucket(chosen_bucket, bucket_location)
         self.base_config['lithops']['storage'] = 'ibm_cos'
 
         print(color_msg("\nIBM Cloud Object Storage was configured successfully", color=Color.LIGHTGREEN))
@@ -118,10 +182,11 @@ class CosConfig(ConfigBuilder):
                 response = self.resource_controller_service.create_resource_instance(
                     name=cos_name,
                     target=f"crn:v1:bluemix:public:globalcatalog::::deployment:{plan}%3Aglobal",
-                    resource_group=CACHE['resource_group_id'],
+                    resource_group=self.context.values['resource_group_id'],
                     resource_plan_id=plan
                 ).get_result()
                 cos_instance_created = True
+                self.session_cache.invalidate('list_resource_instances')
 
             except Exception as e:
                 print(color_msg(f"Couldn't create new cloud object storage instance.\n{e} ", color=Color.RED))
@@ -131,33 +196,18 @@ class CosConfig(ConfigBuilder):
     
     def verify(self, base_config):
         chosen_bucket = base_config['ibm_cos'].get('storage_bucket')
-        bucket_location = None
-        
-        for index, region in enumerate(BUCKET_REGIONS):
-            try:
-                s3_client = self._init_boto3_client(region)
-                print(f"Searching for bucket in {region}...")
-
-                s3_client.get_bucket_location(Bucket=chosen_bucket)
-                bucket_location = region
-                print(f"bucket found in {region}...")
-                break
-            except ClientError as ex:
-                if ex.response['Error']['Code'] == 'NoSuchBucket':
-                    pass
-                else:
-                    raise
-                
+        bucket_location = self.find_bucket_region(chosen_bucket)
+
         if not bucket_location:
             raise Exception(f"Couldn't locate the specified bucket {chosen_bucket} region")
         else:
-            base_config['ibm_cos']['region'] = bucket_location
+            self._set_bucket(chosen_bucket, bucket_location)
             
         return base_config
     
     def create_default(self):
-        
-        bucket_location = DEFAULT_LITHOPS_BUCKET_LOCATION
+        compute_region, _ = compute_location(self.base_config)
+        bucket_location = compute_region if compute_region in BUCKET_REGIONS else DEFAULT_LITHOPS_BUCKET_LOCATION
         print(color_msg("\n\nConfiguring IBM cloud object storage:\n", color=Color.YELLOW))
         s3_client = self._init_boto3_client(bucket_location)  # initiate using a randomly chosen region
 
@@ -169,18 +219,22 @@ class CosConfig(ConfigBuilder):
         else:
             ibm_service_instance_id = cos_instances[0]['id']
 
-        client_response = s3_client.list_buckets(IBMServiceInstanceId=ibm_service_instance_id)
+        buckets = self.list_buckets(s3_client, ibm_service_instance_id)
+        # a default bucket of the compute region, if any
+        chosen_bucket = next((b for b in sorted(buckets, key=lambda b: b['Region'] != bucket_location)
+                              if DEFAULT_LITHOPS_BUCKET in b['Name']), None)
 
-        buckets = client_response['Buckets']
-        chosen_bucket = next((b['Name'] for b in buckets if DEFAULT_LITHOPS_BUCKET in b['Name']), None)
-        
-        if not chosen_bucket:
-            print(f'Creating a bucket with prefix {DEFAULT_LITHOPS_BUCKET} in the {DEFAULT_LITHOPS_BUCKET_LOCATION} of the cos instance {ibm_service_instance_id}' )
+        if chosen_bucket:
+            bucket_location = chosen_bucket['Region'] or self.find_bucket_region(chosen_bucket['Name']) \
+                              or bucket_location
+            chosen_bucket = chosen_bucket['Name']
+        else:
+            print(f'Creating a bucket with prefix {DEFAULT_LITHOPS_BUCKET} in the {bucket_location} of the cos instance {ibm_service_instance_id}' )
             # changing location of the client to create a bucket in requested region.
-            s3_client = self._init_boto3_client(DEFAULT_LITHOPS_BUCKET_LOCATION)
+            s3_client = self._init_boto3_client(bucket_location)
             chosen_bucket = create_bucket(s3_client, ibm_service_instance_id, auto=True)
 
-        self.base_config['ibm_cos'].update({'storage_bucket': chosen_bucket, 'region': bucket_location})
+        self._set_bucket(chosen_bucket, bucket_location)
         self.base_config['lithops']['storage'] = 'ibm_cos'
 
         print(color_msg("\nIBM Cloud Object Storage was configured successfully", color=Color.LIGHTGREEN))
@@ -208,6 +262,48 @@ def create_bucket(s3_client, ibm_service_instance_id, auto=False):
     return chosen_bucket
 
 
+def create_s3_client(cos_iam_api_key, region):
+    """returns an s3 client of the region's public endpoint, authenticated by the shared token broker of the key"""
+    import ibm_boto3
+    from ibm_botocore.client import Config
+    from lithopscloud.modules.iam import get_cos_token_manager
+
+    return ibm_boto3.client(service_name='s3',
+                            token_manager=get_cos_token_manager(cos_iam_api_key),
+                            config=Config(signature_version='oauth'),
+                            endpoint_url=cos_endpoint(region))
+
+
+def cos_endpoint(region, endpoint_type=None):
+    """returns the cos endpoint of the region, public unless an endpoint type, 'private' or 'direct', is specified"""
+    return f"https://s3.{endpoint_type + '.' if endpoint_type else ''}{region}.cloud-object-storage.appdomain.cloud"
+
+
+def compute_location(base_config):
+    """returns the region the compute backend of the config runs in, and the cos endpoint type reachable from it.
+    both are None for compute outside IBM Cloud, or whose region isn't configured yet"""
+    try:
+        if base_config.get('ibm_vpc', {}).get('endpoint'):
+            return get_region_by_endpoint(base_config['ibm_vpc']['endpoint']), COMPUTE_ENDPOINT_TYPES['ibm_vpc']
+        if base_config.get('code_engine', {}).get('region'):
+            return base_config['code_engine']['region'], COMPUTE_ENDPOINT_TYPES['code_engine']
+        if base_config.get('ibm_cf', {}).get('endpoint'):
+            region = re.search('//(.+?).functions.cloud.ibm.com', base_config['ibm_cf']['endpoint']).group(1)
+            return region, COMPUTE_ENDPOINT_TYPES['ibm_cf']
+    except AttributeError:  # an endpoint of an unknown format
+        pass
+    return None, None
+
+
+def get_bucket_region(location_constraint):
+    """returns the region of a bucket's location constraint, e.g. 'eu-de' of 'eu-de-smart'.
+    returns None for locations without a regional endpoint, i.e. cross region and single site buckets"""
+    if not location_constraint:
+        return None
+    region = location_constraint.rsplit('-', 1)[0]
+    return region if region in BUCKET_REGIONS else None
+
+
 def get_cos_instances(resource_instances):
     """return available cos instances by name and id"""
     storage_instances = []
@@ -220,7 +316,10 @@ def get_cos_instances(resource_instances):
 
 @retry_on_except(retries=3, sleep_duration=7)
 def init_cos_region_list():
-    """initializes a list of the available regions in which a user can create a bucket"""
-    response = requests.get(f'https://control.cloud-object-storage.cloud.ibm.com/v2/endpoints').json()
-    for region in response['service-endpoints']['regional']:
-        BUCKET_REGIONS.append(region)
+    """initializes a list of the available regions in which a user can create a bucket.
+    concurrent config builders wait for a single fetch, and never see a partially filled list"""
+    with _regions_lock:
+        if BUCKET_REGIONS:  # fetched by an earlier config builder
+            return
+        response = POOLS.get(f'https://control.cloud-object-storage.cloud.ibm.com/v2/endpoints').json()
+        BUCKET_REGIONS[:] = list(response['service-endpoints']['regional'])  # in place, as it's imported by others
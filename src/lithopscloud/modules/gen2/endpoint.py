@@ -10,7 +10,7 @@ class EndpointConfig(ConfigBuilder):
         
     @spinner
     def _get_regions_objects(self):
-        return ConfigBuilder.ibm_vpc_client.list_regions().get_result()['regions']
+        return self.get_catalog('regions')
         
     @update_decorator
     def run(self) -> Dict[str, Any]:
@@ -20,21 +20,21 @@ class EndpointConfig(ConfigBuilder):
         default = self.defaults.get('region')
         region_obj = get_option_from_list("Choose region", regions_objects, default = default)
 
-        # update global ibm_vpc_client to selected endpoint
-        ConfigBuilder.ibm_vpc_client.set_service_url(region_obj['endpoint'] + '/v1')
-        ConfigBuilder.region = region_obj['name']
+        # update the run's ibm_vpc_client to selected endpoint
+        self.ibm_vpc_client.set_service_url(region_obj['endpoint'] + '/v1')
+        self.region = region_obj['name']
         
         return region_obj['endpoint']
     
     @update_decorator
     def create_default(self):
-        # update global ibm_vpc_client to selected endpoint
+        # update the run's ibm_vpc_client to selected endpoint
         regions_objects = self._get_regions_objects()
         
         # currently hardcoded for us-south
         region_obj = next((r for r in regions_objects if r['name'] == 'us-south'), None)
         
-        ConfigBuilder.ibm_vpc_client.set_service_url(region_obj['endpoint'] + '/v1')
-        ConfigBuilder.region = region_obj['name']
+        self.ibm_vpc_client.set_service_url(region_obj['endpoint'] + '/v1')
+        self.region = region_obj['name']
         
         return region_obj['endpoint']
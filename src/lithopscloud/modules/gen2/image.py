@@ -4,28 +4,33 @@ from lithopscloud.modules.utils import find_obj, find_default
 
 
 class ImageConfig(ConfigBuilder):
+    node_description = ''  # of the nodes the image is chosen for, e.g. 'worker nodes'
     
     def __init__(self, base_config: Dict[str, Any]) -> None:
         super().__init__(base_config)
 
+    def _get_image_objects(self):
+        return self.get_catalog('images')
+
+    def _default_image(self, image_objects):
+        """returns the name of the image offered by default"""
+        return find_default({'name': 'ibm-ubuntu-20-04-'}, image_objects, name='name', substring=True)
+
     @update_decorator
     def run(self) -> Dict[str, Any]:
 
-        @spinner
-        def get_image_objects():
-            return self.ibm_vpc_client.list_images().get_result()['images']
-
-        image_objects = get_image_objects()
+        image_objects = spinner(self._get_image_objects)()
 
-        default = find_default({'name': 'ibm-ubuntu-20-04-'}, image_objects, name='name', substring=True)
-        image_obj = find_obj(image_objects, 'Please choose \033[92mUbuntu\033[0m 20.04 VM image, currently only Ubuntu supported', default=default)
+        default = self._default_image(image_objects)
+        of_nodes = f' of the {self.node_description}' if self.node_description else ''
+        image_obj = find_obj(image_objects, f'Please choose \033[92mUbuntu\033[0m 20.04 VM image{of_nodes}, currently only Ubuntu supported', default=default)
 
         return image_obj['id'], image_obj['minimum_provisioned_size'], image_obj['owner_type'] == 'user'
 
     @update_decorator
     def verify(self, base_config):
         image_id = self.defaults['image_id']
-        image_objects = self.ibm_vpc_client.list_images().get_result()['images']
+        image_objects = self._get_image_objects()
         if image_id:
             image_obj = find_obj(image_objects, 'dummy', obj_id=image_id)
         else:
@@ -36,7 +41,7 @@ class ImageConfig(ConfigBuilder):
 
     @update_decorator
     def create_default(self):
-        image_objects = self.ibm_vpc_client.list_images().get_result()['images']
+        image_objects = self._get_image_objects()
 
         image_obj = next((image for image in image_objects if 'ibm-ubuntu-20-04-' in image['name']), None)
         
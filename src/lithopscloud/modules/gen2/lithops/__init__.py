@@ -1,16 +1,18 @@
 from lithopscloud.modules.api_key import ApiKeyConfig
 from lithopscloud.modules.gen2.lithops.ssh_key import LithopsSshKeyConfig
 from lithopscloud.modules.gen2.lithops.endpoint import LithopsEndpointConfig
+from lithopscloud.modules.gen2.prefetch import PrefetchConfig
 from lithopscloud.modules.gen2.lithops.vpc import LithopsVPCConfig
 from lithopscloud.modules.gen2.lithops.image import LithopsImageConfig
 from lithopscloud.modules.cos import CosConfig
 from lithopscloud.modules.gen2.lithops.runtime import VPCRuntimeConfig
 from lithopscloud.modules.gen2.lithops.dismantle import DismantleConfig
 from lithopscloud.modules.gen2.lithops.profile import LithopsProfileConfig
+from lithopscloud.modules.gen2.lithops.preflight import LithopsPreflightConfig
 from lithopscloud.main import load_base_config
 from lithopscloud.modules.utils import color_msg, Color
 
-MODULES = [ApiKeyConfig, LithopsEndpointConfig, LithopsVPCConfig, LithopsSshKeyConfig, LithopsImageConfig, CosConfig, VPCRuntimeConfig, DismantleConfig, LithopsProfileConfig]
+MODULES = [ApiKeyConfig, LithopsEndpointConfig, PrefetchConfig, LithopsVPCConfig, LithopsSshKeyConfig, LithopsImageConfig, CosConfig, VPCRuntimeConfig, DismantleConfig, LithopsProfileConfig, LithopsPreflightConfig]
 
 def finish_message(output_file):
     return "\n\n================================================================\n" + \
@@ -22,10 +24,11 @@ def finish_message(output_file):
         "\n================================================================"
         
 def load_config(backend, iam_api_key, region=None,
-                    image_id=None, profile_name='bx2-2x8',
+                    image_id=None, profile_name=None,
                     key_id=None, ssh_key_filename=None,
                     vpc_id=None, cos_bucket_name=None,
-                    compute_iam_endpoint=None, cos_iam_api_key=None):
+                    compute_iam_endpoint=None, cos_iam_api_key=None,
+                    workload=None, parallelism=None, quotas=None):
     
     base_config = load_base_config(backend)
     
@@ -38,6 +41,12 @@ def load_config(backend, iam_api_key, region=None,
     
     base_config['ibm_cos']['storage_bucket'] = cos_bucket_name
 
+    if workload and not profile_name:  # 'cpu', 'memory', 'network' or 'gpu', consumed by ProfileConfig
+        base_config['workload'] = {'type': workload, 'parallelism': parallelism}
+
+    if quotas:  # VPC quotas raised above the defaults, e.g. {'vcpu': 400}, consumed by PreflightConfig
+        base_config['quotas'] = quotas
+
     if cos_iam_api_key:
         base_config['ibm_cos']['iam_api_key'] = cos_iam_api_key
         
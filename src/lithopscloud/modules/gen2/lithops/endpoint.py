@@ -2,7 +2,6 @@ from typing import Any, Dict
 
 from lithopscloud.modules.gen2.endpoint import EndpointConfig
 from lithopscloud.modules.utils import get_region_by_endpoint
-from lithopscloud.modules.config_builder import ConfigBuilder
 
 
 class LithopsEndpointConfig(EndpointConfig):
@@ -16,7 +15,6 @@ class LithopsEndpointConfig(EndpointConfig):
             # when endpoint was provided directly by user instead of selecting it
             # we just set it
             if base_endpoint:
-                ConfigBuilder.ibm_vpc_client.set_service_url(base_endpoint + '/v1')
                 self.ibm_vpc_client.set_service_url(base_endpoint + '/v1')
         
             self.defaults['region'] = get_region_by_endpoint(
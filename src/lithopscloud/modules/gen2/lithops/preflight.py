@@ -0,0 +1,20 @@
+from lithopscloud.modules.gen2.lithops.vpc import LITHOPS_MAX_WORKERS
+from lithopscloud.modules.gen2.preflight import PreflightConfig
+
+
+class LithopsPreflightConfig(PreflightConfig):
+
+    def _head(self):
+        return self.base_config['ibm_vpc']['profile_name']
+
+    def _workers(self):
+        return [(self.base_config['ibm_vpc']['profile_name'],
+                 self.base_config['ibm_vpc'].get('max_workers', LITHOPS_MAX_WORKERS))]
+
+    def _requested(self):
+        # lithops creates up to its default number of workers, unless max_workers was set
+        return 'max_workers' in self.base_config['ibm_vpc']
+
+    def _network(self):
+        # the master VM is assigned a floating ip
+        return self.base_config['ibm_vpc']['vpc_id'], self.base_config['ibm_vpc']['zone_name'], 1
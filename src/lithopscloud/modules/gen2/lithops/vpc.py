@@ -1,6 +1,8 @@
 from lithopscloud.modules.gen2.vpc import VPCConfig
 from typing import Any, Dict
 
+LITHOPS_MAX_WORKERS = 100  # lithops' default number of worker VMs of the create mode
+
 REQUIRED_RULES = {'outbound_tcp_all': 'selected security group is missing rule permitting outbound TCP access\n', 'outbound_udp_all': 'selected security group is missing rule permitting outbound UDP access\n', 'inbound_tcp_sg': 'selected security group is missing rule permiting inbound tcp traffic inside selected security group\n', 'inbound_tcp_22': 'selected security group is missing rule permiting inbound traffic to tcp port 22 required for ssh\n'}
 
 class LithopsVPCConfig(VPCConfig):
@@ -12,6 +14,9 @@ class LithopsVPCConfig(VPCConfig):
         self.sg_rules = REQUIRED_RULES
         self.defaults = self.base_config['ibm_vpc']
 
+    def _nodes(self):
+        return self.defaults.get('max_workers', LITHOPS_MAX_WORKERS) + 1  # and the master VM
+
     def update_config(self, vpc_obj, zone_obj, subnet_id):
         sec_group_id = vpc_obj['default_security_group']['id']
 
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from lithopscloud.modules.config_builder import ConfigBuilder
+from lithopscloud.modules.pager import VPC_PAGE_LIMIT
+from lithopscloud.modules.utils import get_region_by_endpoint
+
+MAX_PREFETCH_WORKERS = 10
+
+
+class PrefetchConfig(ConfigBuilder):
+    """Issues every VPC listing the rest of the gen2 module chain needs concurrently, right after the endpoint is selected.
+
+    Results land in the session cache (and the catalog cache) as futures, so the following modules only block on
+    listings that are still in flight instead of issuing their requests one after another."""
+
+    def _get_region(self):
+        try:
+            return get_region_by_endpoint(self.ibm_vpc_client.service_url)
+        except Exception:
+            return self.region
+
+    def prefetch(self):
+        executor = ThreadPoolExecutor(max_workers=MAX_PREFETCH_WORKERS)
+        futures = {}
+
+        # listings of subnets and gateways are filtered by the vpc, thus issued once it's selected. instances and
+        # floating ips are counted account wide by PreflightConfig, which awaits their memoized listings (see list_all)
+        for method, result_key in [('list_instances', 'instances'), ('list_floating_ips', 'floating_ips')]:
+            futures[method] = executor.submit(self.list_all, method, result_key)
+        # vpcs and keys are mostly searched for a default one, which stops at its page, thus their first page only
+        for method in ['list_vpcs', 'list_keys']:
+            futures[method] = self.session_cache.prefetch(executor, self.ibm_vpc_client, method, limit=VPC_PAGE_LIMIT)
+        futures['list_resource_groups'] = self.session_cache.prefetch(executor, self.resource_service_client,
+                                                                      'list_resource_groups')
+
+        futures['images'] = executor.submit(self.get_catalog, 'images')
+        futures['instance_profiles'] = executor.submit(self.get_catalog, 'instance_profiles')
+        region = self._get_region()
+        if region:
+            futures['zones'] = executor.submit(self.get_catalog, 'zones', region)
+
+        executor.shutdown(wait=False)  # modules consume the results through the caches
+        return futures
+
+    def run(self) -> Dict[str, Any]:
+        self.prefetch()
+        return self.base_config
+
+    def verify(self, base_config):
+        self.prefetch()
+        return base_config
+
+    def create_default(self):
+        self.prefetch()
+        return self.base_config
@@ -0,0 +1,125 @@
+import math
+from typing import Any, Dict
+
+from lithopscloud.modules.config_builder import ConfigBuilder
+from lithopscloud.modules.gen2.profile import profile_attributes
+from lithopscloud.modules.utils import Color, color_msg
+
+# default quotas of IBM Cloud VPC accounts. the VPC API doesn't expose the quotas of an account, thus accounts whose
+# quotas were raised by a support case set theirs by the 'quotas' config key, e.g. {'vcpu': 400}
+DEFAULT_QUOTAS = {'vcpu': 200,  # per region
+          'memory': 5600,  # GiB per region
+          'floating_ips': 20,  # per zone
+          'subnets': 15,  # per vpc
+          'public_gateways': 1}  # per zone of a vpc
+
+
+class PreflightConfig(ConfigBuilder):
+    """Compares the resources the generated config could request at full scale with the account's quotas and current
+    usage, and reports the maximal number of workers it can scale out to.
+
+    Runs last in the module chain. Its listings are issued by PrefetchConfig with the rest, thus it adds no latency."""
+
+    def __init__(self, base_config: Dict[str, Any]) -> None:
+        super().__init__(base_config)
+        # consumed here, as it isn't part of the backend's config
+        self.quotas = {**DEFAULT_QUOTAS, **(base_config.pop('quotas', None) or {})}
+
+    def _head(self):
+        """returns the profile name of the node running no workers, e.g. ray's head"""
+        raise NotImplementedError
+
+    def _workers(self):
+        """returns the (profile name, max workers) of each worker node type"""
+        raise NotImplementedError
+
+    def _network(self):
+        """returns the vpc id and zone name of the head, and the floating ips it requires"""
+        raise NotImplementedError
+
+    def _requested(self):
+        """returns whether the number of workers was requested by the user, rather than being the backend's default"""
+        return True
+
+    def _node_needs(self, profile_name):
+        """returns the quota consumed by a node of the profile"""
+        profile = next((p for p in self.get_catalog('instance_profiles') if p['name'] == profile_name), None)
+        if profile:
+            vcpu, memory, _, _, _ = profile_attributes(profile)
+        else:  # cpu and memory based on profile name, e.g. bx2-2x8
+            vcpu, memory = (int(n) for n in profile_name.split('-')[1].split('x')[:2])
+        return {'vcpu': vcpu, 'memory': memory}
+
+    def _usage(self, vpc_id, zone_name):
+        """returns the account's current usage of each quota, in the scope of the quota"""
+        # the vcpu, memory and floating ip quotas are of the account, thus are listed account wide
+        instances = self.list_all('list_instances', 'instances')
+        floating_ips = self.list_all('list_floating_ips', 'floating_ips')
+        subnets = self.list_all('list_subnets', 'subnets', vpc_id=vpc_id)
+        vpc_obj = self.session_cache.call(self.ibm_vpc_client, 'get_vpc', id=vpc_id)
+        gateways = self.list_all('list_public_gateways', 'public_gateways',
+                                 resource_group_id=vpc_obj['resource_group']['id'])
+
+        return {'vcpu': sum(i.get('vcpu', {}).get('count', 0) for i in instances),
+                'memory': sum(i.get('memory', 0) for i in instances),
+                'floating_ips': len([f for f in floating_ips if f.get('zone', {}).get('name') == zone_name]),
+                'subnets': len(subnets),
+                'public_gateways': len([g for g in gateways if g['vpc']['id'] == vpc_id and
+                                        g['zone']['name'] == zone_name])}
+
+    def max_workers(self, usage, head_needs, worker_needs):
+        """returns the number of workers the quotas left after the usage and the head allow, and the bounding quota"""
+        bounds = {quota: math.floor((self.quotas[quota] - usage[quota] - head_needs[quota]) / need)
+                  for quota, need in worker_needs.items() if need}
+        if not bounds:
+            return 0, None
+        quota = min(bounds, key=bounds.get)
+        return max(bounds[quota], 0), quota
+
+    def preflight(self):
+        vpc_id, zone_name, floating_ips = self._network()
+        usage = self._usage(vpc_id, zone_name)
+        head_needs = self._node_needs(self._head())
+
+        requested = sum(count for _, count in self._workers())
+        # the largest worker profile, as the autoscaler may launch any mix of the worker node types
+        worker_needs = {quota: max([self._node_needs(profile)[quota] for profile, _ in self._workers()] or [0])
+                        for quota in head_needs}
+        achievable, bounding_quota = self.max_workers(usage, head_needs, worker_needs)
+
+        # subnets and gateways were created by the vpc module already, thus are part of the usage
+        needs = {quota: head_needs[quota] + requested * worker_needs[quota] for quota in head_needs}
+        needs['floating_ips'] = floating_ips
+
+        # a backend's default number of workers wasn't requested by the user, thus isn't warned of
+        warn = self._requested()
+        label = 'default quota' if self.quotas == DEFAULT_QUOTAS else 'quota'
+        print(f"Preflight at full scale of {requested} workers, usage/{label} after scale out:")
+        for quota in self.quotas:
+            total = usage[quota] + needs.get(quota, 0)
+            line = f'  {quota:<16} {total:>6}/{self.quotas[quota]}'
+            print(color_msg(line, color=Color.RED) if warn and total > self.quotas[quota] else line)
+
+        if usage['floating_ips'] + floating_ips > self.quotas['floating_ips']:
+            print(color_msg(f'No floating ip quota left in zone {zone_name} for the head node', color=Color.RED))
+        if achievable < requested and warn:
+            print(color_msg(f'Quotas allow scaling out to {achievable} workers of the requested {requested}, '
+                            f'bound by {bounding_quota}', color=Color.RED))
+        elif achievable < requested:
+            print(f'Quotas allow scaling out to {achievable} workers of the default {requested}, bound by '
+                  f'{bounding_quota}')
+        else:
+            print(color_msg(f'Quotas allow scaling out to {achievable} workers', color=Color.LIGHTGREEN))
+        return achievable
+
+    def run(self) -> Dict[str, Any]:
+        self.preflight()
+        return self.base_config
+
+    def verify(self, base_config):
+        self.preflight()
+        return base_config
+
+    def create_default(self):
+        self.preflight()
+        return self.base_config
@@ -1,38 +1,142 @@
 from lithopscloud.modules.config_builder import ConfigBuilder, update_decorator, spinner
 from typing import Any, Dict
-from lithopscloud.modules.utils import get_option_from_list, find_default, find_obj
+from lithopscloud.modules.utils import get_option_from_list, find_default, find_obj, inquire_user, free_dialog
+
+DEFAULT_PROFILE = 'bx2-2x8'
+TOP_RECOMMENDATIONS = 5
+SHOW_ALL_PROFILES = 'Show all profiles'
+
+# workload -> weight of each profile attribute in its throughput: vcpu, memory (GiB), bandwidth (Gbps), gpus, disk (GB)
+WORKLOADS = {'cpu': (1.0, 0.05, 0.05, 0, 0),
+             'memory': (0.2, 1.0, 0.05, 0, 0.001),
+             'network': (0.2, 0.05, 1.0, 0, 0),
+             'gpu': (0.1, 0.02, 0.05, 10.0, 0)}
+
+# relative cost of a unit of each attribute, approximating the ratios of the VPC profile prices. the catalog carries
+# no prices, thus only the ranking of profiles of a similar shape by this proxy is meaningful.
+UNIT_COSTS = (1.0, 0.125, 0, 20.0, 0.002)
+
+
+def profile_attributes(profile):
+    """returns the (vcpu, memory, bandwidth, gpus, disk) of an instance profile object"""
+    def value(key):
+        return profile.get(key, {}).get('value') or 0
+
+    disk = sum(d['quantity'].get('value', 1) * d['size'].get('value', 0) for d in profile.get('disks', []))
+    return value('vcpu_count'), value('memory'), value('bandwidth') / 1000, value('gpu_count'), disk
+
+
+def rank_profiles(profiles, workload, parallelism=None, nodes=None):
+    """returns the profiles ranked by expected throughput per cost for the workload, best first.
+    :param workload - one of WORKLOADS
+    :param parallelism - number of tasks the cluster should run concurrently (a task per vcpu), if specified
+                         profiles whose nodes can't reach it are ranked by the fraction they reach
+    :param nodes - number of nodes of the profile in the cluster"""
+
+    weights = WORKLOADS[workload]
+
+    # a column per attribute, scored in a single pass over the catalog
+    columns = list(zip(*[profile_attributes(p) for p in profiles])) or [()] * len(UNIT_COSTS)
+    throughput = [sum(w * v for w, v in zip(weights, row)) for row in zip(*columns)]
+    cost = [sum(c * v for c, v in zip(UNIT_COSTS, row)) or 1 for row in zip(*columns)]
+    scores = [t / c for t, c in zip(throughput, cost)]
+
+    if parallelism and nodes:
+        scores = [score * min(vcpu * nodes / parallelism, 1) for score, vcpu in zip(scores, columns[0])]
+
+    if workload != 'gpu':  # gpus idle for other workloads
+        scores = [score if not gpus else score / 10 for score, gpus in zip(scores, columns[3])]
+
+    return [profile for _, profile in sorted(zip(scores, profiles), key=lambda s: -s[0])]
+
+
+def describe_profile(profile, nodes=None):
+    """returns a line describing the profile's attributes, and their aggregate over the nodes of the profile"""
+    vcpu, memory, bandwidth, gpus, disk = profile_attributes(profile)
+    description = f"{profile['name']:<12} {vcpu:>3} vCPU {memory:>4} GiB {bandwidth:>3.0f} Gbps"
+    description += f' {gpus} GPU' if gpus else ''
+    description += f' {disk} GB disk' if disk else ''
+    if nodes:
+        description += f'  | {nodes} nodes: {vcpu * nodes} vCPU {memory * nodes} GiB'
+    return description
 
 
 class ProfileConfig(ConfigBuilder):
-    
+    workload_hints = True  # whether the profile is recommended by the workload the cluster runs
+    node_description = ''  # of the nodes the profile is chosen for, e.g. 'worker nodes'
+
     def __init__(self, base_config: Dict[str, Any]) -> None:
         super().__init__(base_config)
 
+    def _get_instance_profile_objects(self):
+        return self.get_catalog('instance_profiles')
+
+    def _nodes(self):
+        """returns the number of nodes of the profile in the cluster, None if the backend doesn't set it ahead"""
+        return None
+
+    def _of_nodes(self):
+        return f' of the {self.node_description}' if self.node_description else ''
+
+    def _recommend(self, instance_profile_objects):
+        """returns the profile the user picked out of the top recommendations for their workload,
+        None if they asked for all profiles"""
+        if not self.workload_hints:
+            return None
+        workload = inquire_user('What is your workload mostly bound by?', list(WORKLOADS) + ['no preference'],
+                                handle_strings=True)
+        if workload not in WORKLOADS:
+            return None
+
+        nodes = self._nodes()
+        parallelism = None
+        if nodes:
+            answer = free_dialog('Number of tasks to run in parallel (empty for no target)',
+                                 validate=lambda _, x: not x or x.isdigit())['answer']
+            parallelism = int(answer) if answer else None
+
+        ranked = rank_profiles(instance_profile_objects, workload, parallelism, nodes)[:TOP_RECOMMENDATIONS]
+        choices = [{'name': describe_profile(p, nodes), 'profile': p} for p in ranked]
+        choice = get_option_from_list(f'Recommended instance profiles{self._of_nodes()}', choices,
+                                      do_nothing=SHOW_ALL_PROFILES)
+        return None if choice == SHOW_ALL_PROFILES else choice['profile']
+
     @update_decorator
     def run(self) -> Dict[str, Any]:
 
-        @spinner
-        def get_instance_profile_objects():
-            return self.ibm_vpc_client.list_instance_profiles().get_result()['profiles']
-
-        instance_profile_objects = get_instance_profile_objects()
+        instance_profile_objects = spinner(self._get_instance_profile_objects)()
 
-        default = find_default(
-            self.base_config, instance_profile_objects, name='instance_profile_name')
-        instance_profile = get_option_from_list(
-            'Carefully choose instance profile, please refer to https://cloud.ibm.com/docs/vpc?topic=vpc-profiles', instance_profile_objects, default=default)
+        instance_profile = self._recommend(instance_profile_objects)
+        if not instance_profile:
+            default = find_default(
+                {'profile_name': self.defaults.get('profile_name')}, instance_profile_objects, name='profile_name')
+            instance_profile = get_option_from_list(
+                f'Carefully choose instance profile{self._of_nodes()}, please refer to https://cloud.ibm.com/docs/vpc?topic=vpc-profiles',
+                sorted(instance_profile_objects, key=lambda p: (p['name'].split('-')[0], profile_attributes(p))),
+                default=default)
 
         return instance_profile['name']
-    
+
     @update_decorator
     def verify(self, base_config):
         profile_name = self.defaults['profile_name']
-        instance_profile_objects = self.ibm_vpc_client.list_instance_profiles().get_result()['profiles']
+        # set by load_config when no profile was specified
+        workload = base_config.pop('workload', None) if self.workload_hints else None
+        instance_profile_objects = self._get_instance_profile_objects()
+
+        if not profile_name:
+            if workload:
+                profile_name = rank_profiles(instance_profile_objects, workload['type'], workload.get('parallelism'),
+                                             self._nodes())[0]['name']
+                print(f'Selected instance profile {profile_name} for the {workload["type"]} bound workload')
+            else:
+                profile_name = DEFAULT_PROFILE
+
         profile = find_obj(instance_profile_objects, 'dummy', obj_name=profile_name)
         if not profile:
             raise Exception(f'Specified profile {profile_name} not found in the profile list {instance_profile_objects}')
         return profile_name
 
-    @update_decorator    
+    @update_decorator
     def create_default(self):
-        return 'bx2-2x8'
+        return DEFAULT_PROFILE
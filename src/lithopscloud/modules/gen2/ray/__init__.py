@@ -1,21 +1,31 @@
 from lithopscloud.modules.gen2.ray.api_key import RayApiKeyConfig
 from lithopscloud.modules.gen2.ray.endpoint import RayEndpointConfig
+from lithopscloud.modules.gen2.prefetch import PrefetchConfig
 from lithopscloud.modules.gen2.ray.floating_ip import FloatingIpConfig
-from lithopscloud.modules.gen2.ray.image import RayImageConfig
+from lithopscloud.modules.gen2.ray.image import RayImageConfig, RayWorkerImageConfig
 from lithopscloud.modules.gen2.ray.ssh_key import RaySshKeyConfig
 from lithopscloud.modules.gen2.ray.vpc import RayVPCConfig
-from lithopscloud.modules.gen2.ray.workers import WorkersConfig
-from lithopscloud.modules.gen2.ray.profile import RayProfileConfig
+from lithopscloud.modules.gen2.ray.workers import WorkersConfig, set_autoscaler_tuning
+from lithopscloud.modules.gen2.ray.profile import RayProfileConfig, RayWorkerProfileConfig
+from lithopscloud.modules.gen2.ray.wheelhouse import WheelhouseConfig
+from lithopscloud.modules.gen2.ray.preflight import RayPreflightConfig
 
-MODULES = [RayApiKeyConfig, RayEndpointConfig, RayVPCConfig,
-           RaySshKeyConfig, RayImageConfig, FloatingIpConfig, WorkersConfig, RayProfileConfig]
+# workers are sized before the vpc, whose subnets are sized by the number of workers
+MODULES = [RayApiKeyConfig, RayEndpointConfig, PrefetchConfig, WorkersConfig, RayVPCConfig,
+           RaySshKeyConfig, RayImageConfig, RayWorkerImageConfig, FloatingIpConfig, RayProfileConfig,
+           RayWorkerProfileConfig, WheelhouseConfig, RayPreflightConfig]
 
 from lithopscloud.main import load_base_config
 
 def load_config(backend, iam_api_key, region=None,
-                    image_id=None, profile_name='bx2-2x8',
+                    image_id=None, profile_name=None,
                     key_id=None, ssh_key_filename=None,
-                    vpc_id=None, min_workers=0, max_workers=0):
+                    vpc_id=None, min_workers=0, max_workers=0, wheelhouse=None,
+                    workload=None, parallelism=None, worker_profile_name=None, worker_image_id=None,
+                    worker_volume_tier_name=None, burst=None, quotas=None):
+    """image_id and profile_name are of the head node. worker nodes share them, unless their own worker_* were
+    specified or, for the profile, a workload to recommend it by. the autoscaler is tuned to start 'burst' workers
+    at once."""
     
     base_config = load_base_config(backend)
     
@@ -29,9 +39,27 @@ def load_config(backend, iam_api_key, region=None,
     base_config['provider']['region'] = region
     base_config['provider']['endpoint'] = f'https://{region}.iaas.cloud.ibm.com'
 
+    worker_node_config = base_config['available_node_types']['ray_worker_default']['node_config']
+    worker_node_config['vpc_id'] = vpc_id
+    worker_node_config['image_id'] = worker_image_id
+    worker_node_config['instance_profile_name'] = worker_profile_name
+    worker_node_config['key_id'] = key_id
+    if worker_volume_tier_name:
+        worker_node_config['volume_tier_name'] = worker_volume_tier_name
+
     base_config['max_workers'] = max_workers
-    base_config['available_node_types']['ray_head_default']['min_workers'] = min_workers
-    base_config['available_node_types']['ray_head_default']['max_workers'] = max_workers
+    base_config['available_node_types']['ray_worker_default']['min_workers'] = min_workers
+    base_config['available_node_types']['ray_worker_default']['max_workers'] = max_workers
+    set_autoscaler_tuning(base_config, burst, min_workers)
+
+    if workload and not worker_profile_name:  # 'cpu', 'memory', 'network' or 'gpu', consumed by ProfileConfig
+        base_config['workload'] = {'type': workload, 'parallelism': parallelism}
+
+    if wheelhouse:  # 'head' or 'local', consumed by WheelhouseConfig
+        base_config['wheelhouse'] = wheelhouse
+
+    if quotas:  # VPC quotas raised above the defaults, e.g. {'vcpu': 400}, consumed by PreflightConfig
+        base_config['quotas'] = quotas
     
     return base_config
 
@@ -42,6 +70,10 @@ def parse_config(config):
         res['vpc_id'] = config['available_node_types'][available_node_type]['node_config']['vpc_id']
         res['key_id'] = config['available_node_types'][available_node_type]['node_config']['key_id']     
         res['subnet_id'] = config['available_node_types'][available_node_type]['node_config']['subnet_id']
+
+    # subnets of all node types, which may differ in configs edited by the user
+    res['subnet_ids'] = list(dict.fromkeys(node_type['node_config']['subnet_id']
+                                           for node_type in config['available_node_types'].values()))
     
     res['endpoint'] = config['provider']['endpoint']
 
@@ -1,6 +1,5 @@
 from typing import Any, Dict
 from lithopscloud.modules.api_key import ApiKeyConfig
-from lithopscloud.modules.config_builder import ConfigBuilder
 from lithopscloud.modules.utils import verify_iam_api_key
 
 class RayApiKeyConfig(ApiKeyConfig):
@@ -24,6 +23,6 @@ class RayApiKeyConfig(ApiKeyConfig):
         api_key = base_config['provider']['iam_api_key']
 
         verify_iam_api_key(None, api_key)
-        ConfigBuilder.iam_api_key = api_key
+        self.iam_api_key = api_key
 
         return base_config
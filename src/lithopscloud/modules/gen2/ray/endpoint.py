@@ -1,7 +1,6 @@
 from lithopscloud.modules.gen2.endpoint import EndpointConfig
 from typing import Any, Dict
 from lithopscloud.modules.utils import get_region_by_endpoint
-from lithopscloud.modules.config_builder import ConfigBuilder
 
 class RayEndpointConfig(EndpointConfig):
 
@@ -13,7 +12,6 @@ class RayEndpointConfig(EndpointConfig):
             # when endpoint was provided directly by user instead of selecting it
             # we just set it
             if base_endpoint:
-                ConfigBuilder.ibm_vpc_client.set_service_url(base_endpoint + '/v1')
                 self.ibm_vpc_client.set_service_url(base_endpoint + '/v1')
 
             self.defaults['region'] = get_region_by_endpoint(
@@ -23,4 +21,4 @@ class RayEndpointConfig(EndpointConfig):
 
     def update_config(self, endpoint):
         self.base_config['provider']['endpoint'] = endpoint
-        self.base_config['provider']['region'] = ConfigBuilder.region
+        self.base_config['provider']['region'] = self.region
@@ -2,12 +2,16 @@ from lithopscloud.modules.config_builder import ConfigBuilder
 from typing import Any, Dict
 
 from lithopscloud.modules.utils import get_option_from_list
+from lithopscloud.modules.gen2.ray.workers import head_node_type
 
 class FloatingIpConfig(ConfigBuilder):
     
     def run(self) -> Dict[str, Any]:
         head_ip = None
-        floating_ips = self.ibm_vpc_client.list_floating_ips().get_result()['floating_ips']
+        # floating ips can't be filtered by zone server side, but by the resource group of the cluster
+        head_config = self.base_config['available_node_types'][head_node_type(self.base_config)]['node_config']
+        floating_ips = self.list_all('list_floating_ips', 'floating_ips',
+                                     resource_group_id=head_config['resource_group_id'])
         
         free_floating_ips = [ip for ip in floating_ips if not ip.get('target') and self.base_config['provider']['zone_name']==ip['zone']['name']]
         if free_floating_ips:
@@ -18,7 +22,8 @@ class FloatingIpConfig(ConfigBuilder):
                 
             if self.base_config.get('available_node_types'):
                 for available_node_type in self.base_config['available_node_types']:
-                    if head_ip:
+                    # only the head node is assigned the floating ip
+                    if head_ip and available_node_type == head_node_type(self.base_config):
                         self.base_config['available_node_types'][available_node_type]['node_config']['head_ip'] = head_ip
                     else:
                         self.base_config['available_node_types'][available_node_type]['node_config'].pop('head_ip', None)
@@ -1,26 +1,98 @@
 from typing import Any, Dict
+from lithopscloud.modules.cache import CATALOG_CACHE
 from lithopscloud.modules.gen2.image import ImageConfig
+from lithopscloud.modules.gen2.ray.profile import MOUNT_SPILL_DISK
+from lithopscloud.modules.gen2.ray.workers import head_node_type, worker_node_types
+from lithopscloud.modules.utils import find_default
+
+CUSTOM_IMAGE_SETUP_COMMANDS = ['rm -f ~/.ray/tags.json']
+
 
 class RayImageConfig(ImageConfig):
+    """chooses the image of the head node. see RayWorkerImageConfig for the worker nodes"""
+    node_description = 'head node'
     
     def __init__(self, base_config: Dict[str, Any]) -> None:
         super().__init__(base_config)
         
         if self.base_config.get('available_node_types'):
-            for available_node_type in self.base_config['available_node_types']:
+            for available_node_type in self._node_types():
                 self.defaults['image_id'] = self.base_config['available_node_types'][available_node_type]['node_config'].get('image_id')
                 break
-    
-    def update_config(self, image_id, minimum_provisioned_size, custom_image):
+
+    def _node_types(self):
+        """returns the node types the image is chosen for"""
+        return [head_node_type(self.base_config)]
+
+    def update_config(self, image_id, minimum_provisioned_size, custom_image, all_node_types=False):
         #minimum_provisioned_size will be used once non default image used
-        if self.base_config.get('available_node_types'):
-            for available_node_type in self.base_config['available_node_types']:
-                self.base_config['available_node_types'][available_node_type]['node_config']['image_id'] = image_id
-                self.base_config['available_node_types'][available_node_type]['node_config']['boot_volume_capacity'] = minimum_provisioned_size
-        else:
-            self.base_config['available_node_types']['ray_head_default']['node_config']['image_id'] = image_id
-            self.base_config['available_node_types']['ray_head_default']['node_config']['boot_volume_capacity'] = minimum_provisioned_size
-
-        # if custom image, all setup commands should be removed
+        node_types = self.base_config['available_node_types']
+        for available_node_type in (list(node_types) if all_node_types else self._node_types()):
+            node_config = node_types[available_node_type]['node_config']
+            node_config['image_id'] = image_id
+            node_config['boot_volume_capacity'] = minimum_provisioned_size
+
+    def _set_setup_commands(self, custom_node_types):
+        """drops the setup commands of configs whose node types all boot custom images, which were set up already.
+        when only some do, the setup commands are moved to those of the node types booting a stock image.
+        :param custom_node_types - names of the node types booting a custom image"""
+        # instance storage is mounted by every node, it isn't part of the image
+        commands = [c for c in self.base_config.get('setup_commands') or []
+                    if c not in CUSTOM_IMAGE_SETUP_COMMANDS + [MOUNT_SPILL_DISK]]
+        if not custom_node_types:
+            return
+
+        head_custom = head_node_type(self.base_config) in custom_node_types
+        workers_custom = all(node_type in custom_node_types for node_type in worker_node_types(self.base_config))
+        for commands_key, custom in [('head_setup_commands', head_custom), ('worker_setup_commands', workers_custom)]:
+            if not custom:
+                # run after the setup commands of all nodes, thus the moved ones come first
+                existing = self.base_config.get(commands_key) or []
+                self.base_config[commands_key] = commands + [c for c in existing if c not in commands]
+
+        spill = [MOUNT_SPILL_DISK] if MOUNT_SPILL_DISK in (self.base_config.get('setup_commands') or []) else []
+        self.base_config['setup_commands'] = CUSTOM_IMAGE_SETUP_COMMANDS + spill
+
+    def register_image(self, image, baked_commands):
+        """sets a custom image built by ImageBuilder for all node types, and drops the setup commands baked into it"""
+        remaining_commands = [c for c in self.base_config.get('setup_commands') or [] if c not in baked_commands]
+        self.update_config(image['id'], image['minimum_provisioned_size'], True, all_node_types=True)
+        self.base_config['setup_commands'] = CUSTOM_IMAGE_SETUP_COMMANDS + \
+            [c for c in remaining_commands if c not in CUSTOM_IMAGE_SETUP_COMMANDS]
+
+        CATALOG_CACHE.invalidate('images')  # lists the new image on the next image selection
+
+
+class RayWorkerImageConfig(RayImageConfig):
+    """chooses the image of the worker nodes, the head's unless they were given one of their own.
+    runs after RayImageConfig, thus sets the setup commands by the images of all node types"""
+    node_description = 'worker nodes'
+
+    def _node_types(self):
+        return worker_node_types(self.base_config)
+
+    def _head_image_id(self):
+        return self.base_config['available_node_types'][head_node_type(self.base_config)]['node_config']['image_id']
+
+    def _default_image(self, image_objects):
+        return find_default({'image_id': self.defaults.get('image_id') or self._head_image_id()}, image_objects,
+                            id='image_id') or super()._default_image(image_objects)
+
+    def verify(self, base_config):
+        if not self.defaults.get('image_id'):
+            # workers share the head's image unless an image was specified for them
+            self.defaults['image_id'] = self._head_image_id()
+        return super().verify(base_config)
+
+    def create_default(self):
+        return self.verify(self.base_config)
+
+    def update_config(self, image_id, minimum_provisioned_size, custom_image, all_node_types=False):
+        super().update_config(image_id, minimum_provisioned_size, custom_image, all_node_types)
+
+        custom_image_ids = {image['id'] for image in self._get_image_objects() if image['owner_type'] == 'user'}
         if custom_image:
-            self.base_config['setup_commands'] = ['rm -f ~/.ray/tags.json']
+            custom_image_ids.add(image_id)
+        node_types = self.base_config['available_node_types']
+        self._set_setup_commands([node_type for node_type in node_types
+                                  if node_types[node_type]['node_config'].get('image_id') in custom_image_ids])
@@ -0,0 +1,151 @@
+import os
+import shlex
+import subprocess
+import time
+import uuid
+
+from ibm_cloud_sdk_core import ApiException
+from lithopscloud.modules.gen2.ray.workers import head_node_type
+
+POLL_INTERVAL, MAX_POLL_INTERVAL = 2, 15  # seconds, doubling in between
+STATUS_TIMEOUT = 1800  # seconds to wait for the builder instance or the image to reach a status
+SSH_TIMEOUT = 600  # seconds to wait for the builder instance to accept ssh connections
+BUILDER_PREFIX = 'lithopscloud-image-builder'
+
+
+def ssh_runner(host, ssh_user, ssh_private_key):
+    """returns a function running a shell command on 'host' over ssh, the way ray runs setup commands (login shell)"""
+
+    def run(command):
+        ssh_command = ['ssh', '-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null',
+                       '-o', 'ConnectTimeout=10', '-o', 'LogLevel=ERROR',
+                       '-i', os.path.expanduser(ssh_private_key), f'{ssh_user}@{host}',
+                       f'bash --login -c -i {shlex.quote(command)}']
+        return subprocess.run(ssh_command).returncode
+
+    return run
+
+
+def head_node_config(config):
+    """returns the node config of the head node type of a ray gen2 config"""
+    node_types = config['available_node_types']
+    return node_types.get(head_node_type(config), next(iter(node_types.values())))['node_config']
+
+
+class ImageBuilder:
+    """Bakes the setup commands of a ray gen2 cluster config into a custom VPC image.
+
+    Boots a builder instance from the config's image, runs the setup commands on it, stops it and snapshots its boot
+    volume into a custom image. The builder instance and its floating ip are deleted once the image is available.
+
+    :param run_commands - callable receiving the builder's floating ip address and returning a function that runs
+                          a single command on it and returns its exit code. ssh by default."""
+
+    def __init__(self, ibm_vpc_client, run_commands=None, keep_builder=False):
+        self.ibm_vpc_client = ibm_vpc_client
+        self.run_commands = run_commands
+        self.keep_builder = keep_builder
+        self.timings = {}
+
+    def _wait_status(self, get_method, resource_id, status, failed=('failed',)):
+        interval = POLL_INTERVAL
+        deadline = time.time() + STATUS_TIMEOUT
+
+        while time.time() < deadline:
+            resource = get_method(resource_id).get_result()
+            if resource['status'] == status:
+                return resource
+            if resource['status'] in failed:
+                raise Exception(f"{resource_id} reached status {resource['status']} instead of {status}")
+
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+        raise Exception(f'Timed out waiting for {resource_id} to reach status {status}')
+
+    def _timed(self, name, start):
+        self.timings[name] = time.time() - start
+        print(f'{name}: {self.timings[name]:.1f}s')
+
+    def _create_builder(self, config, name):
+        node_config = head_node_config(config)
+        instance_prototype = {
+            'name': name,
+            'zone': {'name': config['provider']['zone_name']},
+            'vpc': {'id': node_config['vpc_id']},
+            'resource_group': {'id': node_config['resource_group_id']},
+            'profile': {'name': node_config['instance_profile_name']},
+            'image': {'id': node_config['image_id']},
+            'keys': [{'id': node_config['key_id']}],
+            'primary_network_interface': {'subnet': {'id': node_config['subnet_id']},
+                                          'security_groups': [{'id': node_config['security_group_id']}]},
+            'boot_volume_attachment': {'delete_volume_on_instance_delete': True,
+                                       'volume': {'capacity': node_config.get('boot_volume_capacity', 100),
+                                                  'profile': {'name': node_config['volume_tier_name']}}}
+        }
+        return self.ibm_vpc_client.create_instance(instance_prototype).get_result()
+
+    def _wait_ssh(self, run):
+        deadline = time.time() + SSH_TIMEOUT
+        while run('true') != 0:
+            if time.time() > deadline:
+                raise Exception('Timed out waiting for the builder instance to accept ssh connections')
+            time.sleep(POLL_INTERVAL)
+
+    def _delete_builder(self, instance, fip):
+        client = self.ibm_vpc_client
+        for delete_method, resource in ((client.delete_floating_ip, fip), (client.delete_instance, instance)):
+            if not resource:
+                continue
+            try:
+                delete_method(resource['id'])
+            except ApiException as e:
+                if e.code != 404:
+                    print(f"Failed to delete builder resource {resource['id']}: {e}")
+
+    def build(self, config, image_name=None, commands=None):
+        """builds a custom image with the setup commands of the ray gen2 'config' baked in
+        :param commands - the setup commands to bake, all of the config's if not specified
+        :returns the available image"""
+        client = self.ibm_vpc_client
+        commands = (config.get('setup_commands') or []) if commands is None else commands
+        suffix = str(uuid.uuid4())[:5]
+        image_name = image_name or f'ray-{suffix}'
+        node_config = head_node_config(config)
+
+        instance, fip = None, None
+        try:
+            start = time.time()
+            print(f'Creating builder instance {BUILDER_PREFIX}-{suffix}')
+            instance = self._create_builder(config, f'{BUILDER_PREFIX}-{suffix}')
+            instance = self._wait_status(client.get_instance, instance['id'], 'running')
+            fip = client.create_floating_ip({'name': f'{BUILDER_PREFIX}-{suffix}',
+                                             'target': {'id': instance['primary_network_interface']['id']}}
+                                            ).get_result()
+            self._timed('Builder instance', start)
+
+            start = time.time()
+            run_commands = self.run_commands or (lambda host: ssh_runner(host, config['auth']['ssh_user'],
+                                                                         config['auth']['ssh_private_key']))
+            run = run_commands(fip['address'])
+            self._wait_ssh(run)
+            for command in commands:
+                print(f'Running: {command}')
+                if run(command) != 0:
+                    raise Exception(f'Setup command failed: {command}')
+            self._timed('Setup commands', start)
+
+            start = time.time()
+            client.create_instance_action(instance['id'], 'stop')
+            self._wait_status(client.get_instance, instance['id'], 'stopped')
+            print(f"Creating image {image_name} from the builder's boot volume")
+            image = client.create_image({'name': image_name,
+                                         'resource_group': {'id': node_config['resource_group_id']},
+                                         'source_volume': {'id': instance['boot_volume_attachment']['volume']['id']}}
+                                        ).get_result()
+            image = self._wait_status(client.get_image, image['id'], 'available')
+            self._timed('Image', start)
+            return image
+        finally:
+            if not self.keep_builder:
+                self._delete_builder(instance, fip)
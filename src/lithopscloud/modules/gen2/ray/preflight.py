@@ -0,0 +1,21 @@
+from lithopscloud.modules.gen2.preflight import PreflightConfig
+from lithopscloud.modules.gen2.ray.workers import head_node_type, worker_node_types
+
+
+class RayPreflightConfig(PreflightConfig):
+
+    def _node_config(self, node_type):
+        return self.base_config['available_node_types'][node_type]['node_config']
+
+    def _head(self):
+        return self._node_config(head_node_type(self.base_config))['instance_profile_name']
+
+    def _workers(self):
+        return [(self._node_config(node_type)['instance_profile_name'],
+                 self.base_config['available_node_types'][node_type].get('max_workers', 0))
+                for node_type in worker_node_types(self.base_config)]
+
+    def _network(self):
+        head_config = self._node_config(head_node_type(self.base_config))
+        # a floating ip is allocated for the head, unless an existing one was chosen
+        return head_config['vpc_id'], self.base_config['provider']['zone_name'], 0 if head_config.get('head_ip') else 1
@@ -1,27 +1,121 @@
+import json
+import re
 from typing import Any, Dict
-from lithopscloud.modules.gen2.profile import ProfileConfig
+from lithopscloud.modules.gen2.profile import ProfileConfig, profile_attributes
+from lithopscloud.modules.gen2.ray.workers import head_node_type, worker_node_types
+
+OBJECT_STORE_FRACTION = 0.3  # of the node's memory, ray's default. the rest is the memory of tasks and actors
+SPILL_DIR = '/mnt/spill'
+MIN_SPILL_DISK_BYTES = 10 * 2 ** 30  # smaller unmounted disks, e.g. the cloud-init disk, aren't instance storage
+
+# formats and mounts the first unmounted instance storage disk for object spilling, on every node.
+# spills to the boot volume if no such disk is found.
+MOUNT_SPILL_DISK = f"mountpoint -q {SPILL_DIR} || (mkdir -p {SPILL_DIR} && " \
+                   f"DISK=$(lsblk -dbpno NAME,SIZE,TYPE,MOUNTPOINT | " \
+                   f"awk '$3 == \"disk\" && $4 == \"\" && $2 > {MIN_SPILL_DISK_BYTES} {{print $1; exit}}') && " \
+                   f"if [ -n \"$DISK\" ]; then mkfs.ext4 -q -F $DISK && mount $DISK {SPILL_DIR}; fi)"
+
+START_OPTIONS = re.compile(r" --object-store-memory=\S+| --system-config='[^']*'")
+
+
+def ray_resources(profile):
+    """returns the ray resources of a node of the profile, and its object store memory in bytes"""
+    vcpu, memory, _, gpus, _ = profile_attributes(profile)
+    memory_bytes = int(memory * 2 ** 30)
+    object_store_memory = int(memory_bytes * OBJECT_STORE_FRACTION)
+
+    resources = {'CPU': vcpu, 'memory': memory_bytes - object_store_memory, 'object_store_memory': object_store_memory}
+    if gpus:
+        resources['GPU'] = gpus
+    return resources, object_store_memory
+
 
 class RayProfileConfig(ProfileConfig):
-    
+    """chooses the profile of the head node. see RayWorkerProfileConfig for the worker nodes"""
+    workload_hints = False  # the head schedules the workload, which runs on the workers
+    node_description = 'head node'
+    start_commands_key = 'head_start_ray_commands'
+
     def __init__(self, base_config: Dict[str, Any]) -> None:
         super().__init__(base_config)
         if self.base_config.get('available_node_types'):
-            for available_node_type in self.base_config['available_node_types']:
+            for available_node_type in self._node_types():
                 self.defaults['profile_name'] = self.base_config['available_node_types'][available_node_type][
                     'node_config'].get('instance_profile_name')
                 break
-    
+
+    def _node_types(self):
+        """returns the node types the profile is chosen for"""
+        return [head_node_type(self.base_config)]
+
+    def _get_profile(self, profile_name):
+        return next((p for p in self._get_instance_profile_objects() if p['name'] == profile_name), None)
+
+    def _set_start_options(self, commands_key, object_store_memory):
+        """sets the object store size (and the spilling directory, on the head) of the 'ray start' command"""
+        options = f' --object-store-memory={object_store_memory}'
+        spill = MOUNT_SPILL_DISK in self.base_config['setup_commands']
+        if commands_key == 'head_start_ray_commands' and spill:
+            spilling_config = json.dumps({'type': 'filesystem', 'params': {'directory_path': SPILL_DIR}},
+                                         separators=(',', ':'))
+            system_config = json.dumps({'object_spilling_config': spilling_config}, separators=(',', ':'))
+            options += f" --system-config='{system_config}'"
+
+        self.base_config[commands_key] = [START_OPTIONS.sub('', command) + options if 'ray start' in command
+                                          else command for command in self.base_config.get(commands_key, [])]
+
+    def _set_spilling(self):
+        """spills objects to local instance storage rather than to the boot volume, if any node type has it"""
+        node_types = self.base_config['available_node_types']
+        profiles = [self._get_profile(node_types[node_type]['node_config'].get('instance_profile_name'))
+                    for node_type in node_types]
+        spill = any(profile and profile_attributes(profile)[4] for profile in profiles)
+
+        setup_commands = [c for c in self.base_config.get('setup_commands') or [] if c != MOUNT_SPILL_DISK]
+        self.base_config['setup_commands'] = setup_commands + ([MOUNT_SPILL_DISK] if spill else [])
+
     def update_config(self, profile_name):
+        profile = self._get_profile(profile_name)
+        if profile:
+            resources, object_store_memory = ray_resources(profile)
+        else:  # cpu number based on profile name
+            resources, object_store_memory = {'CPU': int(profile_name.split('-')[1].split('x')[0])}, None
 
-        # cpu number based on profile
-        cpu_num = int(profile_name.split('-')[1].split('x')[0])
+        for available_node_type in self._node_types():
+            self.base_config['available_node_types'][available_node_type][
+                'node_config']['instance_profile_name'] = profile_name
+            self.base_config['available_node_types'][available_node_type]['resources'] = dict(resources)
+
+        self._set_spilling()
+        if object_store_memory:
+            self._set_start_options(self.start_commands_key, object_store_memory)
 
-        if self.base_config.get('available_node_types'):
-            for available_node_type in self.base_config['available_node_types']:
-                self.base_config['available_node_types'][available_node_type][
-                    'node_config']['instance_profile_name'] = profile_name
-                self.base_config['available_node_types'][available_node_type]['resources']['CPU'] = cpu_num
-        else:
-            self.base_config['available_node_types']['ray_head_default']['node_config']['instance_profile_name'] = profile_name
-            self.base_config['available_node_types']['ray_head_default']['resources']['CPU'] = cpu_num
 
+class RayWorkerProfileConfig(RayProfileConfig):
+    """chooses the profile of the worker nodes, recommended by the workload"""
+    workload_hints = True
+    node_description = 'worker nodes'
+    start_commands_key = 'worker_start_ray_commands'
+
+    def _node_types(self):
+        return worker_node_types(self.base_config)
+
+    def _nodes(self):
+        return sum(self.base_config['available_node_types'][node_type].get('max_workers', 0)
+                   for node_type in self._node_types())
+
+    def verify(self, base_config):
+        if not self.defaults['profile_name'] and not base_config.get('workload'):
+            # workers share the head's profile unless a profile or workload was specified for them
+            head_config = base_config['available_node_types'][head_node_type(base_config)]['node_config']
+            self.defaults['profile_name'] = head_config['instance_profile_name']
+        return super().verify(base_config)
+
+    def update_config(self, profile_name):
+        super().update_config(profile_name)
+        # the spilling directory of the head's ray start may have changed with the workers' profile
+        head_profile = self._get_profile(
+            self.base_config['available_node_types'][head_node_type(self.base_config)]['node_config'].get(
+                'instance_profile_name'))
+        if head_profile:
+            self._set_start_options('head_start_ray_commands', ray_resources(head_profile)[1])
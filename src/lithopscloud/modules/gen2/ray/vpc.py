@@ -162,7 +162,10 @@ class RayVPCConfig(VPCConfig):
             for available_node_type in self.base_config['available_node_types']:
                 self.defaults['vpc_id'] = base_config['available_node_types'][available_node_type]['node_config'].get('vpc_id')
                 break        
-        
+
+    def _nodes(self):
+        return self.base_config.get('max_workers', 0) + 1  # and the head
+
     def update_config(self, vpc_obj, zone_obj, subnet_id):
         sec_group_id = vpc_obj['default_security_group']['id']
 
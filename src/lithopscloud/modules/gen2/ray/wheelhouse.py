@@ -0,0 +1,124 @@
+import hashlib
+import os
+import re
+import shlex
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+from lithopscloud.modules.config_builder import ConfigBuilder
+from lithopscloud.modules.utils import Color, color_msg, inquire_user
+
+WHEELHOUSE_HEAD, WHEELHOUSE_LOCAL = 'head', 'local'
+WHEELHOUSE_PATH = '~/wheelhouse'  # on the cluster nodes
+LOCAL_WHEELHOUSE_DIR = os.path.join(str(Path.home()), '.lithopscloud', 'wheelhouse')
+NODE_PYTHON_VERSION, NODE_PLATFORM = '3.8', 'manylinux2014_x86_64'  # python the default setup commands install
+COMPLETE_MARKER = '.complete'
+BUILD_REQUIREMENTS = ('setuptools', 'wheel')  # of packages published as sdists only, e.g. gym
+
+PIP_INSTALL = re.compile(r'\bpip install ((?:(?!&&|\|\||;|\)).)+)')
+
+
+def pip_packages(commands):
+    """returns the packages the pip installs of 'commands' install, in order of appearance"""
+    packages = []
+    for command in commands:
+        for args in PIP_INSTALL.findall(command):
+            for package in shlex.split(args):
+                if not package.startswith('-') and package not in packages:
+                    packages.append(package)
+    return packages
+
+
+def use_wheelhouse(command):
+    """returns 'command' with its pip installs served from the wheelhouse only"""
+    return PIP_INSTALL.sub(rf'pip install --no-index --find-links {WHEELHOUSE_PATH} \1', command)
+
+
+def build_local_wheelhouse(packages):
+    """downloads wheels of 'packages' for the python and platform of the cluster nodes into a local directory,
+    shared by configs of the same packages. returns the directory.
+    fails for packages without a wheel for the nodes, as they can't be built locally for their platform"""
+    digest = hashlib.sha256(' '.join(sorted(packages)).encode()).hexdigest()[:12]
+    wheelhouse_dir = os.path.join(LOCAL_WHEELHOUSE_DIR, digest)
+    if os.path.exists(os.path.join(wheelhouse_dir, COMPLETE_MARKER)):
+        return wheelhouse_dir
+
+    print(f'Downloading wheels of {len(packages)} packages to {wheelhouse_dir}...')
+    subprocess.run([sys.executable, '-m', 'pip', 'download', '--dest', wheelhouse_dir, '--only-binary=:all:',
+                    '--python-version', NODE_PYTHON_VERSION, '--platform', NODE_PLATFORM, *packages], check=True)
+    Path(wheelhouse_dir, COMPLETE_MARKER).touch()
+    return wheelhouse_dir
+
+
+class WheelhouseConfig(ConfigBuilder):
+    """Serves the pip installs of the nodes' setup commands from a wheelhouse, instead of every node downloading
+    the packages from PyPI.
+
+    The wheelhouse is either built on the head node by its setup commands and synced to the workers
+    (cluster_synced_files), or built locally and uploaded to all nodes (file_mounts)."""
+
+    def run(self) -> Dict[str, Any]:
+        choices = ['no', 'yes, built on the head node', 'yes, built locally and uploaded to all nodes']
+        answer = inquire_user('Install the python packages of the nodes from a wheelhouse?', choices,
+                              handle_strings=True)
+        mode = {choices[1]: WHEELHOUSE_HEAD, choices[2]: WHEELHOUSE_LOCAL}.get(answer)
+        if mode:
+            self.update_config(mode)
+        return self.base_config
+
+    def verify(self, base_config):
+        mode = base_config.pop('wheelhouse', None)
+        if mode and mode not in (WHEELHOUSE_HEAD, WHEELHOUSE_LOCAL):
+            raise Exception(f'wheelhouse must be either {WHEELHOUSE_HEAD} or {WHEELHOUSE_LOCAL}')
+        if mode:
+            self.update_config(mode)
+        return base_config
+
+    def create_default(self):
+        return self.base_config
+
+    def update_config(self, mode):
+        # the setup commands of the node types booting a stock image, when others boot a custom one (see RayImageConfig)
+        commands_key = next((key for key in ('setup_commands', 'worker_setup_commands', 'head_setup_commands')
+                             if pip_packages(self.base_config.get(key) or [])), 'setup_commands')
+        commands = self.base_config.get(commands_key) or []
+        packages = pip_packages(commands)
+        if not packages:
+            return self.base_config
+        if mode == WHEELHOUSE_HEAD and commands_key == 'worker_setup_commands':
+            raise Exception(f'The head node boots a custom image, thus installs no packages to build the wheelhouse '
+                            f'of the workers. Use the {WHEELHOUSE_LOCAL} wheelhouse')
+
+        remote_path = WHEELHOUSE_PATH.replace('~', '/root' if self.base_config['auth']['ssh_user'] == 'root'
+                                              else f"/home/{self.base_config['auth']['ssh_user']}")
+        if mode == WHEELHOUSE_LOCAL:
+            try:
+                wheelhouse_dir = build_local_wheelhouse(packages)
+            except subprocess.CalledProcessError as e:
+                raise Exception(f'Failed to download wheels of all packages for the nodes platform, e.g. of packages '
+                                f'published as sdists only. Use the {WHEELHOUSE_HEAD} wheelhouse, which builds their '
+                                f'wheels on the head node') from e
+            self.base_config['file_mounts'] = {**(self.base_config.get('file_mounts') or {}),
+                                               remote_path: wheelhouse_dir}
+            setup_commands = [use_wheelhouse(command) for command in commands]
+        else:
+            # the head builds the wheelhouse with the pip the first commands install, before its first pip install.
+            # workers receive it from the head before running their setup commands, and skip building it.
+            # pip wheel builds the wheels of sdists too, which the offline installs can't build without the build
+            # requirements, thus these are wheeled as well.
+            first_install = next(i for i, command in enumerate(commands) if PIP_INSTALL.search(command))
+            marker = f'{WHEELHOUSE_PATH}/{COMPLETE_MARKER}'
+            build_command = f"test -f {marker} || (pip wheel --wheel-dir {WHEELHOUSE_PATH} " \
+                            f"{' '.join(shlex.quote(p) for p in (*BUILD_REQUIREMENTS, *packages))} && touch {marker})"
+            setup_commands = commands[:first_install] + [build_command] + \
+                             [use_wheelhouse(command) for command in commands[first_install:]]
+            synced_files = self.base_config.get('cluster_synced_files') or []
+            if remote_path not in synced_files:
+                self.base_config['cluster_synced_files'] = synced_files + [remote_path]
+
+        self.base_config[commands_key] = setup_commands
+        print(color_msg(f'Nodes will install {len(packages)} packages from the wheelhouse at {remote_path}',
+                        color=Color.LIGHTGREEN))
+        return self.base_config
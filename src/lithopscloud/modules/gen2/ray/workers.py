@@ -1,17 +1,87 @@
+import copy
+import math
 import re
 from typing import Any, Dict
 
 import inquirer
 from lithopscloud.modules.config_builder import ConfigBuilder
-from lithopscloud.modules.utils import find_default, get_option_from_list
+from lithopscloud.modules.utils import get_option_from_list
+
+HEAD_NODE_TYPE, WORKER_NODE_TYPE = 'ray_head_default', 'ray_worker_default'
+VOLUME_TIERS = ['general-purpose', '5iops-tier', '10iops-tier']
+MIN_PENDING_NODES = 5  # the autoscaler launches at least this many nodes at once, whatever the upscaling speed
+DEFAULT_IDLE_TIMEOUT, BURST_IDLE_TIMEOUT = 5, 10  # minutes
+
+
+def head_node_type(config):
+    return config.get('head_node_type', HEAD_NODE_TYPE)
+
+
+def worker_node_types(config):
+    """returns the names of the node types of a ray config other than the head's"""
+    return [node_type for node_type in config.get('available_node_types', {}) if node_type != head_node_type(config)]
+
+
+def split_evenly(total, parts):
+    """returns 'total' split into 'parts' counts differing by one at most, larger first"""
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def ensure_worker_node_type(config):
+    """adds a worker node type based on the head's node config to configs that have none, e.g. older ones"""
+    node_types = config['available_node_types']
+    if not worker_node_types(config):
+        head = node_types[head_node_type(config)]
+        node_types[WORKER_NODE_TYPE] = {'min_workers': head.get('min_workers', 0),
+                                        'max_workers': head.get('max_workers', 0),
+                                        'resources': dict(head.get('resources', {})),
+                                        'node_config': copy.deepcopy(head['node_config'])}
+        node_types[WORKER_NODE_TYPE]['node_config'].pop('head_ip', None)
+        head['min_workers'], head['max_workers'] = 0, 0
+    else:  # the shared fields of worker types created by the template are filled by the modules before
+        head_config = node_types[head_node_type(config)]['node_config']
+        for node_type in worker_node_types(config):
+            node_config = node_types[node_type]['node_config']
+            for key, value in head_config.items():
+                if not node_config.get(key) and key != 'head_ip':
+                    node_config[key] = value
+
+
+def set_autoscaler_tuning(config, burst, min_workers=0):
+    """sets the autoscaler's upscaling speed and idle timeout for bursts of 'burst' workers.
+    the autoscaler launches up to upscaling_speed * running nodes at once, thus a burst starting from the head and
+    the min workers is launched in a single round. nodes of large bursts are kept longer between bursts, as replacing
+    them takes a full boot."""
+    if not burst:
+        return config
+    config['upscaling_speed'] = float(max(1, math.ceil(burst / (min_workers + 1))))
+    config['idle_timeout_minutes'] = DEFAULT_IDLE_TIMEOUT if burst <= MIN_PENDING_NODES else BURST_IDLE_TIMEOUT
+    return config
 
 
 class WorkersConfig(ConfigBuilder):
+    """Sizes the worker node type of the cluster independently of the head node type, which runs no workers"""
+
+    def _set_workers(self, min_workers, max_workers):
+        """sets the worker counts of the cluster, split between its worker node types, e.g. those added by the user"""
+        node_types = self.base_config['available_node_types']
+        node_types[head_node_type(self.base_config)]['min_workers'] = 0
+        node_types[head_node_type(self.base_config)]['max_workers'] = 0
+        worker_types = worker_node_types(self.base_config)
+        for node_type, min_count, max_count in zip(worker_types, split_evenly(min_workers, len(worker_types)),
+                                                   split_evenly(max_workers, len(worker_types))):
+            node_types[node_type]['min_workers'] = min_count
+            node_types[node_type]['max_workers'] = max_count
+        self.base_config['max_workers'] = max_workers
 
     def run(self) -> Dict[str, Any]:
+        ensure_worker_node_type(self.base_config)
+        workers = [self.base_config['available_node_types'][t] for t in worker_node_types(self.base_config)]
+        worker = workers[0]
+
         default_cluster_name = self.base_config.get('cluster_name', 'default')
-        default_min_workers = self.base_config.get('min_workers', '0')
-        default_max_workers = default_min_workers
+        default_min_workers = str(sum(w.get('min_workers', 0) for w in workers))
+        default_max_workers = str(sum(w.get('max_workers', w.get('min_workers', 0)) for w in workers))
 
         question = [
             inquirer.Text(
@@ -19,32 +89,33 @@ class WorkersConfig(ConfigBuilder):
             inquirer.Text('min_workers', message="Minimum number of worker nodes",
                           default=default_min_workers, validate=lambda _, x: re.match('^[+]?[0-9]+$', x)),
             inquirer.Text('max_workers', message="Maximum number of worker nodes", default=default_max_workers,
-                          validate=lambda answers, x: re.match('^[+]?[0-9]+$', x) and int(x) >= int(answers['min_workers']))
+                          validate=lambda answers, x: re.match('^[+]?[0-9]+$', x) and int(x) >= int(answers['min_workers'])),
+            inquirer.Text('burst', message="Largest number of worker nodes needed at once",
+                          default=lambda answers: answers['max_workers'],
+                          validate=lambda answers, x: re.match('^[+]?[0-9]+$', x) and int(x) <= int(answers['max_workers']))
         ]
 
         answers = inquirer.prompt(question, raise_keyboard_interrupt=True)
         self.base_config['cluster_name'] = answers['name']
-        self.base_config['max_workers'] = int(answers['max_workers'])
-
-        if self.base_config.get('available_node_types'):
-            for available_node_type in self.base_config['available_node_types']:
-                self.base_config['available_node_types'][available_node_type]['min_workers'] = int(
-                    answers['min_workers'])
-                self.base_config['available_node_types'][available_node_type]['max_workers'] = int(
-                    answers['max_workers'])
-        else:
-            self.base_config['available_node_types']['ray_head_default']['min_workers'] = int(
-                answers['min_workers'])
-            self.base_config['available_node_types']['ray_head_default']['max_workers'] = int(
-                answers['max_workers'])
+        self._set_workers(int(answers['min_workers']), int(answers['max_workers']))
+        set_autoscaler_tuning(self.base_config, int(answers['burst']), int(answers['min_workers']))
+
+        volume_tier = get_option_from_list('Choose the volume tier of the worker nodes',
+                                           [{'name': tier} for tier in VOLUME_TIERS],
+                                           default=worker['node_config'].get('volume_tier_name'))
+        for node_type in worker_node_types(self.base_config):
+            self.base_config['available_node_types'][node_type]['node_config']['volume_tier_name'] = volume_tier['name']
 
         return self.base_config
-    
+
     def verify(self, base_config):
-        min_workers = base_config['available_node_types']['ray_head_default']['min_workers']
-        max_workers = base_config['available_node_types']['ray_head_default']['max_workers']
-        
-        if max_workers < min_workers:
-            raise Exception(f'specified min workers {min_workers} larger than max workers {max_workers}')
+        ensure_worker_node_type(base_config)
+
+        for node_type in worker_node_types(base_config):
+            min_workers = base_config['available_node_types'][node_type]['min_workers']
+            max_workers = base_config['available_node_types'][node_type]['max_workers']
+
+            if max_workers < min_workers:
+                raise Exception(f'specified min workers {min_workers} larger than max workers {max_workers}')
 
         return base_config
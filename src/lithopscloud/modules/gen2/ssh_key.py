@@ -1,5 +1,6 @@
 import os
 import subprocess
+import threading
 from typing import Any, Dict
 from pathlib import Path
 
@@ -8,33 +9,40 @@ from inquirer import errors
 from lithopscloud.modules.config_builder import ConfigBuilder, update_decorator, spinner
 from lithopscloud.modules.utils import (find_default, find_name_id,
                                         validate_exists, validate_not_empty)
+from lithopscloud.modules.pager import iter_pages
 
 from ibm_cloud_sdk_core import ApiException
 DEFAULT_KEY_NAME = 'lithops-default'
+KEY_FIELDS = ('id', 'name', 'public_key')  # of the ssh key listings
+_keypairs = {}  # key name -> (public key's contents, private key's path) generated by this process
+_keypairs_lock = threading.RLock()
         
 def generate_keypair(keyname):
-    """Returns newly generated public ssh-key's contents and private key's path"""
-    home = str(Path.home())
-    filename = f"{home}{os.sep}.ssh{os.sep}id.rsa.{keyname}"
-    try:
-        os.remove(filename)
-    except Exception:
-        pass
-
-    os.system(f'ssh-keygen -b 2048 -t rsa -f {filename} -q -N ""')
-    print(f"\n\n\033[92mSSH key pair been generated\n")
-    print(f"private key: {os.path.abspath(filename)}")
-    print(f"public key {os.path.abspath(filename)}.pub\033[0m")
-    with open(f"{filename}.pub", 'r') as file:
-        ssh_key_data = file.read()
-    ssh_key_path = os.path.abspath(filename)
-    return ssh_key_data, ssh_key_path
+    """Returns newly generated public ssh-key's contents and private key's path.
+    the key pair is generated once per process and name, as concurrent config generations would overwrite the same
+    files, leaving the key registered by one of them unmatched"""
+    with _keypairs_lock:
+        if keyname not in _keypairs:
+            home = str(Path.home())
+            filename = f"{home}{os.sep}.ssh{os.sep}id.rsa.{keyname}"
+            try:
+                os.remove(filename)
+            except Exception:
+                pass
+
+            os.system(f'ssh-keygen -b 2048 -t rsa -f {filename} -q -N ""')
+            print(f"\n\n\033[92mSSH key pair been generated\n")
+            print(f"private key: {os.path.abspath(filename)}")
+            print(f"public key {os.path.abspath(filename)}.pub\033[0m")
+            with open(f"{filename}.pub", 'r') as file:
+                ssh_key_data = file.read()
+            _keypairs[keyname] = ssh_key_data, os.path.abspath(filename)
+        return _keypairs[keyname]
 
 def get_ssh_key(ibm_vpc_client, name):
     """Returns ssh key matching specified name, stored in the VPC associated with the vpc_client"""
-    for key in ibm_vpc_client.list_keys().result['keys']:
-        if key['name'] == name:
-            return key
+    fetch = ConfigBuilder.session_cache.page_fetch(ibm_vpc_client, 'list_keys')
+    return next((key for key in iter_pages(fetch, 'keys', KEY_FIELDS) if key['name'] == name), None)
                     
 def register_ssh_key(ibm_vpc_client, config, auto=False):
     """Returns the key's name on the VPC platform, it's public key's contents and the local path to it.
@@ -107,6 +115,7 @@ def register_ssh_key(ibm_vpc_client, config, auto=False):
             response = ibm_vpc_client.create_key(public_key=ssh_key_data, name=keyname, resource_group={
                                         "id": resource_group_id}, type='rsa')        
             
+    ConfigBuilder.session_cache.invalidate('list_keys')
     print(f"\033[92mnew SSH key {keyname} been registered in vpc\033[0m")
 
     result = response.get_result()
@@ -127,7 +136,7 @@ class SshKeyConfig(ConfigBuilder):
             raise errors.ValidationError(
             '', reason=f"File {current} doesn't exist")
 
-        public_res = self.ibm_vpc_client.get_key(self.ssh_key_id).get_result()['public_key'].split(' ')[1]
+        public_res = self.session_cache.call(self.ibm_vpc_client, 'get_key', self.ssh_key_id)['public_key'].split(' ')[1]
         private_res = subprocess.getoutput([f"ssh-keygen -y -f {current} | cut -d' ' -f 2"])
 
         if not public_res == private_res:
@@ -140,7 +149,7 @@ class SshKeyConfig(ConfigBuilder):
     def run(self) -> Dict[str, Any]:
         @spinner
         def get_ssh_key_objects():
-            return self.ibm_vpc_client.list_keys().get_result()['keys']
+            return self.list_all('list_keys', 'keys', KEY_FIELDS)
 
         ssh_key_objects = get_ssh_key_objects()
 
@@ -182,7 +191,7 @@ class SshKeyConfig(ConfigBuilder):
                 break
         
         def is_pair(id, ssh_key_filename):
-            public_res = self.ibm_vpc_client.get_key(id).get_result()['public_key'].split(' ')[1]
+            public_res = self.session_cache.call(self.ibm_vpc_client, 'get_key', id)['public_key'].split(' ')[1]
             private_res = subprocess.getoutput([f"ssh-keygen -y -f {ssh_key_filename} | cut -d' ' -f 2"])
             return public_res == private_res
 
@@ -208,22 +217,28 @@ class SshKeyConfig(ConfigBuilder):
             response = self.ibm_vpc_client.create_key(public_key=ssh_key_data, name=default_keyname, resource_group={
                                         "id": resource_group_id}, type='rsa')
             print(f"\033[92mnew SSH key {default_keyname} been registered in vpc\033[0m")
+            self.session_cache.invalidate('list_keys')
             result = response.get_result()
             return result['id'], self.defaults['ssh_key_filename'], 'root'
         else:
-            # check if there default ssh key already in vpc
-            default_key = get_ssh_key(self.ibm_vpc_client, default_keyname)
-            if default_key:
-                self.ibm_vpc_client.delete_key(id=default_key['id'])
-
-            # no ssh key information been provided by user, generate new keypair
-            ssh_key_data, ssh_key_path = generate_keypair(default_keyname)    
-
-            response = self.ibm_vpc_client.create_key(public_key=ssh_key_data, name=default_keyname, resource_group={
-                                        "id": resource_group_id}, type='rsa')
-            print(f"\033[92mnew SSH key {default_keyname} been registered in vpc\033[0m")
-            result = response.get_result()
-            return result['id'], ssh_key_path, 'root'
+            # concurrent runs of the process register the default key one at a time, see generate_keypair
+            with _keypairs_lock:
+                # no ssh key information been provided by user, generate new keypair
+                ssh_key_data, ssh_key_path = generate_keypair(default_keyname)
+
+                # check if there default ssh key already in vpc
+                default_key = get_ssh_key(self.ibm_vpc_client, default_keyname)
+                if default_key and default_key.get('public_key', '').split()[1:2] == ssh_key_data.split()[1:2]:
+                    return default_key['id'], ssh_key_path, 'root'  # registered by an earlier run of the process
+                if default_key:
+                    self.ibm_vpc_client.delete_key(id=default_key['id'])
+
+                response = self.ibm_vpc_client.create_key(public_key=ssh_key_data, name=default_keyname,
+                                                          resource_group={"id": resource_group_id}, type='rsa')
+                print(f"\033[92mnew SSH key {default_keyname} been registered in vpc\033[0m")
+                self.session_cache.invalidate('list_keys')
+                result = response.get_result()
+                return result['id'], ssh_key_path, 'root'
 
     @update_decorator
     def create_default(self):
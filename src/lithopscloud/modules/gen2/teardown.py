@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ibm_cloud_sdk_core import ApiException
+from lithopscloud.modules.pager import iter_pages
+
+MAX_TEARDOWN_WORKERS = 16
+POLL_INTERVAL, MAX_POLL_INTERVAL = 1, 10  # seconds, doubling in between
+DELETION_TIMEOUT = 900  # seconds to wait for a single resource to disappear
+
+
+def list_all(method, result_key, **kwargs):
+    """returns the objects of all pages of a VPC list call"""
+    return list(iter_pages(lambda **paging: method(**kwargs, **paging).get_result(), result_key))
+
+
+class Teardown:
+    """Deletes the VPC resources of a gen2 cluster following their dependency graph:
+    floating ips (and the ssh key) -> instances -> subnets -> public gateways -> vpc.
+
+    Every level is deleted concurrently with bounded parallelism, and the next level starts once the status polling
+    (with exponential backoff) of the previous level confirms its resources are gone."""
+
+    def __init__(self, ibm_vpc_client, max_workers=MAX_TEARDOWN_WORKERS):
+        self.ibm_vpc_client = ibm_vpc_client
+        self.max_workers = max_workers
+        self.timings = {}
+
+    def _wait_deleted(self, get_method, resource_id):
+        interval = POLL_INTERVAL
+        deadline = time.time() + DELETION_TIMEOUT
+
+        while time.time() < deadline:
+            try:
+                get_method(resource_id)
+            except ApiException as e:
+                if e.code == 404:
+                    return
+                raise e
+
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+        raise Exception(f'Timed out waiting for {resource_id} to be deleted')
+
+    def _delete(self, delete_method, get_method, resource_id):
+        try:
+            delete_method(resource_id)
+        except ApiException as e:
+            if e.code == 404:
+                return
+            raise e
+
+        if get_method:
+            self._wait_deleted(get_method, resource_id)
+
+    def _run_phase(self, executor, name, resources):
+        """deletes the (delete_method, get_method, resource_id) tuples in 'resources' concurrently"""
+        start = time.time()
+        futures = [executor.submit(self._delete, *resource) for resource in resources]
+        for future in futures:
+            future.result()  # propagate the first failure
+
+        self.timings[name] = time.time() - start
+        print(f'{name}: deleted {len(resources)} in {self.timings[name]:.1f}s')
+
+    def run(self, vpc_config):
+        """deletes the cluster resources of the vpc described by 'vpc_config' (see gen2.<backend>.parse_config)
+        :returns seconds spent per phase"""
+        client = self.ibm_vpc_client
+        vpc_id = vpc_config['vpc_id']
+        subnet_ids = vpc_config.get('subnet_ids') or [vpc_config['subnet_id']]
+
+        resource_group_id = client.get_vpc(vpc_id).get_result()['resource_group']['id']
+        instances = list_all(client.list_instances, 'instances', vpc_id=vpc_id)
+        interface_ids = {interface['id'] for ins in instances for interface in ins['network_interfaces']}
+
+        # a single listing of the cluster's resource group instead of a lookup per instance. floating ips and
+        # gateways can't be filtered by vpc server side
+        fips = [fip for fip in list_all(client.list_floating_ips, 'floating_ips', resource_group_id=resource_group_id)
+                if (fip.get('target') or {}).get('id') in interface_ids]
+        gateway_ids = {subnet['public_gateway']['id'] for subnet in
+                       list_all(client.list_subnets, 'subnets', vpc_id=vpc_id) if subnet.get('public_gateway')}
+
+        for ins in instances:
+            print('Deleting instance {}'.format(ins['name']))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            phase = [(client.delete_floating_ip, client.get_floating_ip, fip['id']) for fip in fips]
+            if vpc_config.get('key_id'):
+                phase.append((client.delete_key, None, vpc_config['key_id']))
+            self._run_phase(executor, 'Floating ips and ssh key', phase)
+
+            self._run_phase(executor, 'Instances',
+                            [(client.delete_instance, client.get_instance, ins['id']) for ins in instances])
+
+            self._run_phase(executor, 'Subnets',
+                            [(client.delete_subnet, client.get_subnet, subnet_id) for subnet_id in subnet_ids])
+
+            # gateways of the cluster's subnets, and detached ones of the vpc
+            gateway_ids |= {gw['id'] for gw in list_all(client.list_public_gateways, 'public_gateways',
+                                                        resource_group_id=resource_group_id)
+                            if gw['vpc']['id'] == vpc_id}
+            self._run_phase(executor, 'Gateways',
+                            [(client.delete_public_gateway, client.get_public_gateway, gw_id) for gw_id in gateway_ids])
+
+            self._run_phase(executor, 'VPC', [(client.delete_vpc, client.get_vpc, vpc_id)])
+
+        return self.timings
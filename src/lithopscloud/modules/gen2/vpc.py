@@ -1,11 +1,48 @@
+import math
+import uuid
 from typing import Any, Dict
 
 import inquirer
 from lithopscloud.modules.config_builder import ConfigBuilder, update_decorator, spinner
 from lithopscloud.modules.utils import (find_default, find_name_id,
+                                        get_confirmation,
                                         get_option_from_list,
                                         get_region_by_endpoint,
-                                        validate_not_empty, CACHE)
+                                        validate_not_empty)
+
+RESERVED_SUBNET_ADDRESSES = 5  # network, gateway, broadcast and two more addresses of each subnet reserved by IBM Cloud
+MIN_SUBNET_SIZE = 64  # leaves room for growing small clusters without a new subnet
+MAX_SUBNET_SIZE = 2 ** 14  # the zone's address prefix of VPCs with automatic address prefixes (/18)
+DEFAULT_SUBNET_SIZE = 256  # for backends whose number of nodes isn't known ahead
+SUBNET_HEADROOM = 2  # addresses per node, as addresses of deleted nodes are released a while after their deletion
+VPC_FIELDS = ('id', 'name', 'resource_group', 'default_security_group')  # of the vpc listings
+
+
+def subnet_size(nodes):
+    """returns the total address count of the subnet of a cluster of 'nodes' nodes"""
+    if not nodes:
+        return DEFAULT_SUBNET_SIZE
+    addresses = nodes * SUBNET_HEADROOM + RESERVED_SUBNET_ADDRESSES
+    return min(max(2 ** math.ceil(math.log2(addresses)), MIN_SUBNET_SIZE), MAX_SUBNET_SIZE)
+
+
+def free_addresses(subnet_obj):
+    return subnet_obj.get('available_ipv4_address_count', 0)
+
+
+def rank_subnets(subnet_objects):
+    """returns the subnets ranked by their free addresses, most first"""
+    return sorted(subnet_objects, key=lambda s: -free_addresses(s))
+
+
+def zone_free_addresses(subnet_objects, vpc_id):
+    """returns zone name -> free addresses of the subnet of the vpc with the most of them in the zone"""
+    zones = {}
+    for subnet_obj in subnet_objects:
+        if subnet_obj['vpc']['id'] == vpc_id:
+            zone = subnet_obj['zone']['name']
+            zones[zone] = max(zones.get(zone, 0), free_addresses(subnet_obj))
+    return zones
 
 
 class VPCConfig(ConfigBuilder):
@@ -22,9 +59,88 @@ class VPCConfig(ConfigBuilder):
         try:
             region = get_region_by_endpoint(self.ibm_vpc_client.service_url)
         except Exception:
-            region = ConfigBuilder.region
+            region = self.region
         return region
 
+    def _get_zones_objects(self, region):
+        return self.get_catalog('zones', region)
+
+    def _nodes(self):
+        """returns the maximal number of nodes of the cluster, None if the backend doesn't set it ahead"""
+        return None
+
+    def _zone_gateway_id(self, vpc_obj, zone_obj, resource_group, subnet_name):
+        """returns the public gateway of the vpc in the zone, created if missing, as a zone has one at most"""
+        # the gateway attached to a subnet of the zone, else one of the vpc's resource group. gateways can't be
+        # filtered by vpc server side
+        subnets = self.list_all('list_subnets', 'subnets', vpc_id=vpc_obj['id'], zone_name=zone_obj['name'])
+        gateway = next((s['public_gateway'] for s in subnets if s.get('public_gateway')), None)
+        if not gateway:
+            gateways = self.list_all('list_public_gateways', 'public_gateways',
+                                     resource_group_id=vpc_obj['resource_group']['id'])
+            gateway = next((gw for gw in gateways if gw['vpc']['id'] == vpc_obj['id'] and
+                            gw['zone']['name'] == zone_obj['name']), None)
+        return gateway['id'] if gateway else self.create_public_gateway(vpc_obj, zone_obj, resource_group, subnet_name)
+
+    def _create_subnet(self, vpc_obj, zone_obj, resource_group, subnet_name, size):
+        """creates a subnet of 'size' addresses in the zone, attached to its public gateway. returns its id"""
+        subnet_prototype = {}
+        subnet_prototype['zone'] = {'name': zone_obj['name']}
+        subnet_prototype['ip_version'] = 'ipv4'
+        subnet_prototype['name'] = subnet_name
+        subnet_prototype['resource_group'] = resource_group
+        subnet_prototype['vpc'] = {'id': vpc_obj['id']}
+        subnet_prototype['total_ipv4_address_count'] = size
+
+        subnet_data = self.ibm_vpc_client.create_subnet(subnet_prototype).result
+        gateway_id = self._zone_gateway_id(vpc_obj, zone_obj, resource_group, subnet_name)
+        self.ibm_vpc_client.set_subnet_public_gateway(subnet_data['id'], {'id': gateway_id})
+
+        print(f"\033[92mVPC subnet {subnet_name} of {size} addresses been created in zone {zone_obj['name']} "
+              f"and attached to gateway\033[0m")
+        return subnet_data['id']
+
+    def _keep_small_subnet(self, subnet_obj, zone_obj, nodes, auto):
+        """warns that 'subnet_obj' has no room for the cluster's 'nodes' nodes. returns whether to use it anyway rather
+        than to create a larger subnet next to it. non interactive runs fail instead, as teardown deletes the subnet
+        of the config only, thus the vpc would be left with a subnet of no config"""
+        message = f"Subnet {subnet_obj['name']} has {free_addresses(subnet_obj)} free addresses, fewer than the " \
+                  f"{nodes} nodes of the cluster in zone {zone_obj['name']}"
+        if auto:
+            raise Exception(f'{message}. Lower the max workers of the cluster, or specify a vpc with a larger subnet')
+        print(f"\033[91m{message}\033[0m")
+        return not get_confirmation(f"Create a larger subnet in zone {zone_obj['name']}? "
+                                    f"(otherwise the cluster can't scale out to its max workers)", default=True)['answer']
+
+    def _zone_subnet(self, vpc_obj, zone_obj, resource_group, auto=True):
+        """returns the id of a subnet of the vpc in the zone, with a public gateway.
+        the subnet with the most free addresses is used, if it has room for the cluster's nodes. otherwise, and in
+        zones missing a subnet, a subnet sized for the cluster is created"""
+        nodes = self._nodes()
+        subnet_objects = [s for s in self.list_all('list_subnets', 'subnets', vpc_id=vpc_obj['id'])
+                          if s['vpc']['id'] == vpc_obj['id']]
+        ranked = rank_subnets([s for s in subnet_objects if s['zone']['name'] == zone_obj['name']])
+        subnet_obj = ranked[0] if ranked else None
+
+        if subnet_obj and nodes and free_addresses(subnet_obj) < nodes and \
+                not self._keep_small_subnet(subnet_obj, zone_obj, nodes, auto):
+            subnet_obj = None
+
+        if subnet_obj:
+            subnet_id = subnet_obj['id']
+            if not subnet_obj.get('public_gateway'):
+                gateway_id = self._zone_gateway_id(vpc_obj, zone_obj, resource_group, subnet_obj['name'])
+                self.ibm_vpc_client.set_subnet_public_gateway(subnet_id, {'id': gateway_id})
+        else:
+            subnet_name = f"{vpc_obj['name']}-subnet"
+            if subnet_name in {s['name'] for s in subnet_objects}:  # subnet names are unique within the vpc
+                subnet_name = f'{subnet_name}-{str(uuid.uuid4())[:4]}'
+            subnet_id = self._create_subnet(vpc_obj, zone_obj, resource_group, subnet_name, subnet_size(nodes))
+
+        self.session_cache.invalidate('list_subnets')
+        self.session_cache.invalidate('list_public_gateways')
+        return subnet_id
+
     @update_decorator
     def run(self) -> Dict[str, Any]:
         region = self._get_region()
@@ -34,17 +150,9 @@ class VPCConfig(ConfigBuilder):
         if not vpc_obj:
             raise Exception(f'Failed to select VPC')
 
-        all_subnet_objects = self.ibm_vpc_client.list_subnets().get_result()[
-            'subnets']
-
-        # filter only subnets from selected availability zone
-        subnet_objects = [s_obj for s_obj in all_subnet_objects if s_obj['zone']
-                          ['name'] == zone_obj['name'] and s_obj['vpc']['id'] == vpc_obj['id']]
-
-        if not subnet_objects:
-            raise f'Failed to find subnet for vpc {vpc_obj["name"]} in zone {zone_obj["name"]}'
-
-        return vpc_obj, zone_obj, subnet_objects[0]['id']
+        # the subnet of the selected zone with the most free addresses, if it fits the cluster
+        subnet_id = self._zone_subnet(vpc_obj, zone_obj, {'id': vpc_obj['resource_group']['id']}, auto=False)
+        return vpc_obj, zone_obj, subnet_id
 
     def _build_security_group_rule_prototype_model(self, missing_rule, sg_id=None):
         direction, protocol, port = missing_rule.split('_')
@@ -94,50 +202,18 @@ class VPCConfig(ConfigBuilder):
                 return ibm_vpc_client.create_vpc(address_prefix_management='auto', classic_access=False,
                                                 name=answers['name'], resource_group=resource_group).get_result()
 
-            return _create()
+            vpc_obj = _create()
+            self.session_cache.invalidate('list_vpcs')
+            return vpc_obj
         else:
             return None
 
     def _create_vpc_peripherals(self, ibm_vpc_client, vpc_obj, zone_obj, resource_group):
         vpc_name = vpc_obj['name']
-        vpc_id = vpc_obj['id']
-        # create subnet
-        subnet_name = '{}-subnet'.format(vpc_name)
-        subnet_data = None
-
-        # find cidr
-        ipv4_cidr_block = None
-        res = ibm_vpc_client.list_vpc_address_prefixes(
-            vpc_id).result
-        address_prefixes = res['address_prefixes']
-
-        # searching for the CIDR block (internal ip range) matching the specified zone of a VPC (whose region has already been set) 
-        for address_prefix in address_prefixes:
-            if address_prefix['zone']['name'] == zone_obj['name']:
-                ipv4_cidr_block = address_prefix['cidr']
-                break
 
-        subnet_prototype = {}
-        subnet_prototype['zone'] = {'name': zone_obj['name']}
-        subnet_prototype['ip_version'] = 'ipv4'
-        subnet_prototype['name'] = subnet_name
-        subnet_prototype['resource_group'] = resource_group
-        subnet_prototype['vpc'] = {'id': vpc_id}
-        subnet_prototype['ipv4_cidr_block'] = ipv4_cidr_block
-
-        subnet_data = ibm_vpc_client.create_subnet(
-            subnet_prototype).result
-        subnet_id = subnet_data['id']
-
-        # create public gateway
-        gateway_id = self.create_public_gateway(vpc_obj, zone_obj, resource_group, subnet_name)
-
-        # Attach public gateway to the subnet
-        ibm_vpc_client.set_subnet_public_gateway(
-            subnet_id, {'id': gateway_id})
-
-        print(
-            f"\033[92mVPC subnet {subnet_prototype['name']} been created and attached to gateway\033[0m")
+        # create the subnet, sized for the cluster instead of spanning the zone's whole address prefix, and its
+        # public gateway
+        self._zone_subnet(vpc_obj, zone_obj, resource_group)
 
         # Update security group to have all required rules
         sg_id = vpc_obj['default_security_group']['id']
@@ -175,6 +251,7 @@ class VPCConfig(ConfigBuilder):
         gateway_data = self.ibm_vpc_client.create_public_gateway(
             **gateway_prototype).get_result()
         gateway_id = gateway_data['id']
+        self.session_cache.invalidate('list_public_gateways')
 
         print(
             f"\033[92mVPC public gateway {gateway_prototype['name']} been created\033[0m")
@@ -186,7 +263,7 @@ class VPCConfig(ConfigBuilder):
 
         @spinner
         def get_res_group_objects():
-            return self.resource_service_client.list_resource_groups().get_result()['resources']
+            return self.session_cache.call(self.resource_service_client, 'list_resource_groups')['resources']
 
         res_group_objects = get_res_group_objects()
         if auto:
@@ -202,32 +279,41 @@ class VPCConfig(ConfigBuilder):
         # find availability zone
         @spinner
         def get_zones_and_subnets():
-            zones_objects = self.ibm_vpc_client.list_region_zones(region).get_result()['zones']
-            all_subnet_objects = self.ibm_vpc_client.list_subnets().get_result()['subnets']
+            zones_objects = self._get_zones_objects(region)
+            all_subnet_objects = self.list_all('list_subnets', 'subnets', vpc_id=vpc_id) if vpc_id else []
             return zones_objects, all_subnet_objects
 
         zones_objects, all_subnet_objects = get_zones_and_subnets()
+        free = zone_free_addresses(all_subnet_objects, vpc_id) if vpc_id else {}
         
         if auto:
-            return zones_objects[0]
+            # the zone with the most free addresses in a subnet of the vpc
+            return max(zones_objects, key=lambda z: free.get(z['name'], -1))
 
         if vpc_id:
-            # filter out zones that given vpc has no subnets in
-            zones = [s_obj['zone']['name']
-                        for s_obj in all_subnet_objects if s_obj['vpc']['id'] == vpc_id]
-            zones_objects = [
-                z for z in zones_objects if z['name'] in zones]
+            # filter out zones that given vpc has no subnets in, ranked by free addresses
+            zones_objects = sorted([z for z in zones_objects if z['name'] in free], key=lambda z: -free[z['name']])
+
+        nodes = self._nodes()
+
+        def label(zone):
+            if zone['name'] not in free:
+                return zone['name']
+            return f"{zone['name']} ({free[zone['name']]} free addresses" + \
+                   (f", too few for {nodes} nodes)" if nodes and free[zone['name']] < nodes else ')')
 
+        zone_choices = [dict(z, label=label(z)) for z in zones_objects]
         try:
             default = find_default(
                 self.defaults, zones_objects, name='zone_name')
+            default = next((z['label'] for z in zone_choices if z['name'] == default), None)
             zone_obj = get_option_from_list(
-                "Choose availability zone", zones_objects, default=default)
+                "Choose availability zone", zone_choices, default=default, choice_key='label')
         except:
             raise Exception(
                 "Failed to list zones for selected vpc {vpc_id}, please check whether vpc missing subnet")
 
-        return zone_obj
+        return next(z for z in zones_objects if z['name'] == zone_obj['name'])
 
     def _select_vpc(self, node_config, region):
 
@@ -239,7 +325,7 @@ class VPCConfig(ConfigBuilder):
 
             @spinner
             def list_vpcs():
-                return ibm_vpc_client.list_vpcs().get_result()['vpcs']
+                return self.list_all('list_vpcs', 'vpcs', VPC_FIELDS)
 
             vpc_objects = list_vpcs()
             default = find_default(self.defaults, vpc_objects, id='vpc_id')
@@ -281,8 +367,9 @@ class VPCConfig(ConfigBuilder):
 
                 @spinner
                 def get_vpc_obj_and_subnets():
-                    vpc_obj = ibm_vpc_client.get_vpc(id=vpc_id).result
-                    all_subnet_objects = ibm_vpc_client.list_subnets().get_result()['subnets']
+                    vpc_obj = self.session_cache.call(ibm_vpc_client, 'get_vpc', id=vpc_id)
+                    all_subnet_objects = self.list_all('list_subnets', 'subnets', vpc_id=vpc_id,
+                                                       zone_name=zone_obj['name'])
                     return vpc_obj, all_subnet_objects
 
                 vpc_obj, all_subnet_objects = get_vpc_obj_and_subnets()
@@ -311,28 +398,26 @@ class VPCConfig(ConfigBuilder):
 
                         # attach gateway to subnet
                         ibm_vpc_client.set_subnet_public_gateway(subnet['id'], {'id': gw_id})
+                        self.session_cache.invalidate('list_subnets')
                     else:
                         gw_id = gw['id']
                 break
 
-        CACHE['resource_group_id'] = resource_group['id']
+        self.context.values['resource_group_id'] = resource_group['id']
         
         return vpc_obj, zone_obj
 
     @update_decorator
     def verify(self, base_config):
         # if vpc_id not specified will look for the first one
-
         if self.defaults['vpc_id']:
-            vpc_obj = self.ibm_vpc_client.get_vpc(id=self.defaults['vpc_id']).result
+            vpc_obj = self.session_cache.call(self.ibm_vpc_client, 'get_vpc', id=self.defaults['vpc_id'])
         else:
-            vpc_objects = self.ibm_vpc_client.list_vpcs().result
-            if vpc_objects['total_count'] > 0:
-                # return first vpc occurance
-                vpc_obj = vpc_objects['vpcs'][0]
-            else:
+            # first vpc occurance, the rest of the listing isn't fetched
+            vpc_obj = next(self.iter_all('list_vpcs', 'vpcs', VPC_FIELDS), None)
+            if not vpc_obj:
                 # create new vpc
-                res_group_objects = self.resource_service_client.list_resource_groups().get_result()['resources']
+                res_group_objects = self.session_cache.call(self.resource_service_client, 'list_resource_groups')['resources']
             
                 print(f"Selected first found resource group {res_group_objects[0]['name']}")
                 resource_group = resource_group = {'id': res_group_objects[0]['id']}
@@ -342,15 +427,18 @@ class VPCConfig(ConfigBuilder):
                         
                 vpc_obj = self.ibm_vpc_client.create_vpc(address_prefix_management='auto', classic_access=False,
                                         name="lithopscloud-default-vpc", resource_group=resource_group).get_result()
+                self.session_cache.invalidate('list_vpcs')
             
                 print(f"\n\n\033[92mVPC {vpc_obj['name']} been created\033[0m")
             
-                zones_objects = self.ibm_vpc_client.list_region_zones(region).get_result()['zones']
+                zones_objects = self._get_zones_objects(region)
                 zone_obj = zones_objects[0]
                 self._create_vpc_peripherals(self.ibm_vpc_client, vpc_obj, zone_obj, resource_group)
 
-        subnet_objects = self.ibm_vpc_client.list_subnets().get_result()['subnets']
-        return vpc_obj, subnet_objects[0]['zone'], subnet_objects[0]['id']
+        # the zone of the vpc's subnet with the most free addresses
+        zone_obj = self._select_zone(vpc_obj['id'], self._get_region(), auto=True)
+        subnet_id = self._zone_subnet(vpc_obj, zone_obj, {'id': vpc_obj['resource_group']['id']})
+        return vpc_obj, zone_obj, subnet_id
     
     @update_decorator
     def create_default(self):
@@ -358,8 +446,8 @@ class VPCConfig(ConfigBuilder):
         resource_group_id = self._select_resource_group(auto=True)
         resource_group = {'id': resource_group_id}
 
-        vpc_objects = self.ibm_vpc_client.list_vpcs().get_result()['vpcs']
-        vpc_obj = next((vpc_obj for vpc_obj in vpc_objects if vpc_obj['name'] == self.vpc_name), None)
+        vpc_obj = next((vpc_obj for vpc_obj in self.iter_all('list_vpcs', 'vpcs', VPC_FIELDS)
+                        if vpc_obj['name'] == self.vpc_name), None)
         
         if vpc_obj:
             # TODO: validate existing
@@ -379,16 +467,7 @@ class VPCConfig(ConfigBuilder):
                                         resource_group)
         
         zone_obj = self._select_zone(vpc_obj['id'], region, auto=True)
-        CACHE['resource_group_id'] = resource_group['id']
-        
-        all_subnet_objects = self.ibm_vpc_client.list_subnets().get_result()[
-            'subnets']
-
-        # filter only subnets from selected availability zone
-        subnet_objects = [s_obj for s_obj in all_subnet_objects if s_obj['zone']
-                          ['name'] == zone_obj['name'] and s_obj['vpc']['id'] == vpc_obj['id']]
-
-        if not subnet_objects:
-            raise f'Failed to find subnet for vpc {vpc_obj["name"]} in zone {zone_obj["name"]}'
+        self.context.values['resource_group_id'] = resource_group['id']
 
-        return vpc_obj, zone_obj, subnet_objects[0]['id']
+        subnet_id = self._zone_subnet(vpc_obj, zone_obj, resource_group)
+        return vpc_obj, zone_obj, subnet_id
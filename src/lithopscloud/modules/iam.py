@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from ibm_botocore.credentials import TokenManager as CosTokenManager
+from ibm_cloud_sdk_core import ApiException
+from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
+from ibm_cloud_sdk_core.token_managers.iam_token_manager import IAMTokenManager
+
+from lithopscloud.modules.cache import account_digest
+from lithopscloud.modules.clients import POOLS
+
+logger = logging.getLogger(__name__)
+
+BROKER_IDLE_TIMEOUT = 600  # seconds without tokens served after which a broker's token isn't refreshed in background
+
+
+class TokenBroker(IAMTokenManager):
+    """IAM token manager shared by every SDK client and raw http call of a single (api key, IAM endpoint) pair.
+
+    Bearer tokens are cached until shortly before they expire, and refreshed by a background timer once they reach
+    their refresh time, so callers never wait for an IAM exchange after the first one. Brokers idle for
+    BROKER_IDLE_TIMEOUT stop refreshing, and refresh on their next use instead, thus a long running process doesn't
+    keep refreshing the tokens of every api key it ever used.
+    Delegated refresh tokens (e.g. of code engine) are cached per receiver client the same way."""
+
+    def __init__(self, apikey, url=None):
+        super().__init__(apikey, url=url)
+        self.exchanges = 0  # number of IAM token requests issued
+        self._delegated_tokens = {}  # receiver client ids -> (token, expiration time)
+        self._timer = None
+        self._last_used = time.time()
+        self._lock = threading.Lock()
+
+    def get_token(self):
+        self._last_used = time.time()
+        token = super().get_token()
+        self._schedule_refresh()  # again, once a broker idle before is used
+        return token
+
+    def request_token(self):
+        response = super().request_token()
+        self.exchanges += 1
+        return response
+
+    def _request(self, method, url, *, headers=None, params=None, data=None, auth_tuple=None, **kwargs):
+        """issues the IAM token requests over the pooled session of the IAM endpoint"""
+        kwargs = dict(dict({'timeout': 60}, **kwargs), **self.http_config)
+        if self.disable_ssl_verification:
+            kwargs['verify'] = False
+
+        response = POOLS.request(method, url, headers=headers, params=params, data=data, auth=auth_tuple, **kwargs)
+        if 200 <= response.status_code <= 299:
+            return response.json()
+        raise ApiException(response.status_code, http_response=response)
+
+    def _save_token_info(self, token_response):
+        super()._save_token_info(token_response)
+        self._schedule_refresh()
+
+    def _schedule_refresh(self):
+        with self._lock:
+            if self._timer:
+                return
+            self._timer = threading.Timer(max(self.refresh_time - time.time(), 0), self._refresh)
+            self._timer.daemon = True  # never keeps the tool from exiting
+            self._timer.start()
+
+    def _refresh(self):
+        with self._lock:
+            self._timer = None
+        if time.time() - self._last_used > BROKER_IDLE_TIMEOUT:
+            return  # the next get_token schedules the background refresh again, and refreshes an expired token
+        try:
+            self._save_token_info(self.request_token())
+        except Exception as e:
+            # the token is fetched synchronously by the next get_token once it expires
+            logger.debug(f'Background refresh of IAM token failed: {e}')
+
+    def cancel_refresh(self):
+        """stops the background refresh, e.g. of a broker no longer used. a later get_token schedules it again"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = None
+
+    def get_delegated_refresh_token(self, receiver_client_ids, expiry=3600):
+        """:returns a delegated refresh token for the specified receiver clients, e.g. 'ce' for code engine"""
+
+        with self._lock:
+            token, expiration = self._delegated_tokens.get(receiver_client_ids, (None, 0))
+        if token and expiration - time.time() > expiry * 0.2:
+            return token
+
+        response = self._request('POST', self.url + self.OPERATION_PATH,
+                                 headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                                 data={
+                                     'grant_type': 'urn:ibm:params:oauth:grant-type:apikey',
+                                     'apikey': self.apikey,
+                                     'response_type': 'delegated_refresh_token',
+                                     'receiver_client_ids': receiver_client_ids,
+                                     'delegated_refresh_token_expiry': str(expiry)
+                                 }, proxies=self.proxies)  # raises ApiException of failed requests
+        self.exchanges += 1
+        token = response['delegated_refresh_token']
+
+        with self._lock:
+            self._delegated_tokens[receiver_client_ids] = (token, time.time() + expiry)
+        return token
+
+
+class BrokeredCosTokenManager(CosTokenManager):
+    """serves the tokens of a TokenBroker to ibm_boto3 clients, in place of a DefaultTokenManager per client"""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def get_token(self):
+        return self.broker.get_token()
+
+    # called by ibm_boto3 when creating a client with this token manager
+    def set_verify(self, verify):
+        pass
+
+    def set_from_config(self, config):
+        if config and config.proxies:
+            self.broker.set_proxies(config.proxies)
+
+
+# (api key digest, IAM endpoint) -> TokenBroker. bounded, evicting the least recently used brokers, as long running
+# services generate configs of many accounts
+BROKERS = OrderedDict()
+MAX_BROKERS = 64
+_brokers_lock = threading.Lock()
+
+
+def get_token_broker(api_key, iam_endpoint=None):
+    """:returns the token broker of the api key and IAM endpoint (the default endpoint if not specified)"""
+
+    key = (account_digest(api_key), iam_endpoint or None)
+    evicted = []
+    with _brokers_lock:
+        if key not in BROKERS:
+            BROKERS[key] = TokenBroker(api_key, url=iam_endpoint)
+            while len(BROKERS) > MAX_BROKERS:
+                evicted.append(BROKERS.popitem(last=False)[1])
+        BROKERS.move_to_end(key)
+        broker = BROKERS[key]
+
+    for evicted_broker in evicted:
+        evicted_broker.cancel_refresh()  # clients still holding it schedule it again on their next use
+    return broker
+
+
+def evict_token_broker(api_key, iam_endpoint=None):
+    """drops the token broker of the api key and IAM endpoint, e.g. of a key that failed validation"""
+
+    with _brokers_lock:
+        broker = BROKERS.pop((account_digest(api_key), iam_endpoint or None), None)
+    if broker:
+        broker.cancel_refresh()
+
+
+def get_authenticator(api_key, iam_endpoint=None):
+    """:returns an IAMAuthenticator whose tokens are served by the shared token broker of the api key"""
+
+    authenticator = IAMAuthenticator(api_key, url=iam_endpoint)
+    authenticator.token_manager = get_token_broker(api_key, iam_endpoint)
+    return authenticator
+
+
+def get_cos_token_manager(api_key, iam_endpoint=None):
+    """:returns an ibm_boto3 token manager served by the shared token broker of the api key"""
+    return BrokeredCosTokenManager(get_token_broker(api_key, iam_endpoint))
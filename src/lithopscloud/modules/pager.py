@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+VPC_PAGE_LIMIT = 100  # the largest page of VPC listings
+
+
+def next_start(page):
+    """returns the 'start' token of the page following 'page' of a VPC listing, None for the last page"""
+    href = (page.get('next') or {}).get('href')
+    return parse_qs(urlparse(href).query)['start'][0] if href else None
+
+
+def project(obj, fields):
+    """returns a copy of 'obj' with the specified fields only, all of them if none are specified.
+    fields of nested objects are dotted, e.g. 'zone.name', and keep their nesting in the copy"""
+    if not fields:
+        return obj
+
+    projected = {}
+    for field in fields:
+        source, target = obj, projected
+        *parents, leaf = field.split('.')
+        for parent in parents:
+            source = source.get(parent)
+            if not isinstance(source, dict):
+                break
+            target = target.setdefault(parent, {})
+        else:
+            if leaf in source:
+                target[leaf] = source[leaf]
+    return projected
+
+
+def iter_pages(fetch, result_key, fields=None, limit=VPC_PAGE_LIMIT):
+    """yields the objects of all pages of a VPC listing, projected to 'fields'.
+
+    Pages are fetched lazily: the page following the one being consumed is fetched in the background, thus consumers
+    rarely wait on a page, stopping early skips the rest of the listing and at most two pages are held at a time.
+    :param fetch - callable receiving the paging arguments (limit and start) and returning a page, e.g. a memoized
+                   SDK call with its filters bound"""
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        page = fetch(limit=limit)
+        while page:
+            start = next_start(page)
+            following = executor.submit(fetch, limit=limit, start=start) if start else None
+            for obj in page[result_key]:
+                yield project(obj, fields)
+            page = following.result() if following else None
+    finally:
+        executor.shutdown(wait=False)  # a background fetch of an abandoned listing completes on its own
@@ -8,12 +8,8 @@ import time
 from enum import Enum
 import inquirer
 from inquirer import errors
-from ibm_platform_services import IamIdentityV1
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
-import ibm_cloud_sdk_core
 
 
-CACHE = {}
 ARG_STATUS = Enum('STATUS', 'VALID INVALID MISSING')  # variable possible status.
 
 class MSG_STATUS(Enum):
@@ -302,11 +298,18 @@ def verify_paths(input_path, output_path, verify_config=False):
 
 def verify_iam_api_key(answers, apikey, iam_endpoint=None):
     """Terminates the config tool if no IAM_API_KEY matching the provided value exists"""
+    import ibm_cloud_sdk_core
+    from ibm_platform_services import IamIdentityV1
+    from lithopscloud.modules.clients import evict_clients, get_client
+    from lithopscloud.modules.iam import evict_token_broker
 
-    iam_identity_service = IamIdentityV1(authenticator=IAMAuthenticator(apikey, url=iam_endpoint))
+    iam_identity_service = get_client(IamIdentityV1, apikey, iam_endpoint)
     try:
         iam_identity_service.get_api_keys_details(iam_api_key=apikey)
     except ibm_cloud_sdk_core.api_exception.ApiException:
+        # the clients and broker of an invalid key are of no further use
+        evict_clients(apikey)
+        evict_token_broker(apikey, iam_endpoint)
         raise errors.ValidationError('', reason=color_msg(f"No IAmApiKey matching the given value {apikey} was found.", Color.RED))
     return True
 
@@ -0,0 +1,23 @@
+"""Fixtures running lithopscloud offline against the IBM Cloud stand-in of the benchmarks (benchmarks/standin.py)"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), os.path.join(ROOT, 'benchmarks')]
+
+from config_flow import API_KEY, REGION, reset_state  # noqa: E402
+from standin import DEFAULT_BUCKET, FakeCloud, StandIn  # noqa: E402
+
+
+@pytest.fixture
+def cloud(tmp_path, monkeypatch):
+    """a fresh fake cloud served to lithopscloud, which runs cold with its home (thus generated ssh keys) in tmp_path"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    (tmp_path / '.ssh').mkdir()
+    reset_state(str(tmp_path / 'catalog-cache'))
+
+    fake_cloud = FakeCloud()
+    with StandIn(cloud=fake_cloud):
+        yield fake_cloud
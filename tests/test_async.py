@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from lithopscloud import main
+from lithopscloud.main import MAX_CONCURRENT_RUNS, set_concurrency_limit
+
+RUN_SECONDS = 0.1
+
+
+@pytest.fixture(autouse=True)
+def default_limit():
+    yield
+    set_concurrency_limit(MAX_CONCURRENT_RUNS)
+
+
+def _counting_run():
+    """returns a blocking run recording the runs in flight at its start, and the recorded counts"""
+    lock = threading.Lock()
+    in_flight = []
+    starts = []
+
+    def run():
+        with lock:
+            in_flight.append(None)
+            starts.append(len(in_flight))
+        time.sleep(RUN_SECONDS)
+        with lock:
+            in_flight.pop()
+
+    return run, starts
+
+
+def test_runs_beyond_the_limit_wait():
+    run, starts = _counting_run()
+
+    async def runs():
+        await asyncio.gather(*[main._run_async(run) for _ in range(9)])
+
+    set_concurrency_limit(3)
+    asyncio.run(runs())
+    assert len(starts) == 9 and max(starts) == 3
+
+
+def test_limit_change_is_rejected_while_runs_are_in_flight():
+    run, starts = _counting_run()
+
+    async def runs():
+        tasks = [asyncio.ensure_future(main._run_async(run)) for _ in range(4)]
+        await asyncio.sleep(RUN_SECONDS / 2)
+        with pytest.raises(RuntimeError):
+            set_concurrency_limit(4)  # while 2 runs are in flight and 2 wait
+        await asyncio.gather(*tasks)
+
+        set_concurrency_limit(4)  # once they're done
+        await asyncio.gather(*[main._run_async(run) for _ in range(4)])
+
+    set_concurrency_limit(2)
+    asyncio.run(runs())
+    assert max(starts[:4]) == 2 and max(starts[4:]) == 4
+
+
+def test_cancelled_waiting_run_never_starts():
+    run, starts = _counting_run()
+
+    async def runs():
+        first = asyncio.ensure_future(main._run_async(run))
+        waiting = asyncio.ensure_future(main._run_async(run))
+        await asyncio.sleep(RUN_SECONDS / 2)
+        waiting.cancel()
+        await first
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    set_concurrency_limit(1)
+    asyncio.run(runs())
+    assert starts == [1] and main._runs_in_flight == 0
@@ -0,0 +1,53 @@
+import pytest
+import yaml
+
+from lithopscloud.batch import load_manifest, run_batch
+
+from conftest import API_KEY, DEFAULT_BUCKET, REGION
+
+
+def _manifest(tmp_path, specs, defaults=None):
+    manifest_file = tmp_path / 'manifest.yaml'
+    manifest_file.write_text(yaml.dump({'defaults': defaults or {'iam_api_key': API_KEY, 'region': REGION},
+                                        'specs': specs}))
+    return str(manifest_file)
+
+
+def test_specs_are_merged_over_the_defaults(tmp_path):
+    specs = load_manifest(_manifest(tmp_path, [{'name': 'team-a', 'backend': 'gen2', 'cos_bucket_name': 'a'},
+                                               {'backend': 'ray', 'region': 'us-south', 'max_workers': 4}]))
+
+    assert specs == [{'iam_api_key': API_KEY, 'region': REGION, 'name': 'team-a', 'backend': 'gen2',
+                      'cos_bucket_name': 'a'},
+                     {'iam_api_key': API_KEY, 'region': 'us-south', 'name': 'spec-1', 'backend': 'ray',
+                      'max_workers': 4}]
+
+
+@pytest.mark.parametrize('spec, error', [
+    ({'name': 'team-a'}, 'Spec team-a: backend must be one of'),
+    ({'name': 'team-a', 'backend': 'gen3'}, 'Spec team-a: backend must be one of'),
+    ({'name': 'team-a', 'backend': 'gen2', 'iam_api_key': None}, 'Spec team-a: iam_api_key is mandatory'),
+    ({'name': 'team-a', 'backend': 'gen2', 'cos_bucket': 'a'}, "Spec team-a: unknown keys ['cos_bucket']"),
+    ({'name': 'team-a', 'backend': 'ray', 'cos_bucket_name': 'a'}, "Spec team-a: unknown keys ['cos_bucket_name']")])
+def test_invalid_specs_fail_the_manifest(tmp_path, spec, error):
+    with pytest.raises(Exception, match=error.replace('[', r'\[').replace(']', r'\]')):
+        load_manifest(_manifest(tmp_path, [{'name': 'valid', 'backend': 'gen2'}, spec]))
+
+
+def test_failed_specs_dont_fail_the_others(cloud, tmp_path):
+    cloud.revoked_api_keys.add('revoked-key')
+    # in turn, the ray spec creating the default vpc, of a subnet large enough for the lithops default of 100 workers
+    manifest_file = _manifest(tmp_path, [{'name': 'team-c', 'backend': 'ray', 'max_workers': 100},
+                                         {'name': 'team-b', 'backend': 'gen2', 'cos_bucket_name': DEFAULT_BUCKET,
+                                          'iam_api_key': 'revoked-key'},
+                                         {'name': 'team-a', 'backend': 'gen2', 'cos_bucket_name': DEFAULT_BUCKET}])
+
+    results = {result['name']: result
+               for result in run_batch(manifest_file, output_dir=str(tmp_path / 'configs'), max_workers=1)}
+
+    assert results['team-a']['error'] is None and results['team-c']['error'] is None
+    assert results['team-a']['output_file'] == str(tmp_path / 'configs' / 'team-a.yaml')
+    assert yaml.safe_load(open(results['team-c']['output_file']))['provider']['region'] == REGION
+    assert 'No IAmApiKey matching the given value revoked-key was found' in results['team-b']['error']
+    assert results['team-b']['output_file'] is None
+    assert not (tmp_path / 'configs' / 'team-b.yaml').exists()
@@ -0,0 +1,181 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lithopscloud.modules import cache
+from lithopscloud.modules.cache import CATALOG_TTL, CatalogCache, SessionCache
+from lithopscloud.modules.pager import iter_pages
+
+
+class Response:
+    def __init__(self, result):
+        self.result = result
+
+    def get_result(self):
+        return self.result
+
+
+class ListingClient:
+    """serves a listing of 'total' items in pages, counting the requests of each page"""
+
+    def __init__(self, total):
+        self.total = total
+        self.requests = []
+
+    def list_items(self, limit, start=None, **filters):
+        self.requests.append(start)
+        offset = int(start or 0)
+        page = {'items': [{'id': i} for i in range(offset, min(offset + limit, self.total))]}
+        if offset + limit < self.total:
+            page['next'] = {'href': f'https://fake/v1/items?limit={limit}&start={offset + limit}'}
+        return Response(page)
+
+
+def test_page_fetch_memoizes_first_page_only():
+    cache, client = SessionCache(), ListingClient(250)
+
+    for _ in range(2):
+        items = list(iter_pages(cache.page_fetch(client, 'list_items'), 'items'))
+        assert [item['id'] for item in items] == list(range(250))
+
+    assert client.requests == [None, '100', '200', '100', '200']
+    assert cache.stats()['size'] == 1
+
+
+def test_memoized_listing_is_awaited_rather_than_fetched_again():
+    cache, client = SessionCache(), ListingClient(250)
+    started, release = threading.Event(), threading.Event()
+
+    def list_all():
+        started.set()
+        release.wait(5)
+        return list(iter_pages(cache.page_fetch(client, 'list_items'), 'items'))
+
+    with ThreadPoolExecutor() as executor:
+        prefetched = executor.submit(cache.memoize, list_all, client, 'list_items', 'all')
+        started.wait(5)
+        awaited = executor.submit(cache.memoize, list_all, client, 'list_items', 'all')
+        release.set()
+        assert prefetched.result() == awaited.result()
+
+    assert client.requests == [None, '100', '200']
+    cache.invalidate('list_items')
+    assert cache.stats()['size'] == 0
+
+
+def _catalog_cache(tmp_path, monkeypatch, now):
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    return CatalogCache(cache_dir=str(tmp_path / 'catalog'))
+
+
+def test_catalog_entries_expire_by_their_resource_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    catalog_cache = _catalog_cache(tmp_path, monkeypatch, now)
+    fetches = []
+
+    def fetch():
+        fetches.append(now[0])
+        return [{'name': f'listing-{len(fetches)}'}]
+
+    assert catalog_cache.get('images', fetch, 'account', 'eu-de') == [{'name': 'listing-1'}]
+    now[0] += CATALOG_TTL['images']
+    assert catalog_cache.get('images', fetch, 'account', 'eu-de') == [{'name': 'listing-1'}]
+    # entries of other keys, e.g. of other regions, are separate
+    assert catalog_cache.get('images', fetch, 'account', 'us-south') == [{'name': 'listing-2'}]
+
+    now[0] += 1
+    assert catalog_cache.get('images', fetch, 'account', 'eu-de') == [{'name': 'listing-3'}]
+    assert len(fetches) == 3
+
+
+def test_corrupt_catalog_entry_is_fetched_again(tmp_path, monkeypatch):
+    catalog_cache = _catalog_cache(tmp_path, monkeypatch, [1000.0])
+    catalog_cache.get('zones', lambda: ['eu-de-1'], 'account')
+    path = catalog_cache._path('zones', 'account')
+
+    with open(path, 'w') as f:
+        f.write('{"created": 1000.0, "data": ["eu-')  # e.g. written by a tool without atomic writes
+    assert catalog_cache.get('zones', lambda: ['eu-de-2'], 'account') == ['eu-de-2']
+    assert catalog_cache.get('zones', lambda: ['eu-de-3'], 'account') == ['eu-de-2']
+    # atomic writes leave no temporary files behind
+    assert os.listdir(catalog_cache.cache_dir) == [os.path.basename(path)]
+
+
+def test_catalog_invalidation(tmp_path, monkeypatch):
+    catalog_cache = _catalog_cache(tmp_path, monkeypatch, [1000.0])
+    catalog_cache.get('zones', lambda: ['eu-de-1'], 'account')
+    catalog_cache.get('images', lambda: ['ubuntu'], 'account')
+
+    catalog_cache.invalidate('images')
+    assert catalog_cache.get('images', lambda: ['centos'], 'account') == ['centos']
+    assert catalog_cache.get('zones', lambda: ['eu-de-2'], 'account') == ['eu-de-1']
+
+    catalog_cache.invalidate()
+    assert catalog_cache.get('zones', lambda: ['eu-de-2'], 'account') == ['eu-de-2']
+
+
+def test_disabled_catalog_cache_always_fetches(tmp_path):
+    catalog_cache = CatalogCache(cache_dir=str(tmp_path / 'catalog'), enabled=False)
+
+    assert catalog_cache.get('zones', lambda: ['eu-de-1'], 'account') == ['eu-de-1']
+    assert catalog_cache.get('zones', lambda: ['eu-de-2'], 'account') == ['eu-de-2']
+    assert not os.path.exists(catalog_cache.cache_dir)
+
+
+def test_session_cache_evicts_least_recently_used_responses():
+    session_cache, client = SessionCache(maxsize=2), ListingClient(250)
+
+    for start in (None, '100', None, '200'):  # the first page is used again, thus the second is evicted
+        session_cache.call(client, 'list_items', limit=100, start=start)
+    session_cache.call(client, 'list_items', limit=100, start=None)
+    session_cache.call(client, 'list_items', limit=100, start='100')
+
+    assert client.requests == [None, '100', '200', '100']
+    assert session_cache.stats() == {'hits': 2, 'misses': 4, 'size': 2, 'maxsize': 2}
+
+
+def test_session_cache_refetches_after_its_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    session_cache, client = SessionCache(ttl=300), ListingClient(10)
+
+    session_cache.call(client, 'list_items', limit=100)
+    now[0] += 300
+    session_cache.call(client, 'list_items', limit=100)
+    now[0] += 1
+    session_cache.call(client, 'list_items', limit=100)
+
+    assert client.requests == [None, None]
+    assert session_cache.stats()['hits'] == 1 and session_cache.stats()['misses'] == 2
+
+
+def test_session_cache_invalidates_by_method():
+    session_cache, client = SessionCache(), ListingClient(10)
+    client.list_others = client.list_items
+
+    session_cache.call(client, 'list_items', limit=100)
+    session_cache.call(client, 'list_others', limit=100)
+    session_cache.invalidate('list_items')
+    session_cache.call(client, 'list_items', limit=100)
+    session_cache.call(client, 'list_others', limit=100)
+    assert client.requests == [None, None, None]
+
+    session_cache.invalidate()
+    assert session_cache.stats()['size'] == 0
+
+
+def test_session_cache_memoizes_no_failures():
+    session_cache, client = SessionCache(), ListingClient(10)
+    failures = []
+
+    def list_failing(**kwargs):
+        failures.append(kwargs)
+        raise RuntimeError('service unavailable')
+    client.list_failing = list_failing
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            session_cache.call(client, 'list_failing', limit=100)
+    assert len(failures) == 2 and session_cache.stats()['size'] == 0
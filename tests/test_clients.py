@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from lithopscloud.modules import clients
+from lithopscloud.modules.clients import ConnectionPools, PooledSession, get_client
+
+from conftest import API_KEY
+
+
+class SetCookieHandler(BaseHTTPRequestHandler):
+    """sets a session cookie, and echoes the cookies it received"""
+
+    def do_GET(self):
+        body = (self.headers.get('Cookie') or '').encode()
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'session=tenant-a; Path=/')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = HTTPServer(('127.0.0.1', 0), SetCookieHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_pooled_sessions_keep_no_cookies(server_url, monkeypatch):
+    pools = ConnectionPools()
+    monkeypatch.setattr('lithopscloud.modules.clients.POOLS', pools)
+
+    assert pools.get(server_url).text == ''
+    assert pools.get(server_url).text == ''  # the cookie set for the first caller isn't sent on behalf of others
+    assert not pools.session(server_url).cookies
+
+    session = PooledSession()
+    assert session.get(server_url).text == ''
+    assert not session.cookies and not pools.session(server_url).cookies
+    pools.close()
+
+
+def test_clients_are_bounded(monkeypatch):
+    from ibm_platform_services import ResourceManagerV2
+
+    monkeypatch.setattr(clients, 'CLIENTS', OrderedDict())
+    monkeypatch.setattr(clients, 'MAX_CLIENTS', 2)
+
+    first = get_client(ResourceManagerV2, 'api-key-1')
+    get_client(ResourceManagerV2, 'api-key-2')
+    assert get_client(ResourceManagerV2, 'api-key-1') is first  # the least recently used client is evicted
+    get_client(ResourceManagerV2, 'api-key-3')
+
+    assert len(clients.CLIENTS) == 2 and get_client(ResourceManagerV2, 'api-key-1') is first
+
+
+def test_clients_and_broker_of_an_invalid_api_key_are_evicted(cloud, monkeypatch):
+    from inquirer import errors
+
+    from lithopscloud.modules import iam
+    from lithopscloud.modules.utils import verify_iam_api_key
+
+    monkeypatch.setattr(clients, 'CLIENTS', OrderedDict())
+    monkeypatch.setattr(iam, 'BROKERS', OrderedDict())
+    cloud.revoked_api_keys.add('revoked-api-key')
+
+    with pytest.raises(errors.ValidationError):
+        verify_iam_api_key(None, 'revoked-api-key')
+    assert not clients.CLIENTS and not iam.BROKERS
+
+    assert verify_iam_api_key(None, API_KEY)
+    assert len(clients.CLIENTS) == 1 and len(iam.BROKERS) == 1
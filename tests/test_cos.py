@@ -0,0 +1,102 @@
+import importlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from lithopscloud.modules.cos import CosConfig, compute_location
+
+from conftest import API_KEY
+
+RED = '\033[31m'
+
+
+class Response:
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+@pytest.mark.parametrize('base_config, location', [
+    ({'ibm_vpc': {'endpoint': 'https://eu-de.iaas.cloud.ibm.com'}}, ('eu-de', 'direct')),
+    ({'code_engine': {'region': 'us-south'}}, ('us-south', 'direct')),
+    ({'ibm_cf': {'endpoint': 'https://eu-gb.functions.cloud.ibm.com'}}, ('eu-gb', 'private')),
+    ({'ibm_cf': {'endpoint': 'https://functions.example.com'}}, (None, None)),
+    ({'ibm_vpc': {'endpoint': ''}, 'localhost': {}}, (None, None))])
+def test_compute_location(base_config, location):
+    assert compute_location(base_config) == location
+
+
+def _cos_config(endpoint='https://eu-de.iaas.cloud.ibm.com'):
+    return CosConfig({'ibm': {'iam_api_key': API_KEY}, 'ibm_vpc': {'endpoint': endpoint}, 'ibm_cos': {}})
+
+
+def test_bucket_of_the_compute_region_is_reached_privately(cloud, capsys):
+    cos_config = _cos_config()
+    cos_config._set_bucket('bucket', 'eu-de')
+
+    assert cos_config.base_config['ibm_cos'] == {
+        'storage_bucket': 'bucket', 'region': 'eu-de',
+        'private_endpoint': 'https://s3.direct.eu-de.cloud-object-storage.appdomain.cloud'}
+    assert RED not in capsys.readouterr().out
+
+
+def test_bucket_of_another_region_is_reached_publicly(cloud, capsys):
+    cos_config = _cos_config()
+    cos_config.base_config['ibm_cos']['private_endpoint'] = 'https://s3.direct.eu-de.cloud-object-storage.appdomain.cloud'
+    cos_config._set_bucket('bucket', 'us-east')
+
+    assert cos_config.base_config['ibm_cos'] == {
+        'storage_bucket': 'bucket', 'region': 'us-east',
+        'endpoint': 'https://s3.us-east.cloud-object-storage.appdomain.cloud'}
+    output = capsys.readouterr().out
+    assert f'{RED}Bucket bucket is located in us-east while compute runs in eu-de' in output
+
+
+def test_find_bucket_region(cloud):
+    cloud.buckets['other-bucket'] = 'us-south'
+    cos_config = _cos_config()
+
+    assert cos_config.find_bucket_region('bench-bucket') == 'eu-de'
+    assert cos_config.find_bucket_region('other-bucket') == 'us-south'
+    assert cos_config.find_bucket_region('missing-bucket') is None
+
+
+def test_bucket_regions_are_fetched_once_by_concurrent_builders(monkeypatch):
+    from lithopscloud.modules import cos
+
+    requests = []
+
+    class Pools:
+        def get(self, url):
+            requests.append(url)
+            time.sleep(0.05)  # concurrent callers arrive while the list is fetched
+            return Response({'service-endpoints': {'regional': {'eu-de': {}, 'us-south': {}}}})
+
+    monkeypatch.setattr(cos, 'POOLS', Pools())
+    cos.BUCKET_REGIONS.clear()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for future in [executor.submit(cos.init_cos_region_list) for _ in range(4)]:
+            future.result()
+            assert cos.BUCKET_REGIONS == ['eu-de', 'us-south']
+
+    assert len(requests) == 1
+    cos.BUCKET_REGIONS.clear()  # refetched from the stand-in by later tests
+
+
+def test_cos_clients_are_bounded(monkeypatch):
+    verify = importlib.import_module('lithopscloud.modules.cos-package.verify')
+
+    monkeypatch.setattr(verify, 'MAX_COS_CLIENTS', 2)
+    monkeypatch.setattr(verify, 'COS_CLIENTS', OrderedDict())
+    endpoints = [f'https://s3.{region}.cloud-object-storage.appdomain.cloud' for region in ('eu-de', 'us-south')]
+    first = verify.get_cos_client(('access', 'secret'), verify.KEY_TYPE.HMAC, endpoints[0])
+    verify.get_cos_client(('access', 'secret'), verify.KEY_TYPE.HMAC, endpoints[1])
+
+    # the least recently used client is evicted
+    assert verify.get_cos_client(('access', 'secret'), verify.KEY_TYPE.HMAC, endpoints[0]) is first
+    verify.get_cos_client(('other', 'secret'), verify.KEY_TYPE.HMAC, endpoints[0])
+    assert [endpoint for _, endpoint in verify.COS_CLIENTS] == [endpoints[0], endpoints[0]]
@@ -0,0 +1,95 @@
+import pytest
+import yaml
+
+from conftest import API_KEY, DEFAULT_BUCKET, REGION
+
+
+def _generate(output_file):
+    from lithopscloud import LITHOPS_GEN2, generate_config
+
+    generate_config(LITHOPS_GEN2, API_KEY, REGION, output_file=str(output_file), cos_bucket_name=DEFAULT_BUCKET)
+    with open(output_file) as f:
+        return yaml.safe_load(f)['ibm_vpc']
+
+
+def test_generate_after_delete_creates_new_resources(cloud, tmp_path):
+    from lithopscloud import delete_config
+
+    _generate(tmp_path / 'created.yaml')
+    deleted = _generate(tmp_path / 'deleted.yaml')  # memoizes the listings of the created resources
+    delete_config(str(tmp_path / 'deleted.yaml'))
+    assert deleted['vpc_id'] not in cloud.vpcs and deleted['key_id'] not in cloud.keys
+
+    # within the ttl of the session cache, which must not serve the deleted resources
+    regenerated = _generate(tmp_path / 'regenerated.yaml')
+    assert regenerated['vpc_id'] in cloud.vpcs
+    assert regenerated['subnet_id'] in cloud.subnets
+    assert regenerated['key_id'] in cloud.keys
+
+
+def test_generate_creates_subnet_in_existing_vpc(cloud, tmp_path):
+    vpc = cloud.create_vpc({'name': 'existing-vpc'}, open_security_group=True)
+
+    generated = _generate(tmp_path / 'generated.yaml')
+    assert generated['vpc_id'] == vpc['id']
+    assert cloud.subnets[generated['subnet_id']]['resource_group'] == {'id': vpc['resource_group']['id']}
+
+
+def _small_subnet_vpc(cloud):
+    vpc = cloud.create_vpc({'name': 'existing-vpc'}, open_security_group=True)
+    subnet = cloud.create_subnet({'name': 'existing-vpc-subnet', 'vpc': {'id': vpc['id']},
+                                  'zone': {'name': f'{REGION}-1'}, 'total_ipv4_address_count': 64})
+    return vpc, subnet
+
+
+def test_generate_fails_on_too_small_subnet(cloud, tmp_path):
+    _, subnet = _small_subnet_vpc(cloud)
+
+    # lithops' default of 100 workers and the master don't fit the 59 free addresses
+    with pytest.raises(Exception, match='existing-vpc-subnet has 59 free addresses'):
+        _generate(tmp_path / 'generated.yaml')
+    assert list(cloud.subnets) == [subnet['id']]
+
+
+def test_larger_subnet_gets_a_unique_name(cloud, monkeypatch):
+    from lithopscloud.modules.context import RunContext
+    from lithopscloud.modules.gen2 import vpc as vpc_module
+    from lithopscloud.modules.gen2.lithops.vpc import LithopsVPCConfig
+
+    vpc, subnet = _small_subnet_vpc(cloud)
+    monkeypatch.setattr(vpc_module, 'get_confirmation', lambda *args, **kwargs: {'answer': True})
+
+    with RunContext(iam_api_key=API_KEY, region=REGION):
+        module = LithopsVPCConfig({'ibm_vpc': {}})
+        module.ibm_vpc_client.set_service_url(f'https://{REGION}.iaas.cloud.ibm.com/v1')
+        subnet_id = module._zone_subnet(cloud.vpcs[vpc['id']], {'name': f'{REGION}-1'},
+                                        {'id': vpc['resource_group']['id']}, auto=False)
+
+    assert subnet_id != subnet['id']
+    assert cloud.subnets[subnet_id]['name'].startswith('existing-vpc-subnet-')
+    assert cloud.subnets[subnet_id]['total_ipv4_address_count'] == 256
+
+
+def test_listings_are_filtered_server_side(cloud, tmp_path, monkeypatch):
+    from urllib.parse import parse_qs, urlsplit
+
+    handle, queries = cloud.handle, []  # (path, query) of each vpc api listing
+
+    def recording_handle(method, url, body):
+        parts = urlsplit(url)
+        if method == 'GET' and parts.hostname.endswith('.iaas.cloud.ibm.com'):
+            queries.append((parts.path, {k: v[0] for k, v in parse_qs(parts.query).items()}))
+        return handle(method, url, body)
+
+    monkeypatch.setattr(cloud, 'handle', recording_handle)
+    vpc = cloud.create_vpc({'name': 'existing-vpc'}, open_security_group=True)
+    _generate(tmp_path / 'generated.yaml')
+
+    def filters(path):
+        return [{k: v for k, v in query.items() if k not in ('version', 'generation', 'limit', 'start')}
+                for p, query in queries if p == path]
+
+    assert {'vpc.id': vpc['id'], 'zone.name': f'{REGION}-1'} in filters('/v1/subnets')
+    assert all(query.get('vpc.id') == vpc['id'] for query in filters('/v1/subnets'))
+    assert filters('/v1/public_gateways') and \
+        all(query == {'resource_group.id': vpc['resource_group']['id']} for query in filters('/v1/public_gateways'))
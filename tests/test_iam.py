@@ -0,0 +1,81 @@
+import time
+
+import pytest
+from ibm_cloud_sdk_core import ApiException
+
+from lithopscloud.modules import iam
+from lithopscloud.modules.iam import BROKER_IDLE_TIMEOUT, TokenBroker, evict_token_broker, get_token_broker
+
+from conftest import API_KEY
+
+
+def test_refresh_timer_is_daemon_and_cancellable(cloud):
+    broker = TokenBroker(API_KEY)  # of its own, as threads of former tests may still use the shared one
+    broker.get_token()
+    timer = broker._timer
+    assert timer.daemon and timer.is_alive()
+
+    broker.cancel_refresh()
+    timer.join(1)
+    assert not timer.is_alive() and broker._timer is None
+
+
+def test_idle_broker_stops_refreshing(cloud, monkeypatch):
+    broker = TokenBroker(API_KEY)
+    broker.get_token()
+    broker.cancel_refresh()
+    exchanges = broker.exchanges
+
+    monkeypatch.setattr(iam.time, 'time', lambda: broker._last_used + BROKER_IDLE_TIMEOUT + 1)
+    broker._refresh()
+    assert broker.exchanges == exchanges and broker._timer is None
+
+    monkeypatch.undo()
+    broker.get_token()  # refreshes on its next use
+    assert broker._timer is not None
+    broker.cancel_refresh()
+
+
+def test_delegated_refresh_token_of_rejected_api_key_raises(cloud):
+    cloud.revoked_api_keys.add('revoked-api-key')
+
+    with pytest.raises(ApiException) as e:
+        get_token_broker('revoked-api-key').get_delegated_refresh_token('ce')
+    assert e.value.status_code == 400
+
+
+def test_delegated_refresh_token_is_cached(cloud):
+    broker = get_token_broker(API_KEY)
+    assert broker.get_delegated_refresh_token('ce') == 'bench-delegated'
+
+    exchanges = broker.exchanges
+    assert broker.get_delegated_refresh_token('ce') == 'bench-delegated'
+    assert broker.exchanges == exchanges
+
+
+def test_brokers_are_bounded(cloud, monkeypatch):
+    monkeypatch.setattr(iam, 'BROKERS', iam.OrderedDict())
+    monkeypatch.setattr(iam, 'MAX_BROKERS', 2)
+
+    first = get_token_broker('api-key-1')
+    first.get_token()
+    get_token_broker('api-key-2')
+    assert get_token_broker('api-key-1') is first  # the least recently used broker is evicted
+
+    get_token_broker('api-key-3')
+    assert len(iam.BROKERS) == 2 and get_token_broker('api-key-1') is first
+    assert first._timer is not None
+
+    get_token_broker('api-key-2')
+    get_token_broker('api-key-4')  # evicts api-key-1's broker, which stops refreshing
+    assert first not in iam.BROKERS.values() and first._timer is None
+
+
+def test_evicted_broker_stops_refreshing(cloud, monkeypatch):
+    monkeypatch.setattr(iam, 'BROKERS', iam.OrderedDict())
+
+    broker = get_token_broker('api-key-1')
+    broker.get_token()
+    evict_token_broker('api-key-1')
+    assert not iam.BROKERS and broker._timer is None
+    assert get_token_broker('api-key-1') is not broker
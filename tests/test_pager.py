@@ -0,0 +1,70 @@
+import threading
+
+from lithopscloud.modules.pager import iter_pages, next_start, project
+
+
+class Listing:
+    """serves a listing of 'total' objects in pages, recording the 'start' of each page requested"""
+
+    def __init__(self, total):
+        self.total = total
+        self.requests = []
+
+    def fetch(self, limit, start=None):
+        self.requests.append(start)
+        offset = int(start or 0)
+        page = {'items': [{'id': i, 'zone': {'name': f'zone-{i % 3}', 'href': f'https://fake/zones/{i % 3}'}}
+                          for i in range(offset, min(offset + limit, self.total))]}
+        if offset + limit < self.total:
+            page['next'] = {'href': f'https://fake/v1/items?limit={limit}&start={offset + limit}'}
+        return page
+
+
+def test_next_start():
+    assert next_start({'next': {'href': 'https://fake/v1/items?limit=2&start=r010-abc'}}) == 'r010-abc'
+    assert next_start({'items': []}) is None
+
+
+def test_all_pages_are_yielded_in_order():
+    listing = Listing(7)
+
+    assert [obj['id'] for obj in iter_pages(listing.fetch, 'items', limit=2)] == list(range(7))
+    assert listing.requests == [None, '2', '4', '6']
+
+
+def test_empty_listing():
+    listing = Listing(0)
+
+    assert list(iter_pages(listing.fetch, 'items', limit=2)) == []
+    assert listing.requests == [None]
+
+
+def test_stopping_early_fetches_no_further_pages():
+    listing = Listing(10)
+    threads = set(threading.enumerate())
+
+    objects = iter_pages(listing.fetch, 'items', limit=2)
+    assert next(objects)['id'] == 0
+    objects.close()
+
+    # the page following the consumed one was fetched in the background, and its thread exits
+    for thread in set(threading.enumerate()) - threads:
+        thread.join(1)
+        assert not thread.is_alive()
+    assert listing.requests == [None, '2']
+
+
+def test_nested_fields_are_projected():
+    listing = Listing(2)
+
+    objects = list(iter_pages(listing.fetch, 'items', fields=('id', 'zone.name'), limit=2))
+    assert objects == [{'id': 0, 'zone': {'name': 'zone-0'}}, {'id': 1, 'zone': {'name': 'zone-1'}}]
+
+
+def test_project():
+    obj = {'id': 'r010-1', 'name': 'vpc', 'resource_group': {'id': 'rg', 'name': 'Default'}, 'zone': None}
+
+    assert project(obj, None) is obj
+    assert project(obj, ('name', 'resource_group.id')) == {'name': 'vpc', 'resource_group': {'id': 'rg'}}
+    # missing fields, and fields of missing or non object parents, are left out
+    assert project(obj, ('id', 'status', 'zone.name', 'vpc.id')) == {'id': 'r010-1'}
@@ -0,0 +1,61 @@
+from lithopscloud.modules.gen2.preflight import DEFAULT_QUOTAS, PreflightConfig
+
+from conftest import API_KEY, REGION
+
+NO_USAGE = {quota: 0 for quota in DEFAULT_QUOTAS}
+BX2_2X8 = {'vcpu': 2, 'memory': 8}
+RED = '\033[31m'
+
+
+def _max_workers(usage=None, head_needs=BX2_2X8, worker_needs=BX2_2X8, quotas=None):
+    preflight = PreflightConfig({'quotas': quotas} if quotas else {})
+    return preflight.max_workers({**NO_USAGE, **(usage or {})}, head_needs, worker_needs)
+
+
+def test_max_workers_bound_by_the_scarcest_quota():
+    # (200 - 2) / 2 vcpu workers, (5600 - 8) / 8 memory workers
+    assert _max_workers() == (99, 'vcpu')
+    assert _max_workers(usage={'vcpu': 150}) == (24, 'vcpu')
+    assert _max_workers(worker_needs={'vcpu': 2, 'memory': 64}) == (87, 'memory')
+    # partial workers don't fit
+    assert _max_workers(worker_needs={'vcpu': 4, 'memory': 16}) == (49, 'vcpu')
+
+
+def test_max_workers_of_negative_headroom_is_zero():
+    assert _max_workers(usage={'vcpu': 199}) == (0, 'vcpu')
+    assert _max_workers(usage={'vcpu': 250, 'memory': 5000}) == (0, 'vcpu')
+
+
+def test_max_workers_of_overridden_quotas():
+    assert _max_workers(quotas={'vcpu': 400}) == (199, 'vcpu')
+    assert _max_workers(quotas={'vcpu': 400, 'memory': 800}) == (99, 'memory')
+
+
+def test_max_workers_of_workers_needing_no_quota():
+    assert _max_workers(worker_needs={'vcpu': 0, 'memory': 0}) == (0, None)
+
+
+def test_default_lithops_workers_beyond_the_quotas_are_not_warned_of(cloud, tmp_path, capsys):
+    from lithopscloud import LITHOPS_GEN2, generate_config
+    from standin import DEFAULT_BUCKET
+
+    generate_config(LITHOPS_GEN2, API_KEY, REGION, output_file=str(tmp_path / 'lithops.yaml'),
+                    cos_bucket_name=DEFAULT_BUCKET)
+
+    output = capsys.readouterr().out
+    assert 'Quotas allow scaling out to 99 workers of the default 100, bound by vcpu' in output
+    assert RED not in output
+
+
+def test_requested_workers_beyond_the_quotas_are_warned_of(cloud, tmp_path, capsys):
+    from lithopscloud import RAY_GEN2, generate_config
+
+    generate_config(RAY_GEN2, API_KEY, REGION, output_file=str(tmp_path / 'ray.yaml'), max_workers=150)
+    assert f'{RED}Quotas allow scaling out to 99 workers of the requested 150' in capsys.readouterr().out
+
+    generate_config(RAY_GEN2, API_KEY, REGION, output_file=str(tmp_path / 'ray.yaml'), max_workers=150,
+                    quotas={'vcpu': 400})
+    output = capsys.readouterr().out
+    assert 'usage/quota after scale out' in output
+    assert 'Quotas allow scaling out to 199 workers' in output
+    assert RED not in output
@@ -0,0 +1,57 @@
+import pytest
+
+from lithopscloud.modules.gen2.profile import WORKLOADS, describe_profile, rank_profiles
+
+
+def _profile(name, vcpu, memory, bandwidth, gpus=0, disk=0):
+    profile = {'name': name, 'vcpu_count': {'value': vcpu}, 'memory': {'value': memory},
+               'bandwidth': {'value': bandwidth * 1000}}  # Mbps, as listed by the VPC API
+    if gpus:
+        profile['gpu_count'] = {'value': gpus}
+    if disk:
+        profile['disks'] = [{'quantity': {'value': 1}, 'size': {'value': disk}}]
+    return profile
+
+
+PROFILES = [_profile('bx2-2x8', 2, 8, 4), _profile('cx2-2x4', 2, 4, 4), _profile('mx2-2x16', 2, 16, 4),
+            _profile('cx2-16x32', 16, 32, 32), _profile('bx2d-2x8', 2, 8, 4, disk=75),
+            _profile('gx2-8x64x1v100', 8, 64, 16, gpus=1)]
+
+
+RANKINGS = {'cpu': ['cx2-2x4', 'cx2-16x32', 'bx2-2x8', 'bx2d-2x8', 'mx2-2x16', 'gx2-8x64x1v100'],
+            'memory': ['mx2-2x16', 'bx2-2x8', 'bx2d-2x8', 'cx2-2x4', 'cx2-16x32', 'gx2-8x64x1v100'],
+            'network': ['cx2-2x4', 'cx2-16x32', 'bx2-2x8', 'bx2d-2x8', 'mx2-2x16', 'gx2-8x64x1v100'],
+            'gpu': ['gx2-8x64x1v100', 'cx2-2x4', 'cx2-16x32', 'bx2-2x8', 'mx2-2x16', 'bx2d-2x8']}
+
+
+@pytest.mark.parametrize('workload', WORKLOADS)
+def test_ranking_of_each_workload(workload):
+    assert [p['name'] for p in rank_profiles(PROFILES, workload)] == RANKINGS[workload]
+
+
+def test_gpu_profiles_rank_last_for_other_workloads():
+    for workload in set(WORKLOADS) - {'gpu'}:
+        assert rank_profiles(PROFILES, workload)[-1]['name'] == 'gx2-8x64x1v100'
+
+
+def test_unit_costs_break_ties_of_equal_throughput():
+    # the disk adds no throughput to a cpu bound workload, only cost
+    ranking = [p['name'] for p in rank_profiles(PROFILES, 'cpu')]
+    assert ranking.index('bx2-2x8') < ranking.index('bx2d-2x8')
+
+    # profiles of equal throughput and cost keep their catalog order
+    twins = [_profile('bx2-2x8', 2, 8, 4), _profile('bx3d-2x8', 2, 8, 4)]
+    assert [p['name'] for p in rank_profiles(twins, 'cpu')] == ['bx2-2x8', 'bx3d-2x8']
+    assert [p['name'] for p in rank_profiles(twins[::-1], 'cpu')] == ['bx3d-2x8', 'bx2-2x8']
+
+
+def test_parallelism_favors_profiles_reaching_it():
+    ranking = [p['name'] for p in rank_profiles(PROFILES, 'cpu', parallelism=32, nodes=4)]
+    assert ranking[:2] == ['cx2-16x32', 'cx2-2x4']
+
+
+def test_describe_profile():
+    assert describe_profile(PROFILES[0]) == 'bx2-2x8        2 vCPU    8 GiB   4 Gbps'
+    assert describe_profile(PROFILES[4], nodes=3) == \
+        'bx2d-2x8       2 vCPU    8 GiB   4 Gbps 75 GB disk  | 3 nodes: 6 vCPU 24 GiB'
+    assert describe_profile(PROFILES[5]) == 'gx2-8x64x1v100   8 vCPU   64 GiB  16 Gbps 1 GPU'
@@ -0,0 +1,146 @@
+import json
+
+import yaml
+
+from conftest import API_KEY, REGION
+
+
+def test_nodes_run_in_the_provider_zone(cloud, tmp_path):
+    from lithopscloud import RAY_GEN2, generate_config
+
+    output_file = generate_config(RAY_GEN2, API_KEY, REGION, output_file=str(tmp_path / 'ray.yaml'), max_workers=4)
+    with open(output_file) as f:
+        config = yaml.safe_load(f)
+
+    # the node provider creates all nodes in the provider's zone, whatever the node config
+    zone_name = config['provider']['zone_name']
+    for node_type in config['available_node_types'].values():
+        node_config = node_type['node_config']
+        assert 'zone_name' not in node_config
+        assert cloud.subnets[node_config['subnet_id']]['zone']['name'] == zone_name
+
+
+def _generate_with_custom_head_image(cloud, tmp_path, **kwargs):
+    from lithopscloud import RAY_GEN2, generate_config
+
+    custom_image = cloud._image('baked-ray-image', 'ubuntu-20-04-amd64', owner_type='user')
+    cloud.images.append(custom_image)
+    output_file = generate_config(RAY_GEN2, API_KEY, REGION, output_file=str(tmp_path / 'ray.yaml'), max_workers=2,
+                                  image_id=custom_image['id'], **kwargs)
+    with open(output_file) as f:
+        return yaml.safe_load(f), custom_image
+
+
+def test_workers_share_the_custom_head_image(cloud, tmp_path):
+    config, custom_image = _generate_with_custom_head_image(cloud, tmp_path)
+
+    assert {node_type['node_config']['image_id'] for node_type in config['available_node_types'].values()} == \
+        {custom_image['id']}
+    assert config['setup_commands'] == ['rm -f ~/.ray/tags.json']
+    assert config['head_setup_commands'] == config['worker_setup_commands'] == []
+
+
+def test_setup_commands_move_to_workers_of_a_stock_image(cloud, tmp_path):
+    from lithopscloud.main import load_base_config
+    from lithopscloud.modules.gen2.ray.workers import HEAD_NODE_TYPE, WORKER_NODE_TYPE
+
+    stock_image = cloud.images[0]
+    config, custom_image = _generate_with_custom_head_image(cloud, tmp_path, worker_image_id=stock_image['id'])
+
+    node_types = config['available_node_types']
+    assert node_types[HEAD_NODE_TYPE]['node_config']['image_id'] == custom_image['id']
+    assert node_types[WORKER_NODE_TYPE]['node_config']['image_id'] == stock_image['id']
+    assert config['setup_commands'] == ['rm -f ~/.ray/tags.json']
+    assert config['head_setup_commands'] == []
+    assert config['worker_setup_commands'] == load_base_config({'path': 'gen2/ray'})['setup_commands']
+
+
+def _generate(tmp_path, **kwargs):
+    from lithopscloud import RAY_GEN2, generate_config
+
+    output_file = generate_config(RAY_GEN2, API_KEY, REGION, output_file=str(tmp_path / 'ray.yaml'), max_workers=2,
+                                  profile_name='bx2-2x8', **kwargs)
+    with open(output_file) as f:
+        return yaml.safe_load(f)
+
+
+def _start_command(config, commands_key):
+    return next(command for command in config[commands_key] if 'ray start' in command)
+
+
+def test_ray_resources_reserve_the_object_store():
+    from lithopscloud.modules.gen2.ray.profile import OBJECT_STORE_FRACTION, ray_resources
+
+    profile = {'name': 'gx2-16x128', 'vcpu_count': {'value': 16}, 'memory': {'value': 128}, 'gpu_count': {'value': 2}}
+    resources, object_store_memory = ray_resources(profile)
+
+    assert object_store_memory == int(128 * 2 ** 30 * OBJECT_STORE_FRACTION)
+    assert resources == {'CPU': 16, 'GPU': 2, 'object_store_memory': object_store_memory,
+                         'memory': 128 * 2 ** 30 - object_store_memory}
+    assert 'GPU' not in ray_resources({**profile, 'gpu_count': {'value': 0}})[0]
+
+
+def test_workers_with_instance_storage_spill_to_it(cloud, tmp_path):
+    from lithopscloud.modules.gen2.ray.profile import MOUNT_SPILL_DISK, SPILL_DIR
+    from lithopscloud.modules.gen2.ray.workers import HEAD_NODE_TYPE, WORKER_NODE_TYPE
+
+    config = _generate(tmp_path, worker_profile_name='bx2d-8x32')
+
+    assert config['setup_commands'].count(MOUNT_SPILL_DISK) == 1
+    node_types = config['available_node_types']
+    assert node_types[WORKER_NODE_TYPE]['resources']['CPU'] == 8
+    assert node_types[HEAD_NODE_TYPE]['resources']['CPU'] == 2
+
+    # the head's object store is sized by its own memory, and configures spilling for the cluster
+    head_object_store = node_types[HEAD_NODE_TYPE]['resources']['object_store_memory']
+    head_start = _start_command(config, 'head_start_ray_commands')
+    assert f' --object-store-memory={head_object_store}' in head_start
+    system_config = json.loads(head_start.split("--system-config='")[1].split("'")[0])
+    assert json.loads(system_config['object_spilling_config']) == \
+        {'type': 'filesystem', 'params': {'directory_path': SPILL_DIR}}
+
+    worker_object_store = node_types[WORKER_NODE_TYPE]['resources']['object_store_memory']
+    worker_start = _start_command(config, 'worker_start_ray_commands')
+    assert f' --object-store-memory={worker_object_store}' in worker_start
+    assert '--system-config' not in worker_start
+
+
+def test_nodes_without_instance_storage_spill_to_the_boot_volume(cloud, tmp_path):
+    from lithopscloud.modules.gen2.ray.profile import MOUNT_SPILL_DISK
+
+    config = _generate(tmp_path)
+
+    assert MOUNT_SPILL_DISK not in config['setup_commands']
+    assert '--system-config' not in _start_command(config, 'head_start_ray_commands')
+    assert '--object-store-memory=' in _start_command(config, 'head_start_ray_commands')
+
+
+def test_gpu_workers(cloud, tmp_path):
+    from lithopscloud.modules.gen2.ray.workers import HEAD_NODE_TYPE, WORKER_NODE_TYPE
+
+    node_types = _generate(tmp_path, worker_profile_name='gx2-16x128')['available_node_types']
+
+    assert node_types[WORKER_NODE_TYPE]['resources']['GPU'] == 2
+    assert 'GPU' not in node_types[HEAD_NODE_TYPE]['resources']
+
+
+def test_image_build_authenticates_by_the_provider_iam_endpoint(cloud, tmp_path):
+    from lithopscloud import build_image
+    from lithopscloud.modules import iam
+    from lithopscloud.modules.cache import account_digest
+
+    config = _generate(tmp_path)
+    config['provider']['iam_endpoint'] = 'https://iam.test.cloud.ibm.com'
+    config_file = tmp_path / 'ray.yaml'
+    config_file.write_text(yaml.dump(config))
+
+    # setup commands run on the builder are only recorded, the stand-in has no ssh server
+    output_file = build_image(str(config_file), str(tmp_path / 'ray-image.yaml'),
+                              run_commands=lambda host: lambda command: 0)
+
+    assert (account_digest(API_KEY), 'https://iam.test.cloud.ibm.com') in iam.BROKERS
+    with open(output_file) as f:
+        image_config = yaml.safe_load(f)
+    image_ids = {node_type['node_config']['image_id'] for node_type in image_config['available_node_types'].values()}
+    assert len(image_ids) == 1 and cloud.images[-1]['id'] in image_ids
+    assert image_config['setup_commands'] == ['rm -f ~/.ray/tags.json']
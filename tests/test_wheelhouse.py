@@ -0,0 +1,44 @@
+import copy
+import subprocess
+
+import pytest
+
+from lithopscloud.modules.gen2.ray import wheelhouse
+from lithopscloud.modules.gen2.ray.wheelhouse import WHEELHOUSE_HEAD, WHEELHOUSE_LOCAL, WheelhouseConfig
+
+SETUP_COMMANDS = ['apt update', 'pip install pandas gym', 'which ray || pip install ray[default]']
+
+
+def _config():
+    return {'auth': {'ssh_user': 'root'}, 'setup_commands': list(SETUP_COMMANDS)}
+
+
+def test_head_wheelhouse_builds_wheels_of_sdists():
+    config = WheelhouseConfig(_config()).update_config(WHEELHOUSE_HEAD)
+
+    build_command = config['setup_commands'][1]
+    assert "pip wheel --wheel-dir ~/wheelhouse setuptools wheel pandas gym 'ray[default]'" in build_command
+    assert config['setup_commands'][2] == 'pip install --no-index --find-links ~/wheelhouse pandas gym'
+    assert config['cluster_synced_files'] == ['/root/wheelhouse']
+
+
+def test_local_wheelhouse_surfaces_missing_wheels(monkeypatch):
+    def build_local_wheelhouse(packages):
+        raise subprocess.CalledProcessError(1, 'pip download')
+
+    monkeypatch.setattr(wheelhouse, 'build_local_wheelhouse', build_local_wheelhouse)
+    with pytest.raises(Exception, match=WHEELHOUSE_HEAD):
+        WheelhouseConfig(_config()).update_config(WHEELHOUSE_LOCAL)
+
+
+def test_wheelhouse_serves_the_setup_commands_moved_to_the_workers(monkeypatch):
+    # moved by RayImageConfig when the head boots a custom image, and the workers a stock one
+    base_config = {'auth': {'ssh_user': 'root'}, 'setup_commands': ['rm -f ~/.ray/tags.json'],
+                   'worker_setup_commands': list(SETUP_COMMANDS)}
+    with pytest.raises(Exception, match=WHEELHOUSE_LOCAL):
+        WheelhouseConfig(copy.deepcopy(base_config)).update_config(WHEELHOUSE_HEAD)
+
+    monkeypatch.setattr(wheelhouse, 'build_local_wheelhouse', lambda packages: '/tmp/wheelhouse')
+    config = WheelhouseConfig(copy.deepcopy(base_config)).update_config(WHEELHOUSE_LOCAL)
+    assert config['setup_commands'] == ['rm -f ~/.ray/tags.json']
+    assert config['worker_setup_commands'][1] == 'pip install --no-index --find-links ~/wheelhouse pandas gym'